@@ -1,23 +1,45 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
 import tensorflow as tf
 import numpy as np
 from PIL import Image
 import io
 import base64
+import json
 import logging
 from datetime import datetime
 import os
+import sys
 import threading
-import time
-import requests
+
+# Modules partagés à la racine du projet (face_dataset, ...)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from face_dataset import load_sampling_policy, open_or_pack
+from cascade import build_cascade
+from cpu_profile import apply_profile, autotune, load_profile
+from employee_directory import EmployeeDirectory
+from face_store import FaceStore, content_digest
+from face_training import best_epoch, build_classifier, checkpoint_dir, get_backbone, load_head_config, training_callbacks
+from frame_stream import FrameGate, IdentityTracker, iter_multipart_frames, recognize_frames
+from fast_logging import request_logger, setup_logging
+from model_cache import DEFAULT_BUDGET_MB, ModelCache, ModelSpec, estimate_model_bytes, load_model_specs
+from register_worker import RegistrationWorker
+from warm_keeper import WarmKeeper
 
 app = Flask(__name__, static_folder='.', static_url_path='')
 CORS(app)
 
-# Configuration du logging
-logging.basicConfig(level=logging.INFO)
+# Configuration du logging: écriture dans un thread de fond (fast_logging),
+# logs de détail des reconnaissances échantillonnés (LOG_SAMPLE_RATE)
+setup_logging(
+    level=getattr(logging, os.environ.get("LOG_LEVEL", "INFO").upper(), logging.INFO),
+    as_json=os.environ.get("LOG_FORMAT") == "json"
+)
 logger = logging.getLogger(__name__)
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", "0.01"))
 
 # Charger le modèle TensorFlow
 # Chemins possibles à essayer (ordre de priorité)
@@ -31,41 +53,108 @@ possible_paths = [
     "face.h5",
 ]
 
-model = None
 MODEL_PATH = None
 
 for path in possible_paths:
     full_path = os.path.abspath(path) if not path.startswith('/app') else path
     if os.path.exists(full_path):
-        try:
-            logger.info(f"📁 Tentative de chargement depuis: {full_path}")
-            model = tf.keras.models.load_model(full_path)
-            MODEL_PATH = full_path
-            logger.info(f"✅ Modèle TensorFlow chargé avec succès")
-            logger.info(f"   Chemin: {MODEL_PATH}")
-            break
-        except Exception as e:
-            logger.error(f"❌ Erreur lors du chargement de {full_path}: {e}")
-            continue
+        MODEL_PATH = full_path
+        break
+
+# Classes de reconnaissance
+CLASSES = ["jered", "gracia", "Ben", "Leo"]
+
+# Seuil minimum pour accepter une reconnaissance
+THRESHOLD = 0.50  # 50% (baissé pour permettre reconnaissance avec données limitées)
+
+# Plusieurs modèles nommés (un par site), choisis par requête ("model" dans le
+# JSON, ?model= ou en-tête X-Model). Sans api/models.json, un seul modèle
+# "default" = face.h5 + CLASSES + THRESHOLD, comme avant.
+MODELS_CONFIG = os.environ.get("MODELS_CONFIG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models.json"))
+if os.path.exists(MODELS_CONFIG):
+    model_specs, DEFAULT_MODEL = load_model_specs(MODELS_CONFIG)
+    logger.info(f"📁 Configuration multi-modèles: {MODELS_CONFIG} ({', '.join(model_specs)})")
+else:
+    DEFAULT_MODEL = "default"
+    # Cascade (cascade.py): CASCADE=resize (même modèle à CASCADE_SIZE px) ou chemin d'un modèle rapide
+    cascade_env = os.environ.get("CASCADE", "")
+    default_cascade = None
+    if cascade_env:
+        default_cascade = ({"image_size": int(os.environ.get("CASCADE_SIZE", "160"))} if cascade_env == "resize"
+                           else {"fast_model": cascade_env})
+        default_cascade["exit_threshold"] = float(os.environ["CASCADE_EXIT_THRESHOLD"]) if "CASCADE_EXIT_THRESHOLD" in os.environ else None
+    model_specs = {DEFAULT_MODEL: ModelSpec(DEFAULT_MODEL, MODEL_PATH or possible_paths[0], CLASSES, THRESHOLD, default_cascade)}
+
+# Profil CPU (threads TensorFlow, inférences simultanées): appliqué avant le
+# premier calcul TensorFlow. CPU_AUTOTUNE=1 le mesure au démarrage s'il manque.
+cpu_profile = load_profile()
+if cpu_profile is None and os.environ.get("CPU_AUTOTUNE") == "1":
+    logger.info("⏱️ Autotuning CPU au démarrage (voir cpu_profile.py)...")
+    try:
+        cpu_profile = autotune(model_path=MODEL_PATH)
+    except Exception as e:
+        logger.warning(f"⚠️ Autotuning CPU impossible: {e}")
+serving_profile = apply_profile(cpu_profile) if cpu_profile else None
+
+# Inférences simultanées: au-delà, les threads Flask attendent au lieu de se
+# partager les mêmes cœurs (latence de queue)
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", serving_profile["workers"] if serving_profile else 1))
+inference_slots = threading.BoundedSemaphore(INFERENCE_WORKERS)
 
-if model is None:
+# Chargement paresseux, modèles libérés (LRU) au-delà de MODEL_CACHE_MB
+model_cache = ModelCache(
+    model_specs,
+    default=DEFAULT_MODEL,
+    budget_bytes=int(float(os.environ.get("MODEL_CACHE_MB", DEFAULT_BUDGET_MB)) * 1024 * 1024),
+    loader=tf.keras.models.load_model
+)
+
+# Le modèle par défaut est chargé au démarrage; les autres à la première requête
+logger.info(f"📁 Tentative de chargement depuis: {model_specs[DEFAULT_MODEL].path}")
+if model_cache.get(DEFAULT_MODEL) is None:
     logger.warning("⚠️ Aucun modèle trouvé aux emplacements attendus:")
     for path in possible_paths:
         logger.warning(f"   - {path}")
     logger.info("Mode DEMO activé - retourne des résultats de test")
 
-# Classes de reconnaissance
-CLASSES = ["jered", "gracia", "Ben", "Leo"]
+# Cascades construites au premier usage et rattachées à l'entrée du cache:
+# libérées avec le modèle (éviction, /train), premier étage compté dans le
+# budget. CASCADE_AUDIT_RATE (0 par défaut): part des sorties anticipées
+# vérifiées par le modèle complet, dans un thread de fond (statistique d'accord)
+CASCADE_AUDIT_RATE = float(os.environ.get("CASCADE_AUDIT_RATE", "0"))
+cascades_lock = threading.Lock()
 
-# Seuil minimum pour accepter une reconnaissance
-THRESHOLD = 0.50  # 50% (baissé pour permettre reconnaissance avec données limitées)
+# /train: epochs sans amélioration de val_loss avant l'arrêt anticipé
+TRAIN_PATIENCE = int(os.environ.get("TRAIN_PATIENCE", "3"))
+# /train: augmentation par lot dans le pipeline (face_augment.py), TRAIN_AUGMENT=0 pour désactiver
+TRAIN_AUGMENT = os.environ.get("TRAIN_AUGMENT", "1") != "0"
+
+# /stream: différence moyenne (0-255, miniature 16x16) sous laquelle une image
+# n'est pas inférée, images sautées au plus d'affilée, inférences concordantes
+# avant de pousser une identité
+STREAM_GATE_THRESHOLD = float(os.environ.get("STREAM_GATE_THRESHOLD", "4.0"))
+STREAM_MAX_SKIP = int(os.environ.get("STREAM_MAX_SKIP", "10"))
+STREAM_STABLE_FRAMES = int(os.environ.get("STREAM_STABLE_FRAMES", "3"))
+
+# Visages enregistrés: stockage adressé par contenu dans face1/.store
+REGISTERED_DIR = os.path.join(PROJECT_ROOT, "face1")
+face_store = FaceStore(REGISTERED_DIR)
+
+# Annuaire /employees: construit depuis face1 et les classes des modèles,
+# mis à jour par /register et /train
+employee_directory = EmployeeDirectory(REGISTERED_DIR, model_specs)
+
+# Normalisation des images de /register en arrière-plan (224x224 JPEG)
+# FACE_ORIGINALS_DIR: conserver aussi les originaux (cold storage), désactivé par défaut
+registration_worker = RegistrationWorker(
+    max_workers=int(os.environ.get("REGISTER_WORKERS", "2")),
+    originals_dir=os.environ.get("FACE_ORIGINALS_DIR")
+)
 
 # ============================================================================
 # 🔄 KEEP-ALIVE: Maintenir l'API active sur Render
 # ============================================================================
 
-keep_alive_active = True
-keep_alive_thread = None
 API_BASE_URL = None
 
 def determine_api_url():
@@ -77,56 +166,33 @@ def determine_api_url():
     else:
         return "http://localhost:5000"
 
-def keep_alive_self_ping():
-    """Ping l'API lui-même toutes les 30 secondes pour éviter le sleep sur Render"""
-    global keep_alive_active
-    
-    logger.info("=" * 70)
-    logger.info("🔄 KEEP-ALIVE DÉMARRÉ")
-    logger.info(f"   URL: {API_BASE_URL}")
-    logger.info("   Intervalle: 30 secondes")
-    logger.info("   But: Éviter le suspension de l'API sur Render (free tier)")
-    logger.info("=" * 70)
-    
-    ping_count = 0
-    while keep_alive_active:
-        try:
-            # Attendre 30 secondes
-            time.sleep(30)
-            
-            # Envoyer un ping
-            start_time = time.time()
-            response = requests.get(f"{API_BASE_URL}/health", timeout=10)
-            elapsed = time.time() - start_time
-            ping_count += 1
-            
-            timestamp = datetime.now().strftime("%H:%M:%S")
-            status = "✅" if response.status_code == 200 else "⚠️"
-            
-            logger.info(f"[{timestamp}] 🔄 Ping #{ping_count}: {status} Status {response.status_code} ({elapsed:.2f}s)")
-            
-        except Exception as e:
-            logger.warning(f"[{datetime.now().strftime('%H:%M:%S')}] ⚠️ Ping failed: {str(e)[:50]}")
+# Le modèle est gardé chaud dans le processus (inférence synthétique toutes les
+# WARM_INTERVAL secondes). Le ping HTTP externe ne sert plus qu'à empêcher la
+# mise en veille de Render: KEEP_ALIVE_PING=1 (défaut sur Render), toutes les
+# KEEP_ALIVE_PING_INTERVAL secondes (Render s'endort après 15 min sans trafic).
+warm_keeper = None
 
 def start_keep_alive():
-    """Démarrer le keep-alive en arrière-plan"""
-    global keep_alive_active, keep_alive_thread, API_BASE_URL
+    """Démarrer le maintien à chaud (et le ping externe si activé)"""
+    global warm_keeper, API_BASE_URL
     
     API_BASE_URL = determine_api_url()
+    ping_enabled = os.environ.get("KEEP_ALIVE_PING", "1" if 'RENDER' in os.environ else "0") == "1"
     
-    if keep_alive_thread is None or not keep_alive_thread.is_alive():
-        keep_alive_active = True
-        keep_alive_thread = threading.Thread(target=keep_alive_self_ping, daemon=True)
-        keep_alive_thread.start()
-        logger.info("✅ Keep-Alive ping thread lancé en arrière-plan")
-    else:
-        logger.info("⚠️ Keep-Alive déjà actif")
+    if warm_keeper is None:
+        warm_keeper = WarmKeeper(
+            model_cache,
+            interval=float(os.environ.get("WARM_INTERVAL", "30")),
+            slots=inference_slots,
+            ping_url=API_BASE_URL if ping_enabled else None,
+            ping_interval=float(os.environ.get("KEEP_ALIVE_PING_INTERVAL", "300"))
+        )
+    warm_keeper.start()
 
 def stop_keep_alive():
-    """Arrêter le keep-alive"""
-    global keep_alive_active
-    keep_alive_active = False
-    logger.info("❌ Keep-Alive ping arrêté")
+    """Arrêter le maintien à chaud"""
+    if warm_keeper is not None:
+        warm_keeper.stop()
 
 
 @app.route('/', methods=['GET'])
@@ -140,6 +206,7 @@ def index():
             "available_endpoints": [
                 "GET /health",
                 "POST /recognize",
+                "POST /stream",
                 "GET /employees"
             ]
         }), 404
@@ -147,13 +214,46 @@ def index():
 @app.route('/health', methods=['GET'])
 def health_check():
     """Vérifier que l'API est active"""
-    model_status = "loaded" if model is not None else "not_loaded"
+    model_status = "loaded" if DEFAULT_MODEL in model_cache.loaded() else "not_loaded"
     return jsonify({
         "status": "ok",
         "model_status": model_status,
+        "models_loaded": model_cache.loaded(),
+        "warm": warm_keeper.stats() if warm_keeper is not None else None,
         "timestamp": datetime.now().isoformat()
     }), 200
 
+@app.route('/models', methods=['GET'])
+def list_models():
+    """Modèles disponibles, statistiques du cache (hits, chargements, évictions) et des cascades"""
+    loaded = set(model_cache.loaded())
+
+    def cascade_stats(name):
+        entry = model_cache.peek(name)
+        cascade = entry.attachments.get("cascade") if entry is not None else None
+        if cascade is None:
+            return None
+        # Référence du modèle complet si aucune requête ne l'a encore atteint
+        return cascade.stats(warm_keeper.latency_ms(name) if warm_keeper is not None else None)
+
+    return jsonify({
+        "success": True,
+        "default": DEFAULT_MODEL,
+        "models": [
+            {**spec.to_dict(), "loaded": name in loaded,
+             "cascade_stats": cascade_stats(name)}
+            for name, spec in model_specs.items()
+        ],
+        "cache": model_cache.stats()
+    }), 200
+
+def requested_model(data=None):
+    """Nom du modèle demandé: champ "model" (JSON ou formulaire), ?model= ou en-tête X-Model"""
+    name = None
+    if data:
+        name = data.get('model')
+    return name or request.values.get('model') or request.headers.get('X-Model')
+
 @app.route('/recognize', methods=['POST'])
 def recognize_face():
     """
@@ -172,7 +272,8 @@ def recognize_face():
             }), 400
         
         # Décoder l'image
-        logger.info("Décodage de l'image...")
+        rlog = request_logger(logger, LOG_SAMPLE_RATE)
+        rlog.info("Décodage de l'image (%d caractères base64)", len(image_base64))
         
         # Nettoyer le préfixe data:image si présent
         if ',' in image_base64:
@@ -183,13 +284,12 @@ def recognize_face():
         
         # Redimensionner à 224x224 (taille attendue par le modèle)
         img = img.resize((224, 224))
-        logger.info(f"Image redimensionnée: 224x224 - Mode: {img.mode}")
-        logger.info(f"Image dtype: {np.array(img).dtype}")
+        rlog.info("Image redimensionnée: 224x224 - Mode: %s", img.mode)
         
-        return process_image(img)
+        return process_image(img, requested_model(data), rlog)
         
     except Exception as e:
-        logger.error(f"❌ Erreur: {str(e)}")
+        logger.error("❌ Erreur: %s", e)
         return jsonify({
             "success": False,
             "error": str(e)
@@ -210,63 +310,113 @@ def recognize_face_file():
             }), 400
         
         file = request.files['image']
-        logger.info(f"📁 Fichier reçu: {file.filename}")
+        rlog = request_logger(logger, LOG_SAMPLE_RATE)
+        rlog.info("📁 Fichier reçu: %s", file.filename)
         
         # Lire l'image
         img = Image.open(file.stream).convert("RGB")
         
         # Redimensionner à 224x224
         img = img.resize((224, 224))
-        logger.info("Image redimensionnée: 224x224")
+        rlog.info("Image redimensionnée: 224x224")
         
-        return process_image(img)
+        return process_image(img, requested_model(), rlog)
         
     except Exception as e:
-        logger.error(f"❌ Erreur: {str(e)}")
+        logger.error("❌ Erreur: %s", e)
         return jsonify({
             "success": False,
             "error": str(e)
         }), 500
 
-def process_image(img):
+def get_cascade(entry):
+    """Cascade du modèle (None si non configurée ou impossible à construire)"""
+    if not entry.spec.cascade:
+        return None
+    if "cascade" in entry.attachments:
+        return entry.attachments["cascade"]
+    with cascades_lock:
+        if "cascade" in entry.attachments:
+            return entry.attachments["cascade"]
+        try:
+            cascade = build_cascade(entry.model, entry.spec.cascade, entry.threshold,
+                                    slots=inference_slots, audit_rate=CASCADE_AUDIT_RATE)
+            fast_bytes = estimate_model_bytes(cascade.fast)
+            logger.info("✅ Cascade %s: premier étage %s (%.1f MB), sortie à %.0f%%",
+                        entry.name, cascade.label, fast_bytes / (1024 * 1024), cascade.exit_threshold * 100)
+        except Exception as e:
+            logger.warning("⚠️ Cascade %s désactivée: %s", entry.name, e)
+            cascade, fast_bytes = None, 0
+        # Nouvelle entrée (rechargement, /train) -> nouvelle cascade
+        return model_cache.attach(entry, "cascade", cascade, fast_bytes)
+
+def predict_probabilities(entry, img):
+    """
+    Probabilités par classe pour une image 224x224 RGB (places d'inférence
+    partagées) + étage qui a répondu ('fast'/'full' en cascade, sinon 'model')
+    """
+    cascade = get_cascade(entry)
+    if cascade is not None:
+        return cascade.predict(img)
+    # Prétraitement (comme dans ML.ipynb)
+    img_array = np.expand_dims(np.array(img) / 255.0, axis=0)
+    with inference_slots:
+        return entry.model.predict(img_array, verbose=0)[0], "model"
+
+def process_image(img, model_name=None, rlog=None):
     """
-    Traite l'image et retourne les résultats
+    Traite l'image avec le modèle demandé et retourne les résultats
+    rlog: logs de détail échantillonnés de la requête (fast_logging.request_logger)
     """
+    rlog = rlog or request_logger(logger, LOG_SAMPLE_RATE)
     try:
-        if model is not None:
-            # Prétraitement (comme dans ML.ipynb)
-            img_array = np.array(img) / 255.0
-            img_array = np.expand_dims(img_array, axis=0)
+        try:
+            model_name = model_cache.resolve(model_name)
+        except KeyError:
+            return jsonify({
+                "success": False,
+                "error": f"Modèle inconnu: {model_name}",
+                "models": list(model_specs)
+            }), 404
+        
+        entry = model_cache.get(model_name)
+        if entry is not None:
+            classes, threshold = entry.classes, entry.threshold
             
             # Prédiction
-            logger.info("Exécution du modèle...")
-            prediction = model.predict(img_array, verbose=0)[0]
+            rlog.info("Exécution du modèle %s", model_name)
+            prediction, stage = predict_probabilities(entry, img)
             
             # Classe la plus probable
             confidence = float(np.max(prediction))
             percentage = round(confidence * 100, 2)
             index = int(np.argmax(prediction))
             
-            logger.info(f"Prédiction: {CLASSES[index]} - Confiance: {percentage}%")
+            rlog.info("Prédiction: %s - Confiance: %.2f%%", classes[index], percentage)
             
             # Vérifier le seuil
-            if confidence < THRESHOLD:
-                logger.warning(f"Confiance trop faible: {percentage}%")
+            if confidence < threshold:
+                logger.info("Reconnaissance refusée: confiance trop faible (%.2f%%)", percentage,
+                            extra={"fields": {"model": model_name, "best": classes[index]}})
                 return jsonify({
                     "success": False,
                     "name": "Inconnu",
                     "confidence": confidence,
                     "percentage": percentage,
+                    "model": model_name,
+                    "stage": stage,
                     "error": "Confiance insuffisante"
                 }), 200
             
             # Résultats positifs
             response = {
                 "success": True,
-                "name": CLASSES[index],
+                "name": classes[index],
                 "confidence": confidence,
                 "percentage": percentage,
-                "employee_id": f"EMP_{CLASSES[index].upper()}",
+                "employee_id": f"EMP_{classes[index].upper()}",
+                "model": model_name,
+                "stage": stage,
                 "timestamp": datetime.now().isoformat()
             }
         else:
@@ -280,16 +430,74 @@ def process_image(img):
                 "error": "Modèle non disponible"
             }), 503
 
-        logger.info(f"✅ Reconnaissance réussie: {response['name']}")
+        logger.info("✅ Reconnaissance réussie: %s (%.2f%%)", response['name'], percentage,
+                    extra={"fields": {"model": model_name}})
         return jsonify(response), 200
         
     except Exception as e:
-        logger.error(f"❌ Erreur traitement: {str(e)}")
+        logger.error("❌ Erreur traitement: %s", e)
         return jsonify({
             "success": False,
             "error": str(e)
         }), 500
 
+@app.route('/stream', methods=['POST'])
+def recognize_stream():
+    """
+    Reconnaissance sur un flux continu d'images (une requête par session)
+    Corps: multipart/x-mixed-replace; boundary=..., une image JPEG par partie
+    avec Content-Length. Réponse: NDJSON poussé au fil du flux (identité
+    stable, erreurs, statistiques de fin). Voir frame_stream.py.
+    """
+    boundary = request.mimetype_params.get('boundary')
+    if not request.mimetype.startswith('multipart/') or not boundary:
+        return jsonify({
+            "success": False,
+            "error": "Corps multipart avec boundary attendu (multipart/x-mixed-replace)"
+        }), 400
+    
+    try:
+        model_name = model_cache.resolve(requested_model())
+    except KeyError as e:
+        return jsonify({
+            "success": False,
+            "error": f"Modèle inconnu: {e.args[0]}",
+            "models": list(model_specs)
+        }), 404
+    
+    entry = model_cache.get(model_name)
+    if entry is None:
+        return jsonify({
+            "success": False,
+            "error": "Modèle non disponible"
+        }), 503
+    
+    gate = FrameGate(threshold=STREAM_GATE_THRESHOLD, max_skip=STREAM_MAX_SKIP)
+    tracker = IdentityTracker(stable_frames=STREAM_STABLE_FRAMES)
+    frames = iter_multipart_frames(request.stream, boundary)
+    
+    def events():
+        try:
+            for event in recognize_frames(frames, lambda img: predict_probabilities(entry, img)[0],
+                                          entry.classes, entry.threshold, gate, tracker):
+                if event["event"] == "identity":
+                    logger.info("🎥 Identité stable: %s (%.2f%%)", event["name"], event["percentage"],
+                                extra={"fields": {"model": model_name, "frame": event["frame"]}})
+                elif event["event"] == "end":
+                    logger.info("🎥 Fin du flux: %d images, %d inférences", event["frames"], event["inferred"],
+                                extra={"fields": {"model": model_name}})
+                yield json.dumps({"model": model_name, **event}) + "\n"
+        except ValueError as e:
+            logger.warning("⚠️ Flux invalide: %s", e)
+            yield json.dumps({"event": "error", "error": str(e), "fatal": True}) + "\n"
+        except Exception as e:
+            # Erreur d'inférence ou autre: la session se termine par un événement lisible
+            logger.error("❌ Erreur flux %s: %s", model_name, e, exc_info=True)
+            yield json.dumps({"event": "error", "error": str(e), "fatal": True}) + "\n"
+    
+    return Response(stream_with_context(events()), mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/register', methods=['POST'])
 def register_face():
     """
@@ -306,30 +514,70 @@ def register_face():
                 "error": "Nom et image requis"
             }), 400
         
-        # Créer le dossier des visages enregistrés s'il n'existe pas
-        registered_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "face1")
-        person_dir = os.path.join(registered_dir, name)
-        os.makedirs(person_dir, exist_ok=True)
+        # Nettoyer le préfixe data:image si présent
+        if ',' in image_base64:
+            image_base64 = image_base64.split(',')[1]
         
-        # Décoder et sauvegarder l'image
         image_data = base64.b64decode(image_base64)
-        img = Image.open(io.BytesIO(image_data))
         
-        # Générer un nom de fichier unique
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-        filename = f"{name}_{timestamp}.jpg"
-        filepath = os.path.join(person_dir, filename)
+        # Vérification rapide (en-tête seulement, pas de décodage des pixels)
+        try:
+            Image.open(io.BytesIO(image_data))
+        except Exception:
+            return jsonify({
+                "success": False,
+                "error": "Image invalide"
+            }), 400
         
-        # Sauvegarder
-        img.save(filepath)
-        logger.info(f"✅ Visage enregistré: {filepath}")
+        # Stockage adressé par contenu: un même envoi n'est stocké qu'une fois
+        digest = content_digest(image_data)
+        filename = f"{digest}.jpg"
+        filepath = face_store.blob_path(digest)
+        
+        if face_store.contains(name, digest):
+            logger.info(f"♻️ Visage déjà enregistré: {name} ({digest[:12]})")
+            return jsonify({
+                "success": True,
+                "message": f"Visage de {name} déjà enregistré",
+                "filename": filename,
+                "path": filepath,
+                "duplicate": True,
+                "status": "done"
+            }), 200
+        
+        if face_store.has_blob(digest):
+            # Image déjà normalisée (autre personne ou envoi précédent): index seulement
+            if face_store.add(name, digest):
+                employee_directory.add_image(name)
+            return jsonify({
+                "success": True,
+                "message": f"Visage de {name} enregistré avec succès",
+                "filename": filename,
+                "path": filepath,
+                "status": "done"
+            }), 200
+        
+        # Orientation, redimensionnement et encodage faits en arrière-plan;
+        # l'index (et l'annuaire) n'est mis à jour qu'une fois l'image écrite
+        def index_registered(person, path):
+            if face_store.add(person, digest):
+                employee_directory.add_image(person)
+        
+        job_id = registration_worker.submit(
+            name, image_data, filepath,
+            on_done=index_registered,
+            key=(name, digest)
+        )
+        logger.info(f"📥 Visage mis en file: {name} ({digest[:12]})")
         
         return jsonify({
             "success": True,
             "message": f"Visage de {name} enregistré avec succès",
             "filename": filename,
-            "path": filepath
-        }), 200
+            "path": filepath,
+            "job_id": job_id,
+            "status": "queued"
+        }), 202
         
     except Exception as e:
         logger.error(f"❌ Erreur lors de l'enregistrement: {str(e)}")
@@ -338,24 +586,33 @@ def register_face():
             "error": str(e)
         }), 500
 
-@app.route('/employees', methods=['GET'])
-def get_employees():
-    """Récupérer la liste des employés"""
-    employees = [
-        {
-            "name": "Jered",
-            "employee_id": "EMP_JERED"
-        },
-        {
-            "name": "Gracia",
-            "employee_id": "EMP_GRACIA"
-        }
-    ]
+@app.route('/register/<job_id>', methods=['GET'])
+def register_status(job_id):
+    """État de la normalisation d'une image enregistrée"""
+    job = registration_worker.status(job_id)
+    if job is None:
+        return jsonify({
+            "success": False,
+            "error": "Job inconnu"
+        }), 404
     return jsonify({
-        "success": True,
-        "employees": employees
+        "success": job["status"] != "error",
+        "job_id": job_id,
+        **job
     }), 200
 
+@app.route('/employees', methods=['GET'])
+def get_employees():
+    """
+    Récupérer la liste des employés (dataset + classes des modèles)
+    ETag / If-None-Match: 304 sans corps si l'annuaire n'a pas changé
+    """
+    etag, body = employee_directory.snapshot()
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
 @app.route('/test', methods=['GET', 'POST'])
 def test_endpoint():
     """Endpoint de test"""
@@ -376,8 +633,18 @@ def train_model():
         logger.info("🚀 DEBUT DE L'ENTRAINEMENT DU MODELE")
         logger.info("=" * 70)
         
-        from sklearn.model_selection import train_test_split
-        from tensorflow.keras.utils import to_categorical
+        # Modèle à entraîner (site): ses classes définissent les labels
+        try:
+            model_name = model_cache.resolve(requested_model(request.get_json(silent=True)))
+        except KeyError as e:
+            return jsonify({
+                "success": False,
+                "error": f"Modèle inconnu: {e.args[0]}",
+                "models": list(model_specs)
+            }), 404
+        spec = model_specs[model_name]
+        CLASSES = spec.classes
+        logger.info(f"Modèle: {model_name} ({len(CLASSES)} classes)")
         
         # Chemin du dataset - essayer plusieurs emplacements
         possible_face_dirs = [
@@ -405,36 +672,28 @@ def train_model():
         
         logger.info(f"Utilisation du dataset: {face_dir}")
         
-        # Charger les images
-        X = []
-        y = []
+        # Inclure les images de /register encore en cours de normalisation
+        if registration_worker.pending():
+            logger.info(f"⏳ Attente de {registration_worker.pending()} image(s) en normalisation...")
+            remaining = registration_worker.drain(timeout=60)
+            if remaining:
+                logger.warning(f"⚠️ {remaining} image(s) encore en normalisation: ignorées par cet entraînement")
+        
+        # Charger les images depuis le dataset packé (memmap uint8, reconstruit
+        # seulement si face1 a changé): pas de décodage JPEG à chaque entraînement
+        packed_dir = os.path.normpath(face_dir) + "_packed"
+        try:
+            dataset = open_or_pack(face_dir, CLASSES, packed_dir)
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 400
         
         for label, person in enumerate(CLASSES):
-            person_dir = os.path.join(face_dir, person)
-            if not os.path.exists(person_dir):
-                logger.warning(f"Dossier non trouvé: {person_dir}")
-                continue
-            
-            images = [f for f in os.listdir(person_dir) if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
-            logger.info(f"  {person}: {len(images)} images")
-            
-            for img_file in images:
-                img_path = os.path.join(person_dir, img_file)
-                try:
-                    img = Image.open(img_path)
-                    if img.mode != 'RGB':
-                        img = img.convert('RGB')
-                    img = img.resize((224, 224))
-                    img_array = np.array(img).astype("float32") / 255.0
-                    X.append(img_array)
-                    y.append(label)
-                except Exception as e:
-                    logger.warning(f"  Erreur avec {img_file}: {e}")
-        
-        X = np.array(X)
-        y = np.array(y)
-        
-        total_images = len(X)
+            logger.info(f"  {person}: {int(np.sum(dataset.labels[dataset.rows] == label))} images")
+        
+        total_images = len(dataset)
         logger.info(f"✅ Total images chargées: {total_images}")
         
         if total_images < 100:
@@ -444,48 +703,71 @@ def train_model():
             }), 400
         
         # Train/Test split
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, shuffle=True, random_state=42
-        )
-        
-        y_train_cat = to_categorical(y_train, num_classes=len(CLASSES))
-        y_test_cat = to_categorical(y_test, num_classes=len(CLASSES))
-        
-        logger.info(f"  Train: {len(X_train)}, Test: {len(X_test)}")
+        train_rows, test_rows = dataset.split(test_size=0.2, seed=42)
+        
+        # Hyperparamètres de la tête (best_head.json de sweep_heads.py, sinon historiques)
+        head = load_head_config()
+        logger.info(f"  Tête: {head}")
+        
+        # Epochs équilibrées par tirage d'indices (sampling.json), sans copie de fichiers
+        balance_policy = load_sampling_policy(face_dir)
+        train_data = dataset.tf_dataset(train_rows, batch_size=head['batch_size'], shuffle=True, seed=42,
+                                        balance=balance_policy, augment=TRAIN_AUGMENT)
+        test_data = dataset.tf_dataset(test_rows, batch_size=head['batch_size'])
+        
+        logger.info(f"  Train: {len(train_rows)}, Test: {len(test_rows)}")
+        logger.info(f"  Rééquilibrage: {balance_policy} -> {len(dataset.balanced_rows(train_rows, balance_policy))} exemples/epoch"
+                    f"{' (augmentés)' if TRAIN_AUGMENT else ''}")
+        
+        # Créer et entraîner le modèle: backbone gelé repris du modèle déjà en
+        # mémoire (ou du cache local de poids), seule une nouvelle tête est créée
+        loaded = model_cache.get(model_name)
+        if loaded is None:
+            loaded = next((model_cache.get(name) for name in model_cache.loaded()), None)
+        try:
+            base, backbone_source = get_backbone(
+                loaded.model if loaded is not None else None,
+                allow_download=os.environ.get("BACKBONE_DOWNLOAD", "1") != "0"
+            )
+        except FileNotFoundError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 503
+        logger.info(f"  Backbone: {backbone_source}")
         
-        # Créer et entraîner le modèle
-        base = tf.keras.applications.MobileNetV2(
-            input_shape=(224, 224, 3),
-            include_top=False,
-            weights='imagenet'
-        )
-        base.trainable = False
+        new_model = build_classifier(base, len(CLASSES), head['dense_units'], head['dropout'])
         
-        new_model = tf.keras.Sequential([
-            base,
-            tf.keras.layers.GlobalAveragePooling2D(),
-            tf.keras.layers.Dense(256, activation='relu'),
-            tf.keras.layers.Dropout(0.4),
-            tf.keras.layers.Dense(len(CLASSES), activation='softmax')
-        ])
+        new_model.compile(optimizer=tf.keras.optimizers.Adam(head['learning_rate']),
+                          loss='categorical_crossentropy', metrics=['accuracy'])
         
-        new_model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
+        # Arrêt anticipé sur plateau de val_loss (meilleurs poids restaurés) et
+        # sauvegarde à chaque epoch: si l'instance est recyclée en cours de route,
+        # le /train suivant (même modèle, dataset et tête) reprend où il en était
+        backup_dir = checkpoint_dir(packed_dir, model_name, classes=CLASSES, head=head,
+                                    fingerprint=dataset.fingerprint, backbone=backbone_source,
+                                    augment=TRAIN_AUGMENT)
+        callbacks, resumed = training_callbacks(backup_dir, patience=TRAIN_PATIENCE)
         
-        logger.info("⏳ Entraînement en cours (15 epochs)...")
+        logger.info(f"⏳ Entraînement en cours ({head['epochs']} epochs max, patience {TRAIN_PATIENCE})"
+                    f"{' - reprise' if resumed else ''}...")
         history = new_model.fit(
-            X_train, y_train_cat,
-            validation_data=(X_test, y_test_cat),
-            epochs=15,
-            batch_size=32,
+            train_data,
+            validation_data=test_data,
+            epochs=head['epochs'],
+            callbacks=callbacks,
             verbose=0
         )
         
-        # Évaluer
-        final_accuracy = history.history['val_accuracy'][-1]
-        logger.info(f"✅ Accuracy final: {final_accuracy*100:.2f}%")
+        # Évaluer (epoch dont les poids ont été restaurés)
+        kept_epoch, metrics = best_epoch(history)
+        final_accuracy = metrics['val_accuracy']
+        logger.info(f"✅ Accuracy final: {final_accuracy*100:.2f}% (epoch {kept_epoch}, "
+                    f"{history.epoch[-1] + 1 if history.epoch else 0}/{head['epochs']} epochs)")
         
         # Sauvegarder le modèle - chercher le meilleur emplacement
-        model_save_paths = [
+        # (chemin du modèle configuré dans models.json, sinon emplacements historiques)
+        model_save_paths = [spec.path] if os.path.exists(MODELS_CONFIG) else [
             "/app/face.h5",
             os.path.join(os.path.dirname(os.path.abspath(__file__)), "face.h5"),
         ]
@@ -507,10 +789,11 @@ def train_model():
                 "error": "Impossible de sauvegarder le modèle"
             }), 500
         
-        # Recharger le modèle global
-        global model
-        model = tf.keras.models.load_model(model_path)
-        logger.info("✅ Modèle rechargé en mémoire")
+        # Remplacer le modèle dans le cache
+        spec.path = model_path
+        model_cache.put(model_name, tf.keras.models.load_model(model_path))
+        employee_directory.set_model(model_name, CLASSES)
+        logger.info(f"✅ Modèle {model_name} rechargé en mémoire")
         
         logger.info("=" * 70)
         logger.info("✅ ENTRAINEMENT TERMINE")
@@ -519,7 +802,12 @@ def train_model():
         return jsonify({
             "success": True,
             "message": "Modele entraine avec succes",
+            "model": model_name,
+            "backbone": backbone_source,
             "total_images": total_images,
+            "epochs_run": len(history.epoch),
+            "best_epoch": kept_epoch,
+            "resumed": resumed,
             "final_accuracy": float(final_accuracy),
             "accuracy_percent": f"{final_accuracy*100:.2f}%"
         }), 200
@@ -537,16 +825,26 @@ if __name__ == '__main__':
     print("=" * 60)
     print("🚀 Face Recognition API - TensorFlow")
     print("=" * 60)
-    print(f"Modèle: {'✅ Chargé' if model is not None else '❌ Non disponible'}")
-    print(f"Classes: {CLASSES}")
-    print(f"Seuil: {THRESHOLD * 100}%")
+    for name, spec in model_specs.items():
+        status = '✅ Chargé' if name in model_cache.loaded() else ('⏳ À la demande' if os.path.exists(spec.path) else '❌ Non disponible')
+        print(f"Modèle {name}{' (défaut)' if name == DEFAULT_MODEL else ''}: {status}")
+        print(f"  Classes: {spec.classes} - Seuil: {spec.threshold * 100}%")
+        if spec.cascade:
+            print(f"  Cascade: {spec.cascade}")
+    print(f"Budget cache modèles: {model_cache.budget_bytes / (1024 * 1024):.0f} MB")
+    if serving_profile:
+        print(f"Profil CPU: intra={serving_profile['intra']} inter={serving_profile['inter']} workers={INFERENCE_WORKERS}")
+    else:
+        print(f"Profil CPU: aucun (python cpu_profile.py) - workers={INFERENCE_WORKERS}")
     print()
     print("Serveur démarré sur http://localhost:5000")
     print()
     print("Endpoints disponibles:")
     print("  ✓ GET  http://localhost:5000/health")
     print("  ✓ POST http://localhost:5000/recognize")
+    print("  ✓ POST http://localhost:5000/stream (multipart continu -> NDJSON)")
     print("  ✓ GET  http://localhost:5000/employees")
+    print("  ✓ GET  http://localhost:5000/models")
     print("=" * 60)
     
     # Démarrer le keep-alive
@@ -0,0 +1,200 @@
+"""
+Inférence en cascade: un premier passage peu coûteux, le modèle complet
+seulement si le premier passage hésite
+Premier étage, au choix (section "cascade" d'un modèle dans models.json):
+    {"image_size": 160}                  le même modèle à résolution réduite
+                                         (backbone reconstruit, mêmes poids)
+    {"fast_model": "face_student.h5"}    un modèle plus petit (distill_model.py),
+                                         mêmes classes, entrée 224x224
+    "exit_threshold": 0.9                confiance du premier étage au-dessus
+                                         de laquelle il répond seul (défaut:
+                                         max(0.9, (1 + seuil) / 2))
+Sans models.json: CASCADE=resize|<chemin du modèle rapide>, CASCADE_SIZE,
+CASCADE_EXIT_THRESHOLD.
+
+Statistiques: part des requêtes sorties au premier étage, latence de bout
+en bout comparée à celle du modèle complet seul (mesurée sur les requêtes
+escaladées), et, si audit_rate > 0 (désactivé par défaut), accord avec le
+modèle complet sur un échantillon de sorties anticipées. L'audit tourne
+dans un thread de fond, un à la fois, et seulement si une place
+d'inférence est libre: il n'allonge jamais une requête.
+
+La cascade est rattachée à l'entrée du ModelCache (taille du premier étage
+comptée dans le budget): elle est libérée avec le modèle.
+"""
+
+import logging
+import random
+import threading
+import time
+from contextlib import nullcontext
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SIZE = 224
+DEFAULT_REDUCED_SIZE = 160
+
+
+def default_exit_threshold(threshold):
+    return max(0.9, (1.0 + threshold) / 2)
+
+
+def reduced_input_model(model, image_size):
+    """
+    Même classifieur à l'entrée image_size x image_size: le backbone
+    MobileNetV2 (entièrement convolutif) est reconstruit à cette taille avec
+    les mêmes poids, la tête est recopiée.
+    """
+    import tensorflow as tf
+    from face_training import backbone_from_model
+
+    backbone = backbone_from_model(model)
+    if backbone is None or model.layers[0] is not backbone:
+        raise ValueError("Le modèle n'est pas un Sequential([MobileNetV2, tête])")
+    # Nom Keras: mobilenetv2_<alpha>_<taille>
+    alpha = float(backbone.name.split('_')[1])
+    small = tf.keras.applications.MobileNetV2(
+        input_shape=(image_size, image_size, 3), alpha=alpha, include_top=False, weights=None
+    )
+    small.set_weights(backbone.get_weights())
+
+    head = [layer.__class__.from_config(layer.get_config()) for layer in model.layers[1:]]
+    reduced = tf.keras.Sequential([small, *head])
+    reduced.build((None, image_size, image_size, 3))
+    for copy, layer in zip(head, model.layers[1:]):
+        copy.set_weights(layer.get_weights())
+    return reduced
+
+
+class Cascade:
+    """Deux étages: fast (sortie anticipée si confiance >= exit_threshold), puis full"""
+
+    def __init__(self, fast, full, exit_threshold, fast_size=IMAGE_SIZE, slots=None, audit_rate=0.0, label=""):
+        self.fast = fast
+        self.full = full
+        self.exit_threshold = exit_threshold
+        self.fast_size = fast_size
+        self.slots = slots
+        self.audit_rate = audit_rate
+        self.label = label
+        self._lock = threading.Lock()
+        self._stats = {
+            "requests": 0, "early_exits": 0, "fast_seconds": 0.0, "full_seconds": 0.0,
+            "full_runs": 0, "total_seconds": 0.0, "audits": 0, "audit_agreements": 0,
+        }
+        self._audit_thread = None
+
+    def _run(self, model, img, size):
+        if size != img.size[0]:
+            img = img.resize((size, size))
+        x = np.expand_dims(np.asarray(img, dtype=np.float32) / 255.0, axis=0)
+        start = time.perf_counter()
+        with self.slots if self.slots is not None else nullcontext():
+            probabilities = model.predict(x, verbose=0)[0]
+        return probabilities, time.perf_counter() - start
+
+    def _start_audit(self, img, label):
+        """Audit en arrière-plan: au plus un à la fois, sauté si un audit est déjà en cours"""
+        with self._lock:
+            if self._audit_thread is not None and self._audit_thread.is_alive():
+                return
+            self._audit_thread = threading.Thread(target=self._audit, args=(img, label), name="cascade-audit", daemon=True)
+            self._audit_thread.start()
+
+    def _audit(self, img, label):
+        # Pas d'attente: si toutes les places d'inférence sont prises, l'audit est abandonné
+        if self.slots is not None and not self.slots.acquire(blocking=False):
+            return
+        try:
+            start = time.perf_counter()
+            x = np.expand_dims(np.asarray(img, dtype=np.float32) / 255.0, axis=0)
+            reference = self.full.predict(x, verbose=0)[0]
+            seconds = time.perf_counter() - start
+        except Exception as e:
+            logger.warning("⚠️ Audit de cascade échoué: %s", e)
+            return
+        finally:
+            if self.slots is not None:
+                self.slots.release()
+        with self._lock:
+            self._stats["audits"] += 1
+            self._stats["audit_agreements"] += int(int(np.argmax(reference)) == label)
+            self._stats["full_runs"] += 1
+            self._stats["full_seconds"] += seconds
+
+    def predict(self, img):
+        """(probabilités, étage qui a répondu: 'fast' ou 'full') pour une image 224x224 RGB"""
+        start = time.perf_counter()
+        probabilities, fast_seconds = self._run(self.fast, img, self.fast_size)
+        early = float(np.max(probabilities)) >= self.exit_threshold
+        full_seconds = None
+        if not early:
+            probabilities, full_seconds = self._run(self.full, img, IMAGE_SIZE)
+        total = time.perf_counter() - start
+
+        if early and self.audit_rate > 0 and random.random() < self.audit_rate:
+            # Le modèle complet aurait-il donné la même classe? (hors requête)
+            self._start_audit(img, int(np.argmax(probabilities)))
+
+        with self._lock:
+            stats = self._stats
+            stats["requests"] += 1
+            stats["early_exits"] += int(early)
+            stats["fast_seconds"] += fast_seconds
+            stats["total_seconds"] += total
+            if full_seconds is not None:
+                stats["full_runs"] += 1
+                stats["full_seconds"] += full_seconds
+        return probabilities, "fast" if early else "full"
+
+    def stats(self, full_baseline_ms=None):
+        """
+        full_baseline_ms: latence du modèle complet mesurée ailleurs (warm
+        keeper), utilisée tant qu'aucune requête n'est passée par le modèle
+        complet (toutes sorties anticipées, audit désactivé). Sans mesure ni
+        référence, full_ms et latency_saving restent null.
+        """
+        with self._lock:
+            s = dict(self._stats)
+        requests = s["requests"]
+        mean_ms = lambda seconds, count: round(seconds / count * 1000, 2) if count else None
+        full_ms = mean_ms(s["full_seconds"], s["full_runs"])
+        full_ms_source = "measured" if full_ms else None
+        if full_ms is None and full_baseline_ms:
+            full_ms, full_ms_source = round(full_baseline_ms, 2), "warm_keeper"
+        end_to_end_ms = mean_ms(s["total_seconds"], requests)
+        return {
+            "fast": self.label,
+            "exit_threshold": self.exit_threshold,
+            "requests": requests,
+            "early_exits": s["early_exits"],
+            "early_exit_rate": round(s["early_exits"] / requests, 4) if requests else None,
+            "fast_ms": mean_ms(s["fast_seconds"], requests),
+            "full_ms": full_ms,
+            "full_ms_source": full_ms_source,
+            "end_to_end_ms": end_to_end_ms,
+            # Gain par rapport au modèle complet seul sur chaque requête
+            "latency_saving": round(1 - end_to_end_ms / full_ms, 4) if full_ms and end_to_end_ms else None,
+            "audits": s["audits"],
+            "audit_agreement": round(s["audit_agreements"] / s["audits"], 4) if s["audits"] else None,
+        }
+
+
+def build_cascade(model, config, threshold, loader=None, slots=None, audit_rate=0.0):
+    """Cascade décrite par `config` (section "cascade" d'un ModelSpec) autour du modèle complet"""
+    exit_threshold = float(config.get("exit_threshold") or default_exit_threshold(threshold))
+    if config.get("fast_model"):
+        if loader is None:
+            import tensorflow as tf
+            loader = tf.keras.models.load_model
+        fast = loader(config["fast_model"])
+        if fast.output_shape[-1] != model.output_shape[-1]:
+            raise ValueError(f"Le modèle rapide a {fast.output_shape[-1]} classes, "
+                             f"le modèle complet {model.output_shape[-1]}")
+        return Cascade(fast, model, exit_threshold, IMAGE_SIZE, slots, audit_rate, label=config["fast_model"])
+
+    image_size = int(config.get("image_size") or DEFAULT_REDUCED_SIZE)
+    fast = reduced_input_model(model, image_size)
+    return Cascade(fast, model, exit_threshold, image_size, slots, audit_rate, label=f"{image_size}px")
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Profil d'exécution CPU de TensorFlow (threads, workers d'inférence)
+Les threads intra-op / inter-op ne peuvent être fixés qu'avant
+l'initialisation du runtime TensorFlow: chaque couple (intra, inter) est
+donc mesuré dans un sous-processus. Dans ce sous-processus, plusieurs
+clients concurrents (comme les threads Flask) appellent model.predict;
+le nombre d'inférences simultanées est limité par un sémaphore (workers)
+et chaque appel traite une image, comme une requête /recognize.
+
+Le profil retenu (meilleure latence p95, appliqué par l'API au démarrage)
+est enregistré dans api/cpu_profile.json (ou CPU_PROFILE). Un profil
+mesuré sur une autre machine (nombre de cœurs différent) est ignoré.
+
+Création au déploiement (render.yaml): le buildCommand lance
+`python api/cpu_profile.py --duration 2`, le fichier fait partie de
+l'image déployée. Si l'instance n'a pas le même nombre de cœurs que la
+machine de build, le profil est ignoré: CPU_AUTOTUNE=1 le mesure alors au
+démarrage (démarrage plus long), sinon l'API garde 1 worker.
+
+Usage:
+    python cpu_profile.py --model ../face.h5
+    python cpu_profile.py --intra 1 2 4 --inter 1 2 --workers 1 2 --duration 5
+    CPU_AUTOTUNE=1 python app.py      # mesure au démarrage si aucun profil valide
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PROFILE_FILE = os.environ.get("CPU_PROFILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cpu_profile.json"))
+IMAGE_SIZE = 224
+
+
+def available_cores():
+    """Cœurs utilisables par le processus (affinité / quota), sinon os.cpu_count()"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def host_fingerprint():
+    return {"cores": available_cores(), "machine": platform.machine(), "processor": platform.processor()}
+
+
+def default_grid(cores=None):
+    """Grille par défaut, réduite aux valeurs distinctes pour ce nombre de cœurs"""
+    cores = cores or available_cores()
+    distinct = lambda values: sorted({max(1, v) for v in values})
+    return {
+        "intra": distinct([1, cores // 2, cores]),
+        "inter": distinct([1, 2]),
+        "workers": distinct([1, 2, cores // 2]),
+    }
+
+
+def _probe(model_path, intra, inter, workers_list, clients, duration):
+    """Exécuté dans le sous-processus: mesure chaque nombre de workers pour ces threads"""
+    import numpy as np
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(intra)
+    tf.config.threading.set_inter_op_parallelism_threads(inter)
+
+    if model_path and os.path.exists(model_path):
+        model = tf.keras.models.load_model(model_path)
+    else:
+        # Même coût de calcul que le modèle servi, sans téléchargement
+        model = tf.keras.applications.MobileNetV2(input_shape=(IMAGE_SIZE, IMAGE_SIZE, 3), weights=None)
+
+    x = np.random.default_rng(0).random((1, IMAGE_SIZE, IMAGE_SIZE, 3), dtype=np.float32)
+    model.predict(x, verbose=0)  # compilation / échauffement
+    results = []
+    for workers in workers_list:
+        slots = threading.BoundedSemaphore(workers)
+        latencies = []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def client():
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                with slots:
+                    model.predict(x, verbose=0)
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+
+        threads = [threading.Thread(target=client) for _ in range(clients)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        latencies_ms = np.array(latencies) * 1000
+        results.append({
+            "intra": intra, "inter": inter, "workers": workers,
+            "requests": len(latencies),
+            "images_per_s": len(latencies) / elapsed,
+            "p50_ms": float(np.percentile(latencies_ms, 50)) if len(latencies) else None,
+            "p95_ms": float(np.percentile(latencies_ms, 95)) if len(latencies) else None,
+        })
+    return results
+
+
+def run_probe(model_path, intra, inter, workers, clients, duration):
+    """Lance la mesure d'un couple (intra, inter) dans un processus neuf"""
+    cmd = [
+        sys.executable, os.path.abspath(__file__), "--probe",
+        "--model", model_path or "", "--intra", str(intra), "--inter", str(inter),
+        "--workers", *map(str, workers),
+        "--clients", str(clients), "--duration", str(duration),
+    ]
+    env = dict(os.environ, TF_CPP_MIN_LOG_LEVEL="2")
+    completed = subprocess.run(cmd, capture_output=True, text=True, env=env)
+    if completed.returncode != 0:
+        logger.warning("⚠️ Mesure intra=%d inter=%d échouée: %s", intra, inter, completed.stderr.strip()[-300:])
+        return []
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def select_profile(results):
+    """serving: p95 minimal (à égalité, meilleur débit)"""
+    measured = [r for r in results if r["requests"]]
+    if not measured:
+        return None
+    return {"serving": min(measured, key=lambda r: (r["p95_ms"], -r["images_per_s"]))}
+
+
+def autotune(model_path=None, grid=None, clients=None, duration=5.0, profile_path=PROFILE_FILE):
+    """Mesure toute la grille et enregistre le profil retenu"""
+    grid = grid or default_grid()
+    clients = clients or max(4, 2 * available_cores())
+    results = []
+    for intra in grid["intra"]:
+        for inter in grid["inter"]:
+            logger.info("⏱️ Mesure intra=%d inter=%d (%d clients)...", intra, inter, clients)
+            results.extend(run_probe(model_path, intra, inter, grid["workers"], clients, duration))
+
+    selected = select_profile(results)
+    if selected is None:
+        raise RuntimeError("Aucune mesure réussie")
+    profile = {
+        "host": host_fingerprint(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "clients": clients,
+        "duration_s": duration,
+        **selected,
+        "results": results,
+    }
+    with open(profile_path, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2)
+    return profile
+
+
+def load_profile(profile_path=PROFILE_FILE):
+    """Profil enregistré s'il a été mesuré sur cette machine, sinon None"""
+    if not os.path.exists(profile_path):
+        return None
+    try:
+        with open(profile_path, "r", encoding="utf-8") as f:
+            profile = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if profile.get("host", {}).get("cores") != available_cores():
+        logger.warning("⚠️ Profil CPU mesuré sur une autre machine, ignoré: %s", profile_path)
+        return None
+    return profile
+
+
+def apply_profile(profile, mode="serving"):
+    """
+    Fixe les threads TensorFlow (avant tout calcul) et retourne l'entrée du
+    profil (workers). À appeler avant le chargement des modèles.
+    """
+    import tensorflow as tf
+
+    entry = profile[mode]
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(entry["intra"])
+        tf.config.threading.set_inter_op_parallelism_threads(entry["inter"])
+    except RuntimeError as e:
+        # Runtime déjà initialisé: les threads ne peuvent plus changer
+        logger.warning("⚠️ Threads TensorFlow non modifiables: %s", e)
+    logger.info("⚙️ Profil CPU (%s): intra=%d inter=%d workers=%d",
+                mode, entry["intra"], entry["inter"], entry["workers"])
+    return entry
+
+
+def main(argv=None):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+    parser = argparse.ArgumentParser(description='Autotuning CPU de TensorFlow (threads, workers)')
+    parser.add_argument('--model', default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'face.h5'),
+                        help='Modèle mesuré (MobileNetV2 aléatoire si absent)')
+    parser.add_argument('--intra', type=int, nargs='*', help='Threads intra-op à tester')
+    parser.add_argument('--inter', type=int, nargs='*', help='Threads inter-op à tester')
+    parser.add_argument('--workers', type=int, nargs='*', help='Inférences simultanées à tester')
+    parser.add_argument('--clients', type=int, help='Clients concurrents (défaut: 2 x cœurs, min 4)')
+    parser.add_argument('--duration', type=float, default=5.0, help='Secondes par mesure')
+    parser.add_argument('--output', default=PROFILE_FILE, help='Fichier du profil')
+    parser.add_argument('--probe', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    grid = default_grid()
+    for key in grid:
+        if getattr(args, key):
+            grid[key] = getattr(args, key)
+
+    if args.probe:
+        results = _probe(args.model, grid["intra"][0], grid["inter"][0], grid["workers"],
+                         args.clients or max(4, 2 * available_cores()), args.duration)
+        print(json.dumps(results))
+        return 0
+
+    logging.basicConfig(level=logging.INFO)
+    print('=' * 70)
+    print(f'AUTOTUNING CPU ({available_cores()} cœurs)')
+    print('=' * 70)
+    profile = autotune(args.model, grid, args.clients, args.duration, args.output)
+
+    print()
+    print(f'{"intra":>5} {"inter":>5} {"workers":>7} {"img/s":>8} {"p50 ms":>8} {"p95 ms":>8}')
+    for r in sorted(profile["results"], key=lambda r: r["p95_ms"] or 0):
+        print(f'{r["intra"]:>5} {r["inter"]:>5} {r["workers"]:>7} '
+              f'{r["images_per_s"]:>8.1f} {r["p50_ms"] or 0:>8.1f} {r["p95_ms"] or 0:>8.1f}')
+    print()
+    r = profile["serving"]
+    print(f'✅ serving: intra={r["intra"]} inter={r["inter"]} workers={r["workers"]} '
+          f'({r["images_per_s"]:.1f} img/s, p95 {r["p95_ms"]:.1f} ms)')
+    print(f'Profil: {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
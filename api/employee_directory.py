@@ -0,0 +1,123 @@
+"""
+Annuaire des employés servi par /employees
+Construit une seule fois depuis le dataset (dossiers face1/<personne>/ et
+index du store, hors doublons élagués) et les classes des modèles
+configurés, puis tenu à jour en mémoire:
+    add_image()   après un /register qui ajoute une image
+    set_model()   après un /train (classes du modèle, date d'entraînement)
+
+La réponse JSON est sérialisée une fois par version de l'annuaire; son ETag
+est le hash du contenu (stable entre redémarrages), ce qui permet aux
+clients qui interrogent /employees en boucle de recevoir des 304.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import threading
+from datetime import datetime
+
+from face_dataset import list_people, list_samples
+
+logger = logging.getLogger(__name__)
+
+
+def person_key(name):
+    """Clé d'une personne: dossier 'jered', classe 'jered' et /register 'Jered' désignent la même"""
+    return name.strip().lower()
+
+
+def display_name(name):
+    return name[:1].upper() + name[1:]
+
+
+def employee_id(name):
+    return "EMP_" + re.sub(r"[^A-Z0-9]+", "_", name.upper()).strip("_")
+
+
+class EmployeeDirectory:
+    """Index personne -> {images, modèles} gardé en mémoire, réponse sérialisée en cache"""
+
+    def __init__(self, dataset_path, model_specs):
+        self.dataset_path = dataset_path
+        self._models = {name: list(spec.classes) for name, spec in model_specs.items()}
+        self._trained_at = {}
+        self._people = None
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def _entry(self, people, name):
+        key = person_key(name)
+        if key not in people:
+            people[key] = {"label": name, "images": 0}
+        return people[key]
+
+    def _load(self):
+        if self._people is not None:
+            return self._people
+        people = {}
+        try:
+            names = list_people(self.dataset_path)
+            for path, label in list_samples(self.dataset_path, names):
+                self._entry(people, names[label])["images"] += 1
+        except OSError as e:
+            logger.warning("⚠️ Dataset illisible pour l'annuaire (%s): %s", self.dataset_path, e)
+        for classes in self._models.values():
+            for name in classes:
+                self._entry(people, name)
+        self._people = people
+        return people
+
+    def add_image(self, name, count=1):
+        """Image ajoutée par /register (déjà indexée dans le store)"""
+        with self._lock:
+            self._entry(self._load(), name)["images"] += count
+            self._snapshot = None
+
+    def set_model(self, model_name, classes, trained_at=None):
+        """Classes d'un modèle (ré)entraîné"""
+        with self._lock:
+            people = self._load()
+            self._models[model_name] = list(classes)
+            self._trained_at[model_name] = trained_at or datetime.now().isoformat()
+            for name in classes:
+                self._entry(people, name)
+            self._snapshot = None
+
+    def employees(self):
+        people = self._load()
+        recognized_by = {}
+        for model_name, classes in self._models.items():
+            for name in classes:
+                recognized_by.setdefault(person_key(name), []).append(model_name)
+        return [
+            {
+                "name": display_name(entry["label"]),
+                "employee_id": employee_id(entry["label"]),
+                "label": entry["label"],
+                "images": entry["images"],
+                "models": sorted(recognized_by.get(key, [])),
+                "recognizable": key in recognized_by,
+            }
+            for key, entry in sorted(people.items())
+        ]
+
+    def snapshot(self):
+        """(etag, corps JSON en bytes), recalculés seulement après une modification"""
+        with self._lock:
+            if self._snapshot is None:
+                employees = self.employees()
+                body = json.dumps({
+                    "success": True,
+                    "count": len(employees),
+                    "employees": employees,
+                    "models_trained_at": dict(sorted(self._trained_at.items())),
+                }, ensure_ascii=False, sort_keys=True).encode("utf-8")
+                self._snapshot = (hashlib.sha256(body).hexdigest()[:32], body)
+            return self._snapshot
+
+    def stats(self):
+        with self._lock:
+            people = self._load()
+            return {"people": len(people), "images": sum(e["images"] for e in people.values())}
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Logging à faible coût pour le chemin de reconnaissance
+- Les threads de requête ne font qu'empiler l'enregistrement (QueueHandler):
+  formatage et écriture se font dans un thread de fond (QueueListener).
+  L'enregistrement n'est pas formaté à l'empilage: les messages doivent
+  utiliser les arguments paresseux (logger.info("%s", x)), pas des f-strings.
+- File bornée: si la sortie ne suit pas, les enregistrements sont
+  abandonnés (et comptés) au lieu de bloquer les requêtes.
+- Champs structurés: extra={"fields": {...}} ajoutés en clé=valeur, ou
+  une ligne JSON par enregistrement (LOG_FORMAT=json).
+- Échantillonnage: request_logger() décide une fois par requête si ses
+  logs de détail sont émis (LOG_SAMPLE_RATE); sinon ce sont des no-op.
+
+Usage:
+    python fast_logging.py --benchmark 20000
+"""
+
+import argparse
+import atexit
+import io
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+
+DEFAULT_QUEUE_SIZE = 10000
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler sans formatage à l'empilage, qui abandonne au lieu de bloquer"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Le message est formaté par le thread de fond; seule la trace
+        # d'exception (liée à la pile courante) est figée ici
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class StructuredFormatter(logging.Formatter):
+    """Texte 'message clé=valeur' ou JSON, avec les champs de extra={'fields': ...}"""
+
+    def __init__(self, as_json=False):
+        super().__init__(TEXT_FORMAT)
+        self.as_json = as_json
+
+    def format(self, record):
+        fields = getattr(record, 'fields', None) or {}
+        if self.as_json:
+            payload = {
+                'time': self.formatTime(record),
+                'level': record.levelname,
+                'logger': record.name,
+                'message': record.getMessage(),
+                **fields,
+            }
+            if record.exc_text:
+                payload['exception'] = record.exc_text
+            return json.dumps(payload, ensure_ascii=False, default=str)
+        line = super().format(record)
+        if fields:
+            line += ' ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        return line
+
+
+def setup_logging(level=logging.INFO, as_json=False, queue_size=DEFAULT_QUEUE_SIZE, stream=None):
+    """Remplace les handlers racine par une file + thread d'écriture; retourne le handler de file"""
+    log_queue = queue.Queue(maxsize=queue_size)
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(StructuredFormatter(as_json))
+    listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+
+    handler = DroppingQueueHandler(log_queue)
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    listener.start()
+    atexit.register(_stop_listener, listener)
+    handler.listener = listener
+    return handler
+
+
+def _stop_listener(listener):
+    """Vide la file à l'arrêt (sans erreur si le listener est déjà arrêté)"""
+    if listener._thread is not None:
+        listener.stop()
+
+
+def _noop(*args, **kwargs):
+    pass
+
+
+class SampledLogger:
+    """Logs de détail d'une requête: émis pour une fraction `rate` des requêtes"""
+
+    def __init__(self, logger, sampled):
+        self.sampled = sampled
+        if sampled:
+            self.debug, self.info, self.warning = logger.debug, logger.info, logger.warning
+        else:
+            self.debug = self.info = self.warning = _noop
+
+
+def request_logger(logger, rate):
+    """Décision d'échantillonnage prise une fois pour toute la requête"""
+    return SampledLogger(logger, rate >= 1.0 or (rate > 0.0 and random.random() < rate))
+
+
+def _run_benchmark(requests):
+    """Coût par requête dans le thread appelant: ancien logging vs file + lazy + échantillonnage"""
+    import numpy as np
+    from PIL import Image
+
+    img = Image.new('RGB', (224, 224))
+    name, percentage = 'Jered', 97.53
+
+    def legacy_request(log):
+        # Reproduit l'ancien chemin: 5 lignes f-string synchrones + np.array pour le dtype
+        log.info("Décodage de l'image...")
+        log.info(f"Image redimensionnée: 224x224 - Mode: {img.mode}")
+        log.info(f"Image dtype: {np.array(img).dtype}")
+        log.info("Exécution du modèle...")
+        log.info(f"Prédiction: {name} - Confiance: {percentage}%")
+        log.info(f"✅ Reconnaissance réussie: {name}")
+
+    def fast_request(log, rate):
+        rlog = request_logger(log, rate)
+        rlog.info("Décodage de l'image")
+        rlog.info("Image redimensionnée: %dx%d mode=%s", 224, 224, img.mode)
+        rlog.info("Exécution du modèle")
+        log.info("Reconnaissance: %s (%.2f%%)", name, percentage, extra={'fields': {'model': 'default'}})
+
+    root = logging.getLogger()
+    saved_handlers, saved_level = list(root.handlers), root.level
+    results = {}
+    try:
+        # Ancien: handler synchrone (formatage + écriture dans le thread de requête)
+        for h in list(root.handlers):
+            root.removeHandler(h)
+        sync = logging.StreamHandler(io.StringIO())
+        sync.setFormatter(logging.Formatter(TEXT_FORMAT))
+        root.addHandler(sync)
+        root.setLevel(logging.INFO)
+        log = logging.getLogger('benchmark')
+        start = time.perf_counter()
+        for _ in range(requests):
+            legacy_request(log)
+        results['sync_fstrings'] = (time.perf_counter() - start) / requests
+
+        for label, rate in (('queue_lazy_all', 1.0), ('queue_lazy_sampled_1pct', 0.01)):
+            handler = setup_logging(logging.INFO, stream=io.StringIO(), queue_size=requests * 4 + 16)
+            start = time.perf_counter()
+            for _ in range(requests):
+                fast_request(log, rate)
+            results[label] = (time.perf_counter() - start) / requests
+            _stop_listener(handler.listener)
+    finally:
+        for h in list(root.handlers):
+            root.removeHandler(h)
+        for h in saved_handlers:
+            root.addHandler(h)
+        root.setLevel(saved_level)
+    return results
+
+
+def main(argv=None):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+    parser = argparse.ArgumentParser(description='Benchmark du logging du chemin de reconnaissance')
+    parser.add_argument('--benchmark', type=int, default=20000, help='Requêtes simulées')
+    args = parser.parse_args(argv)
+
+    print('=' * 70)
+    print(f'BENCHMARK LOGGING ({args.benchmark} requêtes, coût dans le thread de requête)')
+    print('=' * 70)
+    results = _run_benchmark(args.benchmark)
+    baseline = results['sync_fstrings']
+    for label, seconds in results.items():
+        print(f'{label:26s} {seconds * 1e6:8.2f} µs/requête  (x{baseline / seconds:5.1f})')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
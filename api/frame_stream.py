@@ -0,0 +1,196 @@
+"""
+Reconnaissance sur un flux continu d'images (/stream)
+Le client envoie une seule requête dont le corps est une suite de parties
+multipart (multipart/x-mixed-replace, comme un flux MJPEG), chacune avec
+son en-tête Content-Length; la réponse est un flux NDJSON poussé au fil
+des images. Pas de surcoût HTTP/JSON/base64 par image.
+
+Pour chaque image:
+    1. FrameGate: décodage JPEG réduit (DCT 1/8) en niveaux de gris 16x16,
+       différence moyenne avec la dernière image inférée; si l'image a à
+       peine changé, pas d'inférence (au plus max_skip images d'affilée)
+    2. sinon décodage 224x224 et inférence
+    3. IdentityTracker: un résultat n'est poussé que lorsque la même
+       identité est prédite sur `stable_frames` inférences consécutives
+"""
+
+import io
+import logging
+import time
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SIZE = 224
+MAX_HEADER_LINE = 1024
+MAX_FRAME_BYTES = 5 * 1024 * 1024
+
+
+def read_exact(stream, length):
+    chunks = []
+    while length > 0:
+        chunk = stream.read(length)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        length -= len(chunk)
+    return b''.join(chunks)
+
+
+def iter_multipart_frames(stream, boundary, max_frame_bytes=MAX_FRAME_BYTES):
+    """
+    Contenu de chaque partie d'un corps multipart lu au fil de l'eau.
+    Chaque partie doit annoncer sa taille (Content-Length): le corps de
+    l'image est lu d'un bloc, sans rechercher la frontière dans les données.
+    """
+    delimiter = b'--' + boundary.encode('latin-1')
+    while True:
+        line = stream.readline(MAX_HEADER_LINE)
+        if not line:
+            return
+        line = line.strip()
+        if not line:
+            continue
+        if line == delimiter + b'--':
+            return
+        if line != delimiter:
+            raise ValueError(f"Frontière multipart attendue, reçu: {line[:40]!r}")
+
+        headers = {}
+        while True:
+            header = stream.readline(MAX_HEADER_LINE)
+            if not header:
+                return
+            header = header.strip()
+            if not header:
+                break
+            key, _, value = header.partition(b':')
+            headers[key.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers[b'content-length'])
+        except (KeyError, ValueError):
+            raise ValueError("Chaque partie doit avoir un en-tête Content-Length")
+        if not 0 < length <= max_frame_bytes:
+            raise ValueError(f"Taille d'image invalide: {length} octets")
+
+        data = read_exact(stream, length)
+        if len(data) < length:
+            return  # flux interrompu par le client
+        yield data
+
+
+class FrameGate:
+    """Décide si une image a assez changé (miniature en niveaux de gris) pour relancer l'inférence"""
+
+    def __init__(self, size=16, threshold=4.0, max_skip=10):
+        self.size = size
+        self.threshold = threshold
+        self.max_skip = max_skip
+        self._reference = None
+        self._skipped = 0
+
+    def thumbnail(self, data):
+        img = Image.open(io.BytesIO(data))
+        if img.format == 'JPEG':
+            # Décodage à l'échelle 1/8 seulement: quelques centaines de µs
+            img.draft('L', (self.size * 2, self.size * 2))
+        return np.asarray(img.convert('L').resize((self.size, self.size), Image.BILINEAR), dtype=np.int16)
+
+    def check(self, thumbnail):
+        """(inférer?, différence moyenne 0-255 avec la dernière image inférée)"""
+        if self._reference is None:
+            diff = float('inf')
+        else:
+            diff = float(np.mean(np.abs(thumbnail - self._reference)))
+        if diff < self.threshold and self._skipped < self.max_skip:
+            self._skipped += 1
+            return False, diff
+        self._reference = thumbnail
+        self._skipped = 0
+        return True, diff
+
+
+class IdentityTracker:
+    """Identité stable: même prédiction sur `stable_frames` inférences consécutives"""
+
+    def __init__(self, stable_frames=3):
+        self.stable_frames = stable_frames
+        self.identity = None
+        self._candidate = None
+        self._confidences = []
+
+    def update(self, name, confidence):
+        """Retourne (nom, confiance moyenne) quand l'identité stable change, sinon None"""
+        if name != self._candidate:
+            self._candidate = name
+            self._confidences = []
+        self._confidences.append(confidence)
+        if len(self._confidences) >= self.stable_frames and name != self.identity:
+            self.identity = name
+            return name, float(np.mean(self._confidences[-self.stable_frames:]))
+        return None
+
+
+def decode_frame(data, image_size=IMAGE_SIZE):
+    img = Image.open(io.BytesIO(data))
+    if img.format == 'JPEG':
+        img.draft('RGB', (image_size, image_size))
+    return img.convert('RGB').resize((image_size, image_size))
+
+
+def recognize_frames(frames, classify, classes, threshold, gate, tracker):
+    """
+    Événements d'une session de flux:
+        {"event": "identity", ...}  identité stable (nom ou null si inconnu)
+        {"event": "error", ...}     image illisible (la session continue)
+        {"event": "end", ...}       statistiques de la session
+    classify(img) -> probabilités (une ligne par classe)
+    """
+    stats = {"frames": 0, "inferred": 0, "skipped": 0, "errors": 0}
+    inference_seconds = 0.0
+    start = time.perf_counter()
+    for data in frames:
+        stats["frames"] += 1
+        try:
+            infer, diff = gate.check(gate.thumbnail(data))
+            if not infer:
+                stats["skipped"] += 1
+                continue
+            img = decode_frame(data)
+        except Exception as e:
+            stats["errors"] += 1
+            yield {"event": "error", "frame": stats["frames"], "error": str(e)}
+            continue
+
+        inference_start = time.perf_counter()
+        probabilities = classify(img)
+        inference_seconds += time.perf_counter() - inference_start
+        stats["inferred"] += 1
+
+        index = int(np.argmax(probabilities))
+        confidence = float(probabilities[index])
+        name = classes[index] if confidence >= threshold else None
+        changed = tracker.update(name, confidence)
+        if changed is not None:
+            name, mean_confidence = changed
+            yield {
+                "event": "identity",
+                "frame": stats["frames"],
+                "success": name is not None,
+                "name": name or "Inconnu",
+                "employee_id": f"EMP_{name.upper()}" if name else None,
+                "confidence": mean_confidence,
+                "percentage": round(mean_confidence * 100, 2),
+            }
+
+    elapsed = time.perf_counter() - start
+    yield {
+        "event": "end",
+        **stats,
+        "identity": tracker.identity,
+        "seconds": round(elapsed, 3),
+        "inference_seconds": round(inference_seconds, 3),
+    }
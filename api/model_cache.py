@@ -0,0 +1,241 @@
+"""
+Cache LRU de modèles nommés (un modèle par site)
+Chaque modèle est décrit par un ModelSpec (chemin, classes, seuil) et n'est
+chargé qu'à la première requête qui le demande. Le cache garde les modèles
+les plus récemment utilisés tant que leur taille estimée tient dans le
+budget mémoire; au-delà, le moins récemment utilisé est libéré.
+Les objets dérivés d'un modèle (cascade) sont rattachés à son entrée
+(attach): leur taille compte dans le budget et ils sont libérés avec lui.
+
+Configuration (api/models.json ou MODELS_CONFIG, voir api/models.example.json):
+    {
+      "default": "site_a",
+      "models": {
+        "site_a": {"path": "face.h5", "classes": ["jered", "gracia", "Ben", "Leo"], "threshold": 0.5},
+        "site_b": {"path": "models/site_b.h5", "classes": ["Alice", "Bob"], "threshold": 0.6,
+                   "cascade": {"fast_model": "models/site_b_student.h5"}}
+      }
+    }
+Les chemins relatifs sont résolus par rapport au fichier de configuration.
+"cascade" (optionnel): premier étage rapide, voir cascade.py.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUDGET_MB = 512
+
+
+class ModelSpec:
+    """Description d'un modèle servi: fichier, classes (ordre = sorties), seuil et cascade optionnelle"""
+
+    def __init__(self, name, path, classes, threshold=0.5, cascade=None):
+        self.name = name
+        self.path = path
+        self.classes = list(classes)
+        self.threshold = float(threshold)
+        self.cascade = cascade
+
+    def to_dict(self):
+        return {"name": self.name, "path": self.path, "classes": self.classes, "threshold": self.threshold,
+                "cascade": self.cascade}
+
+
+def load_model_specs(config_path):
+    """Lit la configuration multi-modèles; retourne (specs par nom, nom par défaut)"""
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(config_path))
+    specs = {}
+    for name, entry in config.get("models", {}).items():
+        path = entry["path"]
+        if not os.path.isabs(path):
+            path = os.path.join(base_dir, path)
+        cascade = entry.get("cascade")
+        if cascade and cascade.get("fast_model") and not os.path.isabs(cascade["fast_model"]):
+            cascade = dict(cascade, fast_model=os.path.join(base_dir, cascade["fast_model"]))
+        specs[name] = ModelSpec(name, path, entry["classes"], entry.get("threshold", 0.5), cascade)
+    if not specs:
+        raise ValueError(f"Aucun modèle dans {config_path}")
+    default = config.get("default") or next(iter(specs))
+    if default not in specs:
+        raise ValueError(f"Modèle par défaut inconnu: {default}")
+    return specs, default
+
+
+def estimate_model_bytes(model, path=None):
+    """Taille mémoire estimée: poids float32, sinon taille du fichier"""
+    try:
+        return int(model.count_params()) * 4
+    except Exception:
+        return os.path.getsize(path) if path and os.path.exists(path) else 0
+
+
+class CachedModel:
+    """Modèle chargé + sa description + objets dérivés (attachments)"""
+
+    def __init__(self, spec, model, size_bytes, load_seconds):
+        self.spec = spec
+        self.model = model
+        self.size_bytes = size_bytes
+        self.load_seconds = load_seconds
+        self.attachments = {}
+
+    @property
+    def name(self):
+        return self.spec.name
+
+    @property
+    def classes(self):
+        return self.spec.classes
+
+    @property
+    def threshold(self):
+        return self.spec.threshold
+
+
+class ModelCache:
+    """
+    Cache LRU borné en mémoire.
+    loader(path) charge un modèle (tf.keras.models.load_model par défaut).
+    """
+
+    def __init__(self, specs, default=None, budget_bytes=DEFAULT_BUDGET_MB * 1024 * 1024,
+                 loader=None, estimator=estimate_model_bytes):
+        self.specs = dict(specs)
+        self.default = default or next(iter(self.specs), None)
+        self.budget_bytes = budget_bytes
+        self._loader = loader
+        self._estimator = estimator
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._stats = {"hits": 0, "loads": 0, "evictions": 0, "errors": 0, "load_seconds": 0.0}
+        self._per_model = {}
+
+    def _load(self, path):
+        if self._loader is None:
+            import tensorflow as tf
+            self._loader = tf.keras.models.load_model
+        return self._loader(path)
+
+    def resolve(self, name=None):
+        """Nom effectif (défaut si absent); KeyError si inconnu"""
+        name = name or self.default
+        if name not in self.specs:
+            raise KeyError(name)
+        return name
+
+    def _count(self, name, field, value=1):
+        self._stats[field] += value
+        per_model = self._per_model.setdefault(name, {"hits": 0, "loads": 0, "evictions": 0, "errors": 0})
+        if field in per_model:
+            per_model[field] += value
+
+    def get(self, name=None):
+        """Modèle demandé (chargé si besoin); None si le fichier est absent ou illisible"""
+        name = self.resolve(name)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                self._entries.move_to_end(name)
+                self._count(name, "hits")
+                return entry
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        # Un seul chargement par modèle, sans bloquer les requêtes sur les autres
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(name)
+                if entry is not None:
+                    self._entries.move_to_end(name)
+                    self._count(name, "hits")
+                    return entry
+
+            spec = self.specs[name]
+            if not os.path.exists(spec.path):
+                logger.warning("⚠️ Modèle %s introuvable: %s", name, spec.path)
+                with self._lock:
+                    self._count(name, "errors")
+                return None
+
+            start = time.perf_counter()
+            try:
+                model = self._load(spec.path)
+            except Exception as e:
+                logger.error("❌ Erreur chargement modèle %s: %s", name, e)
+                with self._lock:
+                    self._count(name, "errors")
+                return None
+            elapsed = time.perf_counter() - start
+            entry = CachedModel(spec, model, self._estimator(model, spec.path), elapsed)
+            logger.info("✅ Modèle %s chargé en %.2fs (%.1f MB)", name, elapsed, entry.size_bytes / (1024 * 1024))
+
+            with self._lock:
+                self._count(name, "loads")
+                self._stats["load_seconds"] += elapsed
+                self._entries[name] = entry
+                self._evict(keep=name)
+            return entry
+
+    def peek(self, name):
+        """Modèle en cache sans le charger ni changer l'ordre LRU / les statistiques"""
+        with self._lock:
+            return self._entries.get(name)
+
+    def put(self, name, model):
+        """Remplace le modèle en cache (après un entraînement)"""
+        spec = self.specs[name]
+        entry = CachedModel(spec, model, self._estimator(model, spec.path), 0.0)
+        with self._lock:
+            self._entries[name] = entry
+            self._entries.move_to_end(name)
+            self._evict(keep=name)
+        return entry
+
+    def attach(self, entry, key, value, size_bytes=0):
+        """Rattache un objet dérivé à l'entrée; sa taille s'ajoute à celle du modèle"""
+        with self._lock:
+            entry.attachments[key] = value
+            entry.size_bytes += size_bytes
+            if self._entries.get(entry.name) is entry:
+                self._evict(keep=entry.name)
+        return value
+
+    def invalidate(self, name):
+        with self._lock:
+            self._entries.pop(name, None)
+
+    def _evict(self, keep):
+        """Libère les modèles les moins récents jusqu'à tenir dans le budget (appelé sous verrou)"""
+        total = sum(entry.size_bytes for entry in self._entries.values())
+        for name in list(self._entries):
+            if total <= self.budget_bytes:
+                break
+            if name == keep:
+                continue
+            total -= self._entries.pop(name).size_bytes
+            self._count(name, "evictions")
+            logger.info("♻️ Modèle %s libéré (budget %.0f MB)", name, self.budget_bytes / (1024 * 1024))
+
+    def loaded(self):
+        with self._lock:
+            return list(self._entries)
+
+    def stats(self):
+        with self._lock:
+            requests = self._stats["hits"] + self._stats["loads"]
+            return {
+                **self._stats,
+                "hit_rate": self._stats["hits"] / requests if requests else 0.0,
+                "budget_mb": self.budget_bytes / (1024 * 1024),
+                "used_mb": sum(entry.size_bytes for entry in self._entries.values()) / (1024 * 1024),
+                "loaded": list(self._entries),
+                "models": {name: dict(counts) for name, counts in self._per_model.items()},
+            }
@@ -0,0 +1,123 @@
+"""
+Normalisation des images de /register en arrière-plan
+La requête ne fait que décoder le base64 et mettre l'image en file; un pool
+de threads oriente (EXIF), redimensionne en 224x224 et ré-encode en JPEG
+prêt pour l'entraînement. L'original peut être conservé à part (cold storage).
+"""
+
+import io
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SIZE = 224
+JPEG_QUALITY = 95
+MAX_TRACKED_JOBS = 1000
+
+
+def normalize_image(image_data, image_size=IMAGE_SIZE):
+    """Orientation EXIF + RGB + 224x224 (même redimensionnement que l'entraînement)"""
+    img = Image.open(io.BytesIO(image_data))
+    if img.format == 'JPEG':
+        # Décodage réduit: une photo de téléphone n'a pas besoin de tous ses pixels
+        img.draft('RGB', (image_size * 2, image_size * 2))
+    img = ImageOps.exif_transpose(img)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    return img.resize((image_size, image_size))
+
+
+class RegistrationWorker:
+    """Pool de normalisation des visages enregistrés, avec suivi d'état par job"""
+
+    def __init__(self, max_workers=2, image_size=IMAGE_SIZE, originals_dir=None):
+        self.image_size = image_size
+        self.originals_dir = originals_dir
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='register')
+        self._jobs = OrderedDict()
+        self._pending = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def submit(self, name, image_data, filepath, on_done=None, key=None):
+        """
+        Met une image en file; retourne l'identifiant du job.
+        Un job en cours avec la même clé (même contenu) est réutilisé.
+        """
+        with self._lock:
+            if key is not None and key in self._in_flight:
+                return self._in_flight[key]
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {"status": "queued", "name": name, "path": filepath}
+            while len(self._jobs) > MAX_TRACKED_JOBS:
+                self._jobs.popitem(last=False)
+            if key is not None:
+                self._in_flight[key] = job_id
+        future = self._pool.submit(self._process, job_id, name, image_data, filepath, on_done)
+        with self._lock:
+            self._pending[future] = key
+        future.add_done_callback(self._forget)
+        return job_id
+
+    def _forget(self, future):
+        with self._lock:
+            key = self._pending.pop(future, None)
+            self._in_flight.pop(key, None)
+
+    def _set(self, job_id, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def _process(self, job_id, name, image_data, filepath, on_done):
+        self._set(job_id, status="processing")
+        try:
+            if self.originals_dir:
+                original_dir = os.path.join(self.originals_dir, name)
+                os.makedirs(original_dir, exist_ok=True)
+                stem = os.path.splitext(os.path.basename(filepath))[0]
+                with open(os.path.join(original_dir, stem + '.orig'), 'wb') as f:
+                    f.write(image_data)
+
+            img = normalize_image(image_data, self.image_size)
+
+            # Écriture atomique: /train ne doit jamais lire une image partielle
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            tmp_path = f'{filepath}.{job_id}.tmp'
+            img.save(tmp_path, format='JPEG', quality=JPEG_QUALITY)
+            os.replace(tmp_path, filepath)
+
+            logger.info("✅ Visage normalisé: %s", filepath)
+            if on_done is not None:
+                on_done(name, filepath)
+            self._set(job_id, status="done")
+        except Exception as e:
+            self._set(job_id, status="error", error=str(e))
+            logger.error("❌ Erreur normalisation %s: %s", filepath, e)
+
+    def status(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def drain(self, timeout=None):
+        """
+        Attend la fin des jobs en cours (avant un entraînement), timeout en
+        secondes pour l'ensemble des jobs. Retourne le nombre de jobs encore
+        en cours à l'échéance (0 si tout est terminé).
+        """
+        with self._lock:
+            futures = list(self._pending)
+        _, not_done = wait(futures, timeout=timeout)
+        return len(not_done)
@@ -0,0 +1,164 @@
+"""
+Maintien à chaud du modèle, dans le processus
+Toutes les `interval` secondes, une inférence synthétique (image noire
+224x224) passe par chaque modèle en cache: pages mémoire des poids et
+graphe restent chauds. Si toutes les places d'inférence sont prises, le
+tour est sauté (le trafic réel garde déjà le modèle chaud).
+
+La latence de cette inférence fixe sert de signal de dérive: médiane des
+dernières mesures comparée à la référence (médiane des premières mesures);
+un ratio > drift_threshold est signalé dans les logs et /health.
+
+Le ping HTTP externe (réveil Render free tier, qui ne voit que le trafic
+entrant) devient optionnel et a son propre intervalle.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SIZE = 224
+BASELINE_RUNS = 5
+
+
+class WarmKeeper:
+    """Thread de fond: inférence synthétique périodique + ping externe optionnel"""
+
+    def __init__(self, model_cache, interval=30.0, slots=None, ping_url=None, ping_interval=300.0,
+                 drift_threshold=2.0, window=20):
+        self.model_cache = model_cache
+        self.interval = interval
+        self.slots = slots
+        self.ping_url = ping_url
+        self.ping_interval = ping_interval
+        self.drift_threshold = drift_threshold
+        self._input = np.zeros((1, IMAGE_SIZE, IMAGE_SIZE, 3), dtype=np.float32)
+        self._latencies = {}
+        self._baselines = {}
+        self._window = window
+        self._runs = 0
+        self._skipped = 0
+        self._pings = 0
+        self._last_ping = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            logger.info("⚠️ Warm-keeper déjà actif")
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="warm-keeper", daemon=True)
+        self._thread.start()
+        ping = f"ping {self.ping_url} toutes les {self.ping_interval:.0f}s" if self.ping_url else "ping désactivé"
+        logger.info(f"✅ Warm-keeper lancé (inférence toutes les {self.interval:.0f}s, {ping})")
+
+    def stop(self):
+        self._stop.set()
+        logger.info("❌ Warm-keeper arrêté")
+
+    def _run(self):
+        next_warm = time.monotonic()
+        next_ping = time.monotonic() + self.ping_interval
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if now >= next_warm:
+                self.warm()
+                next_warm = now + self.interval
+            if self.ping_url and now >= next_ping:
+                self.ping()
+                next_ping = now + self.ping_interval
+            wake = min(next_warm, next_ping) if self.ping_url else next_warm
+            self._stop.wait(max(0.0, wake - time.monotonic()))
+
+    def warm(self):
+        """Une inférence synthétique par modèle chargé"""
+        for name in self.model_cache.loaded():
+            entry = self.model_cache.peek(name)
+            if entry is None:
+                continue
+            if self.slots is not None and not self.slots.acquire(blocking=False):
+                with self._lock:
+                    self._skipped += 1
+                continue
+            try:
+                start = time.perf_counter()
+                entry.model.predict(self._input, verbose=0)
+                latency_ms = (time.perf_counter() - start) * 1000
+            except Exception as e:
+                logger.warning(f"⚠️ Inférence de maintien échouée ({name}): {e}")
+                continue
+            finally:
+                if self.slots is not None:
+                    self.slots.release()
+            self._record(name, latency_ms)
+
+    def _record(self, name, latency_ms):
+        with self._lock:
+            self._runs += 1
+            latencies = self._latencies.setdefault(name, deque(maxlen=self._window))
+            latencies.append(latency_ms)
+            if name not in self._baselines and len(latencies) >= BASELINE_RUNS:
+                self._baselines[name] = float(np.median(latencies))
+            drift = self._drift(name)
+        if drift is not None and drift > self.drift_threshold:
+            logger.warning(f"⚠️ Dérive de latence {name}: {latency_ms:.1f} ms (x{drift:.1f} par rapport à la référence)")
+
+    def _drift(self, name):
+        baseline = self._baselines.get(name)
+        latencies = self._latencies.get(name)
+        if not baseline or not latencies:
+            return None
+        return float(np.median(latencies)) / baseline
+
+    def latency_ms(self, name):
+        """Latence médiane récente du modèle (inférence synthétique), None si jamais mesurée"""
+        with self._lock:
+            latencies = self._latencies.get(name)
+            return float(np.median(latencies)) if latencies else None
+
+    def ping(self):
+        """Requête externe (optionnelle) pour que l'hébergeur voie du trafic entrant"""
+        import requests
+
+        try:
+            start = time.time()
+            response = requests.get(f"{self.ping_url}/health", timeout=10)
+            elapsed = time.time() - start
+            with self._lock:
+                self._pings += 1
+                self._last_ping = {"status": response.status_code, "seconds": round(elapsed, 3),
+                                   "at": datetime.now().isoformat()}
+            status = "✅" if response.status_code == 200 else "⚠️"
+            logger.info(f"🔄 Ping #{self._pings}: {status} Status {response.status_code} ({elapsed:.2f}s)")
+        except Exception as e:
+            logger.warning(f"⚠️ Ping failed: {str(e)[:50]}")
+
+    def stats(self):
+        with self._lock:
+            models = {}
+            for name, latencies in self._latencies.items():
+                drift = self._drift(name)
+                models[name] = {
+                    "last_ms": round(latencies[-1], 2),
+                    "median_ms": round(float(np.median(latencies)), 2),
+                    "baseline_ms": round(self._baselines[name], 2) if name in self._baselines else None,
+                    "drift": round(drift, 2) if drift is not None else None,
+                }
+            return {
+                "interval_s": self.interval,
+                "runs": self._runs,
+                "skipped_busy": self._skipped,
+                "ping_url": self.ping_url,
+                "ping_interval_s": self.ping_interval if self.ping_url else None,
+                "pings": self._pings,
+                "last_ping": self._last_ping,
+                "models": models,
+            }
@@ -1,10 +1,25 @@
 #!/usr/bin/env python3
 """
 Convertir face.h5 en format TensorFlow.js
+Quantification optionnelle des poids (téléchargement mobile plus léger):
+    --quantize float16   ~2x plus petit
+    --quantize uint8     ~4x plus petit (affine par tenseur)
+--report compare float32 / float16 / uint8: taille des fichiers, temps de
+décodage des poids en Python et accord top-1 avec le modèle float sur les
+images de test de face1 (même découpage que l'entraînement).
+
+Usage:
+    python convert_to_tfjs.py
+    python convert_to_tfjs.py --quantize uint8 --report
 """
+import argparse
 import os
 import sys
 import json
+import tempfile
+import time
+
+import numpy as np
 
 try:
     from tensorflow import keras
@@ -14,43 +29,112 @@ except ImportError as e:
     print("Installez les dépendances: pip install tensorflow tensorflowjs")
     sys.exit(1)
 
-def convert_model():
+from face_dataset import open_or_pack
+from tfjs_weights import DEFAULT_SHARD_BYTES, read_weights
+
+QUANTIZATIONS = ('none', 'float16', 'uint8')
+DEFAULT_CLASSES = ['jered', 'gracia', 'Ben', 'Leo']
+
+
+def save_tfjs(model, output_dir, quantize='none'):
+    """Écrit le modèle TF.js (fichiers de 4 MB), poids quantifiés si demandé"""
+    os.makedirs(output_dir, exist_ok=True)
+    quantization_dtype_map = None if quantize == 'none' else {quantize: '*'}
+    tfjs.converters.save_keras_model(
+        model, output_dir,
+        quantization_dtype_map=quantization_dtype_map,
+        weight_shard_size_bytes=DEFAULT_SHARD_BYTES
+    )
+
+
+def weights_size(output_dir):
+    """Taille des fichiers de poids (octets)"""
+    with open(os.path.join(output_dir, 'model.json'), 'r') as f:
+        manifest = json.load(f)['weightsManifest']
+    return sum(os.path.getsize(os.path.join(output_dir, path)) for group in manifest for path in group['paths'])
+
+
+def decoded_model(model, output_dir):
+    """Modèle float avec les poids relus (et déquantifiés) depuis l'export TF.js"""
+    start = time.perf_counter()
+    weights = read_weights(output_dir)
+    decode_seconds = time.perf_counter() - start
+
+    expected = [tuple(w.shape) for w in model.weights]
+    if [tuple(array.shape) for _, array in weights] != expected:
+        raise ValueError("Poids TF.js dans un ordre différent du modèle Keras")
+    clone = keras.models.clone_model(model)
+    clone.set_weights([array for _, array in weights])
+    return clone, decode_seconds
+
+
+def held_out_images(dataset_path, classes, limit):
+    """Images de test de face1 (découpage 80/20 de l'entraînement), float32 / 255"""
+    dataset = open_or_pack(dataset_path, classes, os.path.normpath(dataset_path) + '_packed')
+    _, test_rows = dataset.split(test_size=0.2, seed=42)
+    # Sous-ensemble tiré au hasard (les lignes sont triées par classe)
+    rows = np.random.default_rng(0).permutation(test_rows)[:limit]
+    images = dataset.read(rows)
+    return images.astype(np.float32) / 255.0
+
+
+def quantization_report(model, output_dir, quantize, images):
+    """Compare les trois variantes; la variante choisie est déjà dans output_dir"""
+    reference = np.argmax(model.predict(images, batch_size=32, verbose=0), axis=1)
+    report = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for variant in QUANTIZATIONS:
+            variant_dir = output_dir if variant == quantize else os.path.join(tmp, variant)
+            if variant != quantize:
+                save_tfjs(model, variant_dir, variant)
+            clone, decode_seconds = decoded_model(model, variant_dir)
+            predictions = np.argmax(clone.predict(images, batch_size=32, verbose=0), axis=1)
+            report.append({
+                'quantization': variant,
+                'weights_bytes': weights_size(variant_dir),
+                'decode_seconds': round(decode_seconds, 4),
+                'top1_agreement': float(np.mean(predictions == reference)),
+            })
+    return report
+
+
+def convert_model(args):
     """Convertir le modèle Keras en TensorFlow.js"""
-    
+
     # Chemins
-    model_path = './face.h5'
-    output_dir = './assets/models/tfjs_model'
-    
+    model_path = args.model
+    output_dir = args.output
+
     print(f"📦 Chargement du modèle: {model_path}")
-    
+
     # Vérifier que le fichier existe
     if not os.path.exists(model_path):
         print(f"❌ Fichier non trouvé: {model_path}")
         return False
-    
+
     try:
         # Charger le modèle Keras
         model = keras.models.load_model(model_path)
         print(f"✅ Modèle chargé")
         print(f"📊 Architecture:")
         model.summary()
-        
+
         # Créer le répertoire de sortie
         os.makedirs(output_dir, exist_ok=True)
         print(f"📁 Répertoire de sortie: {output_dir}")
-        
+
         # Convertir en TensorFlow.js
-        print(f"🔄 Conversion en TensorFlow.js...")
-        tfjs.converters.save_keras_model(model, output_dir)
+        print(f"🔄 Conversion en TensorFlow.js (poids: {args.quantize})...")
+        save_tfjs(model, output_dir, args.quantize)
         print(f"✅ Conversion terminée!")
-        
+
         # Vérifier les fichiers créés
         files = os.listdir(output_dir)
         print(f"📄 Fichiers créés:")
         for f in files:
             size = os.path.getsize(os.path.join(output_dir, f))
             print(f"  - {f} ({size} bytes)")
-        
+
         # Lire et afficher le model.json
         model_json_path = os.path.join(output_dir, 'model.json')
         if os.path.exists(model_json_path):
@@ -61,9 +145,23 @@ def convert_model():
             print(f"  Generated by: {model_info.get('generatedBy')}")
             if 'modelTopology' in model_info:
                 print(f"  Topology: {model_info['modelTopology']['class_name']}")
-        
+
+        if args.report:
+            print(f"\n📊 Rapport de quantification ({args.dataset}, {args.samples} images de test max)...")
+            images = held_out_images(args.dataset, args.classes, args.samples)
+            report = quantization_report(model, output_dir, args.quantize, images)
+            baseline = report[0]['weights_bytes']
+            for row in report:
+                print(f"  {row['quantization']:8s} {row['weights_bytes'] / (1024 * 1024):7.2f} MB "
+                      f"({100 * row['weights_bytes'] / baseline:5.1f}%)  "
+                      f"décodage {row['decode_seconds'] * 1000:7.1f} ms  "
+                      f"accord top-1 {row['top1_agreement'] * 100:6.2f}%")
+            with open(args.report_file, 'w') as f:
+                json.dump({'model': model_path, 'images': int(len(images)), 'variants': report}, f, indent=2)
+            print(f"  Rapport: {args.report_file}")
+
         return True
-        
+
     except Exception as e:
         print(f"❌ Erreur lors de la conversion: {e}")
         import traceback
@@ -71,5 +169,16 @@ def convert_model():
         return False
 
 if __name__ == '__main__':
-    success = convert_model()
+    parser = argparse.ArgumentParser(description='Conversion du modèle en TensorFlow.js')
+    parser.add_argument('--model', default='./face.h5', help='Modèle Keras')
+    parser.add_argument('--output', default='./assets/models/tfjs_model', help='Dossier de sortie')
+    parser.add_argument('--quantize', choices=QUANTIZATIONS, default='none', help='Quantification des poids')
+    parser.add_argument('--report', action='store_true', help='Comparer float32 / float16 / uint8')
+    parser.add_argument('--report-file', default='tfjs_quantization_report.json', help='Rapport JSON')
+    parser.add_argument('--dataset', default='face1', help='Images de test pour l\'accord top-1')
+    parser.add_argument('--classes', nargs='*', default=DEFAULT_CLASSES, help='Personnes (ordre = sorties du modèle)')
+    parser.add_argument('--samples', type=int, default=500, help='Images de test max')
+    args = parser.parse_args()
+
+    success = convert_model(args)
     sys.exit(0 if success else 1)
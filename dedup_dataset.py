@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Détection des quasi-doublons du dataset (rafales, copies _d{i} du rebalancing)
+- Hash perceptuel 64 bits de chaque image (pHash DCT ou dHash), calculé en
+  parallèle et mis en cache (chemin, taille, mtime -> hash)
+- Recherche des paires à distance de Hamming <= rayon par multi-index
+  hashing: le hash est coupé en rayon + 1 morceaux, deux hashes proches
+  partagent forcément un morceau identique (principe des tiroirs). Seuls
+  les hashes d'un même seau sont comparés, jamais les n² paires.
+- Clusters par union-find, rapport, et manifeste élagué optionnel
+  (<dataset>/dedup.json, respecté par face_dataset.list_samples)
+
+Usage:
+    python dedup_dataset.py --dataset face1
+    python dedup_dataset.py --dataset face1 --radius 6 --write-manifest
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+import numpy as np
+from PIL import Image
+
+from face_dataset import DEDUP_FILE, list_people, list_samples
+
+HASH_CACHE_FILE = '.phash_cache.jsonl'
+DEFAULT_RADIUS = 5
+# Cellules max d'une matrice de distances par bloc (x 8 octets, ~32 MB)
+MAX_BLOCK_CELLS = 1 << 22
+
+# Matrice DCT-II 32x32 (pHash)
+_N = 32
+_DCT = np.sqrt(2.0 / _N) * np.cos(np.pi * (2 * np.arange(_N)[None, :] + 1) * np.arange(_N)[:, None] / (2 * _N))
+_DCT[0] /= np.sqrt(2.0)
+_POPCOUNT8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def _gray(path, size):
+    """Image en niveaux de gris redimensionnée à size (largeur, hauteur)"""
+    img = Image.open(path)
+    # Décodage JPEG réduit: le hash n'a besoin que de quelques pixels
+    img.draft('L', (size[0] * 4, size[1] * 4))
+    return np.asarray(img.convert('L').resize(size, Image.Resampling.BILINEAR), dtype=np.float64)
+
+
+def phash(path):
+    """pHash: signe des 8x8 basses fréquences DCT (hors DC) par rapport à la médiane"""
+    pixels = _gray(path, (_N, _N))
+    coeffs = (_DCT @ pixels @ _DCT.T)[:8, :8].ravel()
+    bits = coeffs > np.median(coeffs[1:])
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def dhash(path):
+    """dHash: gradient horizontal sur une image 9x8"""
+    pixels = _gray(path, (9, 8))
+    bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+HASHES = {'phash': phash, 'dhash': dhash}
+
+
+def popcount64(values):
+    """Nombre de bits à 1 de chaque uint64 (vectorisé)"""
+    values = np.ascontiguousarray(values, dtype=np.uint64)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    return _POPCOUNT8[values.view(np.uint8)].reshape(values.shape + (8,)).sum(axis=-1)
+
+
+def _hash_task(task):
+    key, path, method = task
+    try:
+        return key, path, HASHES[method](path)
+    except Exception:
+        return key, path, None
+
+
+def compute_hashes(images, cache_path, method, workers):
+    """Hash de chaque image; seules les images nouvelles ou modifiées sont recalculées"""
+    cache = {}
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get('method') == method:
+                    cache[record['key']] = record['hash']
+
+    keys = []
+    for path in images:
+        st = os.stat(path)
+        keys.append(f'{path}|{st.st_size}|{int(st.st_mtime)}')
+
+    todo = [(k, p, method) for k, p in zip(keys, images) if k not in cache]
+    if todo:
+        with Pool(workers) as pool, open(cache_path, 'a', encoding='utf-8') as f:
+            for key, path, value in pool.imap_unordered(_hash_task, todo, chunksize=64):
+                if value is None:
+                    print(f'  Erreur: {path}')
+                    continue
+                cache[key] = value
+                f.write(json.dumps({'key': key, 'method': method, 'hash': value}) + '\n')
+
+    kept = [(p, cache[k]) for k, p in zip(keys, images) if k in cache]
+    return [p for p, _ in kept], np.array([h for _, h in kept], dtype=np.uint64), len(todo)
+
+
+class MultiIndexHash:
+    """
+    Index multi-morceaux pour la recherche à distance de Hamming <= radius.
+    Chaque hash 64 bits est coupé en radius + 1 morceaux contigus.
+    """
+
+    def __init__(self, hashes, radius=DEFAULT_RADIUS):
+        self.hashes = np.asarray(hashes, dtype=np.uint64)
+        self.radius = radius
+        chunks = radius + 1
+        bounds = np.linspace(0, 64, chunks + 1).astype(int)
+        self.slices = list(zip(bounds[:-1], bounds[1:]))
+
+    def _chunk(self, lo, hi):
+        mask = np.uint64((1 << (hi - lo)) - 1)
+        return (self.hashes >> np.uint64(lo)) & mask
+
+    def pairs(self, max_cells=MAX_BLOCK_CELLS):
+        """Toutes les paires (i, j), i < j, à distance <= radius"""
+        found = set()
+        for lo, hi in self.slices:
+            values = self._chunk(lo, hi)
+            order = np.argsort(values, kind='stable')
+            sorted_values = values[order]
+            starts = np.flatnonzero(np.r_[True, sorted_values[1:] != sorted_values[:-1]])
+            ends = np.r_[starts[1:], len(order)]
+
+            for start, end in zip(starts, ends):
+                if end - start < 2:
+                    continue
+                members = order[start:end]
+                bucket = self.hashes[members]
+                # Comparaison vectorisée à l'intérieur du seau, par blocs de
+                # lignes: block x taille du seau <= max_cells, même pour un gros seau
+                block = max(1, max_cells // len(members))
+                for b in range(0, len(members), block):
+                    dist = popcount64(bucket[b:b + block, None] ^ bucket[None, :])
+                    ii, jj = np.nonzero(dist <= self.radius)
+                    ii = ii + b
+                    keep = ii < jj
+                    for i, j in zip(members[ii[keep]], members[jj[keep]]):
+                        found.add((int(min(i, j)), int(max(i, j))))
+        return found
+
+
+def clusters_from_pairs(n, pairs):
+    """Union-find: regroupe les paires en clusters (taille >= 2)"""
+    parent = list(range(n))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in pairs:
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+
+    groups = {}
+    for i in range(n):
+        groups.setdefault(find(i), []).append(i)
+    return [members for members in groups.values() if len(members) > 1]
+
+
+def representative(paths):
+    """Image gardée d'un cluster: pas une copie _d{i}, puis la plus lourde (meilleure qualité)"""
+    def score(path):
+        stem = os.path.splitext(os.path.basename(path))[0]
+        is_copy = '_d' in stem and stem.rsplit('_d', 1)[1].isdigit()
+        return (is_copy, -os.path.getsize(path), path)
+    return min(paths, key=score)
+
+
+def main(argv=None):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+    parser = argparse.ArgumentParser(description='Détection des quasi-doublons (hash perceptuel)')
+    parser.add_argument('--dataset', default='face1', help='Dataset (un dossier par personne)')
+    parser.add_argument('--method', choices=sorted(HASHES), default='phash', help='Hash perceptuel')
+    parser.add_argument('--radius', type=int, default=DEFAULT_RADIUS, help='Distance de Hamming max')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Processus de hash')
+    parser.add_argument('--top', type=int, default=10, help='Clusters affichés')
+    parser.add_argument('--write-manifest', action='store_true',
+                        help=f'Écrire <dataset>/{DEDUP_FILE} (un représentant par cluster et par personne)')
+    args = parser.parse_args(argv)
+
+    print('=' * 70)
+    print(f'DETECTION DES QUASI-DOUBLONS ({args.method}, rayon {args.radius})')
+    print('=' * 70)
+    print()
+
+    # Dossiers et store; le manifeste précédent est ignoré pour tout réévaluer
+    samples = list_samples(args.dataset, list_people(args.dataset), apply_dedup=False)
+    images = [path for path, _ in samples]
+    labels = dict(samples)
+
+    start = time.perf_counter()
+    paths, hashes, computed = compute_hashes(
+        images, os.path.join(args.dataset, HASH_CACHE_FILE), args.method, args.workers
+    )
+    t_hash = time.perf_counter() - start
+    print(f'1️⃣ Hash: {len(paths)} images ({computed} calculees, {t_hash:.1f}s)')
+
+    start = time.perf_counter()
+    pairs = MultiIndexHash(hashes, args.radius).pairs()
+    clusters = clusters_from_pairs(len(paths), pairs)
+    t_index = time.perf_counter() - start
+    print(f'2️⃣ Index: {len(pairs)} paires proches, {len(clusters)} clusters ({t_index:.1f}s)')
+
+    redundant = sum(len(c) - 1 for c in clusters)
+    cross_class = [c for c in clusters if len({labels[paths[i]] for i in c}) > 1]
+
+    print()
+    print('=' * 70)
+    print('RAPPORT')
+    print('=' * 70)
+    print(f'Images dans un cluster: {sum(len(c) for c in clusters)}')
+    print(f'Images redondantes: {redundant} ({100 * redundant / max(1, len(paths)):.1f}%)')
+    if cross_class:
+        print(f'⚠️ Clusters entre personnes differentes (labels suspects): {len(cross_class)}')
+
+    print()
+    for members in sorted(clusters, key=len, reverse=True)[:args.top]:
+        rep = representative([paths[i] for i in members])
+        print(f'  {len(members)} images - garde {os.path.relpath(rep, args.dataset)}')
+
+    if args.write_manifest:
+        # Un représentant par personne dans chaque cluster: un cluster entre
+        # personnes différentes ne doit pas faire disparaître une personne
+        removed = {}
+        for members in clusters:
+            by_label = {}
+            for i in members:
+                by_label.setdefault(labels[paths[i]], []).append(paths[i])
+            for cluster_paths in by_label.values():
+                rep = representative(cluster_paths)
+                for path in cluster_paths:
+                    if path != rep:
+                        removed[os.path.relpath(path, args.dataset)] = os.path.relpath(rep, args.dataset)
+
+        manifest_path = os.path.join(args.dataset, DEDUP_FILE)
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'method': args.method,
+                'radius': args.radius,
+                'clusters': len(clusters),
+                'removed': removed,
+            }, f, indent=2)
+        print()
+        print(f'✅ Manifeste elague: {manifest_path} ({len(removed)} images exclues de l\'entrainement)')
+
+    print('=' * 70)
+
+
+if __name__ == '__main__':
+    main()
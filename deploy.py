@@ -2,13 +2,26 @@
 """
 Déploiement du modèle face.h5 sur l'application React Native
 Crée les fichiers TensorFlow.js manualmente
+Poids écrits en flux, par fichiers de 4 MB (group1-shardXofN.bin), avec
+le manifeste complet (noms, formes, dtypes) dans model.json.
+--shard-mb 0: un seul model.weights.bin (modèle embarqué via require())
+--quantize float16|uint8: poids quantifiés (voir convert_to_tfjs.py --report)
 """
 
+import argparse
 import tensorflow as tf
 import json
-import numpy as np
 from pathlib import Path
 
+from tfjs_weights import write_weight_shards
+
+parser = argparse.ArgumentParser(description="Déploiement du modèle TensorFlow.js")
+parser.add_argument("--model", default="api/face.h5", help="Modèle Keras")
+parser.add_argument("--output", default="assets/models", help="Dossier de sortie")
+parser.add_argument("--shard-mb", type=float, default=4, help="Taille des fichiers de poids (0 = un seul fichier)")
+parser.add_argument("--quantize", choices=["none", "float16", "uint8"], default="none", help="Quantification des poids")
+args = parser.parse_args()
+
 print("=" * 70)
 print("🚀 DÉPLOIEMENT DU MODÈLE face.h5 SUR L'APPLICATION")
 print("=" * 70)
@@ -17,7 +30,7 @@ print()
 try:
     # Charger le modèle H5
     print("📥 Chargement du modèle face.h5...")
-    model_path = Path('api/face.h5')
+    model_path = Path(args.model)
     model = tf.keras.models.load_model(model_path)
     print("✅ Modèle chargé")
     print()
@@ -31,7 +44,7 @@ try:
     print()
     
     # Créer le répertoire de sortie
-    output_dir = Path("assets/models")
+    output_dir = Path(args.output)
     output_dir.mkdir(parents=True, exist_ok=True)
     print(f"📁 Répertoire: {output_dir}")
     print()
@@ -42,6 +55,17 @@ try:
     print("✅ Configuration extraite")
     print()
     
+    # Écrire les poids en flux (un tenseur à la fois, fichiers de --shard-mb)
+    print("📝 Écriture des poids...")
+    weights_manifest = write_weight_shards(
+        model.weights, output_dir, shard_bytes=int(args.shard_mb * 1024 * 1024),
+        quantization=None if args.quantize == "none" else args.quantize
+    )
+    bin_paths = [output_dir / name for name in weights_manifest[0]["paths"]]
+    bin_size_mb = sum(path.stat().st_size for path in bin_paths) / (1024 * 1024)
+    print(f"✅ {len(weights_manifest[0]['weights'])} tenseurs, {len(bin_paths)} fichier(s) ({bin_size_mb:.2f} MB)")
+    print()
+    
     # Créer le fichier model.json
     print("📝 Création de model.json...")
     
@@ -50,12 +74,7 @@ try:
         "generatedBy": "TensorFlow.js Converter",
         "convertedBy": "face-recognition-deployment",
         "modelTopology": model_config,
-        "weightsManifest": [
-            {
-                "paths": ["model.weights.bin"],
-                "weights": []
-            }
-        ]
+        "weightsManifest": weights_manifest
     }
     
     # Sauvegarder model.json
@@ -67,34 +86,12 @@ try:
     print(f"✅ model.json créé ({json_size_kb:.2f} KB)")
     print()
     
-    # Créer le fichier model.weights.bin
-    print("📝 Création de model.weights.bin...")
-    
-    # Obtenir tous les poids
-    weights = model.get_weights()
-    
-    # Concatener tous les poids en bytes
-    weights_bytes = b""
-    for w in weights:
-        # Convertir en float32 et en bytes
-        w_float32 = w.astype(np.float32)
-        weights_bytes += w_float32.tobytes()
-    
-    # Sauvegarder
-    bin_path = output_dir / "model.weights.bin"
-    with open(bin_path, "wb") as f:
-        f.write(weights_bytes)
-    
-    bin_size_mb = bin_path.stat().st_size / (1024 * 1024)
-    print(f"✅ model.weights.bin créé ({bin_size_mb:.2f} MB)")
-    print()
-    
     # Vérifier les fichiers
     print("✅ Vérification des fichiers...")
     print()
     
     files_ok = True
-    for file in [json_path, bin_path]:
+    for file in [json_path] + bin_paths:
         if file.exists():
             size = file.stat().st_size
             if size > 0:
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Distillation hors ligne du modèle servi (face.h5) vers un élève plus petit
+- Professeur: face.h5 (MobileNetV2 alpha 1.0 + tête 256), prédit une seule
+  fois sur tout le dataset packé; les probabilités sont mises en cache à
+  côté du dataset (clé: hash du professeur + empreinte du dataset)
+- Élève: MobileNetV2 alpha 0.35 (par défaut), entrée réduite optionnelle
+  (--image-size 160: redimensionnement dans le modèle, l'interface reste
+  224x224x3 [0, 1] pour l'API et l'app), poids aléatoires: aucun
+  téléchargement ImageNet, uniquement les images locales de face1
+- Perte: (1 - λ) CE(labels) + λ T² CE(softmax(professeur / T), softmax(élève / T))
+- Rapport: taille, latence (1 image) et accuracy professeur vs élève,
+  accord top-1 élève/professeur sur les images de test
+
+Usage:
+    python distill_model.py --teacher face.h5 --dataset face1
+    python distill_model.py --alpha 0.35 --image-size 128 --epochs 40 --output face_student.h5
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from face_dataset import IMAGE_SIZE, load_sampling_policy, open_or_pack
+from face_training import DEFAULT_PATIENCE, best_epoch, checkpoint_dir, training_callbacks
+
+DEFAULT_CLASSES = ['jered', 'gracia', 'Ben', 'Leo']
+MOBILENET_ALPHAS = (0.35, 0.5, 0.75, 1.0, 1.3, 1.4)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def teacher_probabilities(teacher, dataset, teacher_sha256, batch_size=64):
+    """Probabilités du professeur pour chaque ligne du dataset packé (calculées une fois)"""
+    cache_path = os.path.join(dataset.path, f'teacher_{teacher_sha256[:12]}_{dataset.fingerprint[:12]}.npy')
+    if os.path.exists(cache_path):
+        print(f'♻️ Soft labels en cache: {cache_path}')
+        return np.load(cache_path)
+
+    probs = np.zeros((len(dataset.labels), len(dataset.classes)), dtype=np.float32)
+    rows = dataset.rows
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        probs[batch] = teacher.predict(dataset.read(batch).astype(np.float32) / 255.0, verbose=0)
+    np.save(cache_path, probs)
+    print(f'✅ Soft labels calculés: {cache_path}')
+    return probs
+
+
+def soften(probs, temperature):
+    """softmax(log p / T): distribution du professeur adoucie"""
+    logits = np.log(np.clip(probs, 1e-8, 1.0)) / temperature
+    logits -= logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return (exp / exp.sum(axis=1, keepdims=True)).astype(np.float32)
+
+
+def build_student(num_classes, alpha, image_size):
+    """MobileNetV2 réduit, poids aléatoires; retourne (modèle d'entraînement -> logits, modèle servi -> softmax)"""
+    import tensorflow as tf
+
+    inputs = tf.keras.Input((IMAGE_SIZE, IMAGE_SIZE, 3))
+    x = inputs
+    if image_size != IMAGE_SIZE:
+        x = tf.keras.layers.Resizing(image_size, image_size)(x)
+    x = tf.keras.layers.Rescaling(2.0, offset=-1.0)(x)  # [0, 1] -> [-1, 1] (convention MobileNetV2)
+    base = tf.keras.applications.MobileNetV2(
+        input_shape=(image_size, image_size, 3), alpha=alpha, include_top=False, weights=None
+    )
+    x = base(x)
+    x = tf.keras.layers.GlobalAveragePooling2D()(x)
+    x = tf.keras.layers.Dropout(0.2)(x)
+    logits = tf.keras.layers.Dense(num_classes, name='logits')(x)
+    outputs = tf.keras.layers.Softmax()(logits)
+    return tf.keras.Model(inputs, logits), tf.keras.Model(inputs, outputs)
+
+
+def distillation_loss(num_classes, temperature, soft_weight):
+    """y_true = [one-hot | soft labels du professeur à T], y_pred = logits de l'élève"""
+    import tensorflow as tf
+
+    def loss(y_true, logits):
+        hard, soft = y_true[:, :num_classes], y_true[:, num_classes:]
+        hard_loss = tf.keras.losses.categorical_crossentropy(hard, logits, from_logits=True)
+        soft_loss = tf.keras.losses.categorical_crossentropy(soft, logits / temperature, from_logits=True)
+        return (1.0 - soft_weight) * hard_loss + soft_weight * temperature ** 2 * soft_loss
+
+    return loss
+
+
+def hard_accuracy(num_classes):
+    import tensorflow as tf
+
+    def accuracy(y_true, logits):
+        return tf.cast(tf.equal(tf.argmax(y_true[:, :num_classes], axis=1), tf.argmax(logits, axis=1)), tf.float32)
+
+    return accuracy
+
+
+def distillation_dataset(dataset, rows, soft, batch_size, shuffle, seed=None, balance=None):
+    """Lots (x, [one-hot | soft]) lus depuis le memmap"""
+    import tensorflow as tf
+
+    num_classes = len(dataset.classes)
+    epoch = [0]
+
+    def generator():
+        epoch_seed = None if seed is None else seed + epoch[0]
+        epoch[0] += 1
+        epoch_rows = rows if balance is None else dataset.balanced_rows(rows, balance, epoch_seed)
+        if shuffle:
+            epoch_rows = np.random.default_rng(epoch_seed).permutation(epoch_rows)
+        for start in range(0, len(epoch_rows), batch_size):
+            batch = epoch_rows[start:start + batch_size]
+            hard = np.eye(num_classes, dtype=np.float32)[dataset.labels[batch]]
+            yield dataset.read(batch).astype(np.float32) / 255.0, np.concatenate([hard, soft[batch]], axis=1)
+
+    return tf.data.Dataset.from_generator(
+        generator,
+        output_signature=(
+            tf.TensorSpec((None, IMAGE_SIZE, IMAGE_SIZE, 3), tf.float32),
+            tf.TensorSpec((None, 2 * num_classes), tf.float32),
+        ),
+    ).prefetch(tf.data.AUTOTUNE)
+
+
+def measure_latency(model, runs=50):
+    """Latence médiane (ms) d'une image, hors première exécution"""
+    x = np.random.default_rng(0).random((1, IMAGE_SIZE, IMAGE_SIZE, 3), dtype=np.float32)
+    model(x, training=False)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        model(x, training=False)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def predict_rows(model, dataset, rows, batch_size=64):
+    return np.concatenate([
+        model.predict(x, verbose=0) for x, _ in dataset.batches(rows, batch_size)
+    ]) if len(rows) else np.zeros((0, len(dataset.classes)), dtype=np.float32)
+
+
+def main(argv=None):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+    parser = argparse.ArgumentParser(description='Distillation du modèle vers un élève MobileNetV2 réduit')
+    parser.add_argument('--teacher', default='face.h5', help='Modèle professeur (Keras)')
+    parser.add_argument('--dataset', default='face1', help='Dataset (un dossier par personne)')
+    parser.add_argument('--classes', nargs='*', default=DEFAULT_CLASSES, help='Personnes (ordre = sorties du professeur)')
+    parser.add_argument('--alpha', type=float, choices=MOBILENET_ALPHAS, default=0.35, help='Largeur MobileNetV2 de l\'élève')
+    parser.add_argument('--image-size', type=int, choices=(96, 128, 160, 192, 224), default=IMAGE_SIZE,
+                        help='Résolution interne de l\'élève')
+    parser.add_argument('--temperature', type=float, default=4.0, help='Température des soft labels')
+    parser.add_argument('--soft-weight', type=float, default=0.7, help='Poids λ de la perte de distillation')
+    parser.add_argument('--epochs', type=int, default=30, help='Epochs max (arrêt anticipé sur val_loss)')
+    parser.add_argument('--patience', type=int, default=DEFAULT_PATIENCE, help='Epochs sans amélioration avant arrêt')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--output', default='face_student.h5', help='Modèle élève (sortie softmax, entrée 224x224)')
+    parser.add_argument('--report', default='distill_report.json', help='Rapport JSON')
+    args = parser.parse_args(argv)
+
+    import tensorflow as tf
+
+    print('=' * 70)
+    print(f'DISTILLATION - élève MobileNetV2 alpha {args.alpha}, {args.image_size}px')
+    print('=' * 70)
+    print()
+
+    if not os.path.exists(args.teacher):
+        print(f'❌ Professeur introuvable: {args.teacher}')
+        return 1
+
+    dataset = open_or_pack(args.dataset, args.classes, os.path.normpath(args.dataset) + '_packed')
+    train_rows, test_rows = dataset.split(test_size=0.2, seed=42)
+    num_classes = len(args.classes)
+    print(f'1️⃣ Dataset: {len(train_rows)} train, {len(test_rows)} test')
+
+    teacher = tf.keras.models.load_model(args.teacher)
+    teacher_sha256 = file_sha256(args.teacher)
+    probs_key = teacher_sha256[:12]
+    probs = teacher_probabilities(teacher, dataset, teacher_sha256)
+    soft = soften(probs, args.temperature)
+
+    student, serving = build_student(num_classes, args.alpha, args.image_size)
+    student.compile(
+        optimizer=tf.keras.optimizers.Adam(1e-3),
+        loss=distillation_loss(num_classes, args.temperature, args.soft_weight),
+        metrics=[hard_accuracy(num_classes)],
+    )
+    print(f'2️⃣ Élève: {serving.count_params():,} paramètres (professeur: {teacher.count_params():,})')
+
+    train_data = distillation_dataset(dataset, train_rows, soft, args.batch_size, shuffle=True, seed=42,
+                                      balance=load_sampling_policy(args.dataset))
+    test_data = distillation_dataset(dataset, test_rows, soft, args.batch_size, shuffle=False)
+
+    # Reprise automatique d'une distillation interrompue (même configuration)
+    backup_dir = checkpoint_dir(dataset.path, 'student', teacher=probs_key, alpha=args.alpha,
+                                image_size=args.image_size, temperature=args.temperature,
+                                soft_weight=args.soft_weight, batch_size=args.batch_size)
+    callbacks, resumed = training_callbacks(backup_dir, patience=args.patience)
+    print(f'3️⃣ Entraînement ({args.epochs} epochs max, T={args.temperature}, λ={args.soft_weight})'
+          f'{" - reprise" if resumed else ""}...')
+    start = time.perf_counter()
+    history = student.fit(train_data, validation_data=test_data, epochs=args.epochs, callbacks=callbacks, verbose=2)
+    train_seconds = time.perf_counter() - start
+    kept_epoch, _ = best_epoch(history)
+    print(f'   Poids retenus: epoch {kept_epoch} ({len(history.epoch)} epochs exécutées)')
+
+    serving.save(args.output)
+    print(f'✅ Élève sauvegardé: {args.output}')
+
+    # Compromis taille / latence / accuracy
+    y_test = dataset.labels[test_rows]
+    teacher_pred = np.argmax(probs[test_rows], axis=1)
+    student_pred = np.argmax(predict_rows(serving, dataset, test_rows), axis=1)
+    rows = {
+        'teacher': {
+            'path': args.teacher,
+            'params': int(teacher.count_params()),
+            'size_bytes': os.path.getsize(args.teacher),
+            'latency_ms': measure_latency(teacher),
+            'accuracy': float(np.mean(teacher_pred == y_test)) if len(y_test) else None,
+        },
+        'student': {
+            'path': args.output,
+            'alpha': args.alpha,
+            'image_size': args.image_size,
+            'params': int(serving.count_params()),
+            'size_bytes': os.path.getsize(args.output),
+            'latency_ms': measure_latency(serving),
+            'accuracy': float(np.mean(student_pred == y_test)) if len(y_test) else None,
+            'agreement_with_teacher': float(np.mean(student_pred == teacher_pred)) if len(y_test) else None,
+            'train_seconds': round(train_seconds, 1),
+            'epochs_run': len(history.epoch),
+            'best_epoch': kept_epoch,
+        },
+    }
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump({'classes': args.classes, 'test_images': int(len(test_rows)),
+                   'temperature': args.temperature, 'soft_weight': args.soft_weight, **rows}, f, indent=2)
+
+    print()
+    print('=' * 70)
+    print('RAPPORT')
+    print('=' * 70)
+    for name, row in rows.items():
+        accuracy = f'{row["accuracy"] * 100:.2f}%' if row['accuracy'] is not None else 'n/a'
+        print(f'{name:8s} {row["params"]:>11,} params  {row["size_bytes"] / (1024 * 1024):7.2f} MB  '
+              f'{row["latency_ms"]:7.2f} ms/image  accuracy {accuracy}')
+    agreement = rows['student']['agreement_with_teacher']
+    if agreement is not None:
+        print(f'Accord top-1 élève/professeur: {agreement * 100:.2f}%')
+    print(f'Rapport: {args.report}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Évaluation hors ligne d'un modèle sur la partie test de face1
+- Même découpage que /train (dataset packé, test_size 0.2, seed 42)
+- Prédictions en grands lots, mises en cache par (hash du modèle, hash de
+  l'image): <dataset>_predictions/<sha du modèle>.npz. Seules les images
+  jamais vues par ce modèle sont prédites; si tout est en cache, TensorFlow
+  n'est même pas importé (changer --threshold est instantané).
+- Rapport calculé en une passe vectorisée: matrice de confusion,
+  précision / rappel / F1 par classe, et courbe en fonction du seuil
+  (taux d'acceptation, accuracy des acceptés, faux acceptés)
+
+Usage:
+    python evaluate_model.py --model face.h5 --dataset face1
+    python evaluate_model.py --threshold 0.7                 # instantané (cache)
+    python evaluate_model.py --split all --curve-csv seuils.csv
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from face_dataset import open_or_pack
+
+DEFAULT_CLASSES = ['jered', 'gracia', 'Ben', 'Leo']
+DEFAULT_THRESHOLD = 0.5
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def image_hashes(dataset, rows):
+    """Hash du contenu de chaque image packée (indépendant de sa position dans le dataset)"""
+    return np.array([hashlib.sha1(dataset.images[row].tobytes()).hexdigest() for row in rows], dtype='S40')
+
+
+class PredictionCache:
+    """Probabilités d'un modèle par hash d'image, dans un fichier .npz"""
+
+    def __init__(self, cache_dir, model_sha256):
+        self.path = os.path.join(cache_dir, f'{model_sha256[:16]}.npz')
+        self.entries = {}
+        if os.path.exists(self.path):
+            with np.load(self.path) as data:
+                self.entries = dict(zip(data['hashes'].tolist(), data['probabilities']))
+
+    def lookup(self, hashes):
+        """(probabilités connues ou None, indices des images manquantes)"""
+        missing = [i for i, h in enumerate(hashes.tolist()) if h not in self.entries]
+        if missing:
+            return None, np.array(missing, dtype=np.int64)
+        return np.stack([self.entries[h] for h in hashes.tolist()]), missing
+
+    def update(self, hashes, probabilities):
+        self.entries.update(zip(hashes.tolist(), probabilities))
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp.npz'
+        np.savez(tmp_path, hashes=np.array(list(self.entries), dtype='S40'),
+                 probabilities=np.stack(list(self.entries.values())).astype(np.float32))
+        os.replace(tmp_path, self.path)
+
+
+def predict(model_path, dataset, rows, batch_size):
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(model_path)
+    outputs = []
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        outputs.append(model.predict(dataset.read(batch).astype(np.float32) / 255.0, verbose=0))
+    return np.concatenate(outputs)
+
+
+def confusion_matrix(y_true, y_pred, num_classes):
+    return np.bincount(y_true * num_classes + y_pred, minlength=num_classes * num_classes).reshape(num_classes, num_classes)
+
+
+def per_class_metrics(confusion):
+    true_positives = np.diag(confusion).astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(confusion.sum(axis=0) > 0, true_positives / confusion.sum(axis=0), np.nan)
+        recall = np.where(confusion.sum(axis=1) > 0, true_positives / confusion.sum(axis=1), np.nan)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), np.nan)
+    return precision, recall, f1
+
+
+def threshold_curve(probabilities, y_true, thresholds):
+    """
+    Pour chaque seuil (une colonne): part des images acceptées (confiance >=
+    seuil), accuracy sur les acceptées, faux acceptés et bonnes réponses sur
+    l'ensemble. Calcul par diffusion (N images x T seuils), sans boucle.
+    """
+    confidence = probabilities.max(axis=1)
+    correct = probabilities.argmax(axis=1) == y_true
+    accepted = confidence[:, None] >= thresholds[None, :]
+    n_accepted = accepted.sum(axis=0)
+    n_correct = (accepted & correct[:, None]).sum(axis=0)
+    total = max(len(y_true), 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        accepted_accuracy = np.where(n_accepted > 0, n_correct / n_accepted, np.nan)
+    return {
+        'threshold': thresholds,
+        'acceptance_rate': n_accepted / total,
+        'accepted_accuracy': accepted_accuracy,
+        'false_accept_rate': (n_accepted - n_correct) / total,
+        'correct_rate': n_correct / total,
+    }
+
+
+def threshold_grid(threshold, step=0.05):
+    """
+    Seuils de la courbe (pas de `step`) + le seuil demandé, et l'indice de
+    ce dernier. Tout est arrondi une seule fois, par la même fonction, avant
+    de retirer les doublons (0.7000000000000001 et 0.7 ne font qu'un).
+    """
+    threshold = float(np.round(threshold, 4))
+    thresholds = np.unique(np.round(np.concatenate([np.arange(0.0, 1.0, step), [threshold]]), 4))
+    return thresholds, int(np.searchsorted(thresholds, threshold))
+
+
+def evaluate(probabilities, y_true, classes, thresholds):
+    y_pred = probabilities.argmax(axis=1)
+    confusion = confusion_matrix(y_true, y_pred, len(classes))
+    precision, recall, f1 = per_class_metrics(confusion)
+    return {
+        'images': int(len(y_true)),
+        'accuracy': float(np.mean(y_pred == y_true)) if len(y_true) else None,
+        'confusion': confusion,
+        'precision': precision,
+        'recall': recall,
+        'f1': f1,
+        'support': confusion.sum(axis=1),
+        'curve': threshold_curve(probabilities, y_true, thresholds),
+    }
+
+
+def _json_number(value):
+    value = float(value)
+    return None if np.isnan(value) else round(value, 6)
+
+
+def main(argv=None):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+    parser = argparse.ArgumentParser(description='Évaluation hors ligne avec cache de prédictions')
+    parser.add_argument('--model', default='face.h5', help='Modèle Keras à évaluer')
+    parser.add_argument('--dataset', default='face1', help='Dataset (un dossier par personne)')
+    parser.add_argument('--classes', nargs='*', default=DEFAULT_CLASSES, help='Personnes (ordre = sorties du modèle)')
+    parser.add_argument('--split', choices=('test', 'all'), default='test', help='Images évaluées (test = comme /train)')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='Seuil d\'acceptation (THRESHOLD de l\'API)')
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--cache-dir', help='Cache des prédictions (défaut: <dataset>_predictions)')
+    parser.add_argument('--report', default='evaluation_report.json', help='Rapport JSON')
+    parser.add_argument('--curve-csv', help='Courbe en fonction du seuil (CSV)')
+    args = parser.parse_args(argv)
+
+    print('=' * 70)
+    print(f'ÉVALUATION - {args.model}')
+    print('=' * 70)
+
+    if not os.path.exists(args.model):
+        print(f'❌ Modèle introuvable: {args.model}')
+        return 1
+
+    dataset = open_or_pack(args.dataset, args.classes, os.path.normpath(args.dataset) + '_packed')
+    rows = dataset.rows if args.split == 'all' else dataset.split(test_size=0.2, seed=42)[1]
+    y_true = dataset.labels[rows]
+
+    start = time.perf_counter()
+    model_sha256 = file_sha256(args.model)
+    hashes = image_hashes(dataset, rows)
+    cache = PredictionCache(args.cache_dir or os.path.normpath(args.dataset) + '_predictions', model_sha256)
+    probabilities, missing = cache.lookup(hashes)
+    if probabilities is None:
+        print(f'⏳ Prédiction de {len(missing)} / {len(rows)} images (lots de {args.batch_size})...')
+        cache.update(hashes[missing], predict(args.model, dataset, rows[missing], args.batch_size))
+        probabilities, _ = cache.lookup(hashes)
+    else:
+        print(f'♻️ {len(rows)} prédictions en cache: {cache.path}')
+    print(f'   {time.perf_counter() - start:.2f}s')
+
+    thresholds, at = threshold_grid(args.threshold)
+    report = evaluate(probabilities, y_true, args.classes, thresholds)
+    curve = report['curve']
+
+    print()
+    if report['accuracy'] is None:
+        print('❌ Aucune image à évaluer')
+        return 1
+    print(f'Images: {report["images"]} ({args.split})  -  Accuracy top-1: {report["accuracy"] * 100:.2f}%')
+    print()
+    print('Matrice de confusion (lignes = vraie classe, colonnes = prédiction)')
+    width = max(8, max(len(c) for c in args.classes) + 1)
+    print(' ' * width + ''.join(f'{c:>{width}}' for c in args.classes))
+    for name, line in zip(args.classes, report['confusion']):
+        print(f'{name:<{width}}' + ''.join(f'{v:>{width}}' for v in line))
+    print()
+    print(f'{"classe":<{width}} {"précision":>10} {"rappel":>8} {"F1":>8} {"images":>7}')
+    for i, name in enumerate(args.classes):
+        print(f'{name:<{width}} {report["precision"][i] * 100:>9.2f}% {report["recall"][i] * 100:>7.2f}% '
+              f'{report["f1"][i] * 100:>7.2f}% {report["support"][i]:>7}')
+    print()
+    print(f'{"seuil":>6} {"acceptés":>9} {"acc. acceptés":>14} {"faux acceptés":>14}')
+    for i, t in enumerate(thresholds):
+        marker = '  <- THRESHOLD' if i == at else ''
+        print(f'{t:>6.2f} {curve["acceptance_rate"][i] * 100:>8.2f}% {curve["accepted_accuracy"][i] * 100:>13.2f}% '
+              f'{curve["false_accept_rate"][i] * 100:>13.2f}%{marker}')
+
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump({
+            'model': args.model,
+            'model_sha256': model_sha256,
+            'split': args.split,
+            'classes': args.classes,
+            'images': report['images'],
+            'accuracy': report['accuracy'],
+            'threshold': args.threshold,
+            'at_threshold': {key: _json_number(values[at]) for key, values in curve.items()},
+            'confusion': report['confusion'].tolist(),
+            'per_class': {
+                name: {
+                    'precision': _json_number(report['precision'][i]),
+                    'recall': _json_number(report['recall'][i]),
+                    'f1': _json_number(report['f1'][i]),
+                    'support': int(report['support'][i]),
+                }
+                for i, name in enumerate(args.classes)
+            },
+            'curve': [{key: _json_number(values[i]) for key, values in curve.items()} for i in range(len(thresholds))],
+        }, f, indent=2)
+    if args.curve_csv:
+        with open(args.curve_csv, 'w', encoding='utf-8') as f:
+            f.write(','.join(curve) + '\n')
+            for i in range(len(thresholds)):
+                f.write(','.join(f'{curve[key][i]:.6f}' for key in curve) + '\n')
+    print()
+    print(f'Rapport: {args.report}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
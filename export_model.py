@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Export unifié du modèle pour tous les déploiements
+- Le modèle Keras est chargé une seule fois
+- SavedModel d'abord, puis les conversions TFLite (float, dynamic, int8)
+  en parallèle à partir du SavedModel, pendant que TF.js est écrit depuis
+  le modèle Keras
+- Chaque artefact est identifié par SHA-256(modèle source + options): un
+  artefact dont la clé n'a pas changé n'est pas reconverti (si tout est à
+  jour, TensorFlow n'est même pas importé)
+- Manifeste <output>/manifest.json: tailles, durées de conversion, clés.
+  Une conversion qui échoue n'empêche pas les autres; le manifeste est
+  écrit dans tous les cas avec les artefacts réussis
+- TF.js n'est produit que sur demande (--formats tfjs): il nécessite
+  `pip install tensorflowjs`, absent des requirements
+
+Regroupe en une commande les conversions faites séparément par les
+scripts convert_to_tflite, convert_to_tfjs.py et simple_convert.py.
+
+Usage:
+    python export_model.py --model face.h5 --output exports
+    python export_model.py --formats tflite_dynamic tfjs
+    python export_model.py --formats tflite_int8 --dataset face1 --calibration-samples 200
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from face_dataset import list_people, list_samples, load_image, sources_fingerprint
+from tfjs_weights import DEFAULT_SHARD_BYTES
+
+MANIFEST_FILE = 'manifest.json'
+
+# Nom -> (fichier ou dossier de sortie, quantification)
+ARTIFACTS = {
+    'saved_model': ('saved_model', None),
+    'tflite_float': ('face_float.tflite', None),
+    'tflite_dynamic': ('face_dynamic.tflite', 'dynamic'),
+    'tflite_int8': ('face_int8.tflite', 'int8'),
+    'tfjs': ('tfjs', None),
+}
+TFLITE_ARTIFACTS = ('tflite_float', 'tflite_dynamic', 'tflite_int8')
+# tensorflowjs est une dépendance optionnelle: tfjs seulement sur demande
+DEFAULT_FORMATS = sorted(name for name in ARTIFACTS if name != 'tfjs')
+
+
+def file_sha256(path):
+    """Hash du contenu du modèle source"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def artifact_key(source_sha256, name, options):
+    """Clé d'un artefact: modèle source + format + options de conversion"""
+    payload = json.dumps({'source': source_sha256, 'artifact': name, 'options': options}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def path_size(path):
+    """Taille d'un fichier ou d'un dossier (octets)"""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def load_manifest(output_dir):
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def _replace(tmp_path, path):
+    """Remplace path par tmp_path (fichier ou dossier) une fois l'écriture terminée"""
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+    os.replace(tmp_path, path)
+
+
+def calibration_samples(dataset_path, count, seed=42):
+    """Images du dataset pour la calibration int8 (et leur empreinte pour la clé de cache)"""
+    samples = list_samples(dataset_path, list_people(dataset_path))
+    random.Random(seed).shuffle(samples)
+    samples = samples[:count]
+    return [path for path, _ in samples], sources_fingerprint(samples)
+
+
+def export_saved_model(model, path):
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    if hasattr(model, 'export'):
+        model.export(tmp_path)
+    else:
+        import tensorflow as tf
+        tf.saved_model.save(model, tmp_path)
+    _replace(tmp_path, path)
+
+
+def convert_tflite(saved_model_dir, path, quantization, calibration_paths=None):
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_saved_model(saved_model_dir)
+    if quantization in ('dynamic', 'int8'):
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == 'int8':
+        def representative_dataset():
+            for image_path in calibration_paths:
+                # Même prétraitement que l'API: float32 / 255
+                yield [load_image(image_path)[None].astype(np.float32) / 255.0]
+
+        converter.representative_dataset = representative_dataset
+        # Poids et activations int8; entrée/sortie restent float32 (même interface que l'app)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+
+    tflite_model = converter.convert()
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(tflite_model)
+    _replace(tmp_path, path)
+
+
+def export_tfjs(model, path, quantization=None):
+    try:
+        import tensorflowjs as tfjs
+    except ImportError:
+        raise ImportError('tensorflowjs absent (pip install tensorflowjs)')
+
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    tfjs.converters.save_keras_model(
+        model, tmp_path,
+        quantization_dtype_map={quantization: '*'} if quantization else None,
+        weight_shard_size_bytes=DEFAULT_SHARD_BYTES
+    )
+    _replace(tmp_path, path)
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def _export(args, todo, paths, calibration_paths, seconds, errors):
+    """Produit les artefacts de `todo`; durées dans seconds, erreurs par artefact dans errors"""
+    # Un seul chargement du modèle pour tous les formats
+    import tensorflow as tf
+
+    print(f'📥 Chargement du modèle ({len(todo)} artefact(s) à produire)...')
+    start = time.perf_counter()
+    try:
+        model = tf.keras.models.load_model(args.model)
+    except Exception as e:
+        print(f'❌ Chargement impossible: {e}')
+        errors.update((name, f'chargement: {e}') for name in todo)
+        return
+    print(f'✅ Modèle chargé en {time.perf_counter() - start:.1f}s')
+    print()
+
+    def run(name, fn, *fn_args):
+        try:
+            seconds[name] = _timed(fn, *fn_args)
+            print(f'✅ {name} ({seconds[name]:.1f}s)')
+        except Exception as e:
+            errors[name] = str(e) or type(e).__name__
+            print(f'❌ {name}: {errors[name]}')
+
+    if 'saved_model' in todo:
+        run('saved_model', export_saved_model, model, paths['saved_model'])
+
+    # TFLite en parallèle (depuis le SavedModel), TF.js dans le thread principal
+    tflite_todo = [name for name in TFLITE_ARTIFACTS if name in todo]
+    if 'saved_model' in errors:
+        errors.update((name, 'SavedModel indisponible') for name in tflite_todo)
+        tflite_todo = []
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = [
+            pool.submit(run, name, convert_tflite, paths['saved_model'], paths[name],
+                        ARTIFACTS[name][1], calibration_paths)
+            for name in tflite_todo
+        ]
+        if 'tfjs' in todo:
+            run('tfjs', export_tfjs, model, paths['tfjs'], args.tfjs_quantize)
+        for future in futures:
+            future.result()
+
+
+def main(argv=None):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+    parser = argparse.ArgumentParser(description='Export du modèle (SavedModel, TFLite, TF.js) avec cache')
+    parser.add_argument('--model', default='face.h5', help='Modèle Keras source')
+    parser.add_argument('--output', default='exports', help='Dossier des artefacts')
+    parser.add_argument('--formats', nargs='*', choices=sorted(ARTIFACTS), default=DEFAULT_FORMATS,
+                        help='Artefacts à produire (défaut: tous sauf tfjs, qui demande tensorflowjs)')
+    parser.add_argument('--dataset', default='face1', help='Images de calibration (tflite_int8)')
+    parser.add_argument('--calibration-samples', type=int, default=100, help='Nombre d\'images de calibration')
+    parser.add_argument('--workers', type=int, default=min(3, os.cpu_count() or 1),
+                        help='Conversions TFLite en parallèle')
+    parser.add_argument('--tfjs-quantize', choices=('float16', 'uint8'),
+                        help='Poids TF.js quantifiés (voir convert_to_tfjs.py --report)')
+    parser.add_argument('--force', action='store_true', help='Tout reconvertir (ignorer le cache)')
+    args = parser.parse_args(argv)
+
+    print('=' * 70)
+    print('EXPORT DU MODELE')
+    print('=' * 70)
+    print()
+
+    if not os.path.exists(args.model):
+        print(f'❌ Modèle introuvable: {args.model}')
+        return 1
+    os.makedirs(args.output, exist_ok=True)
+
+    source_sha256 = file_sha256(args.model)
+    print(f'📦 Source: {args.model} ({source_sha256[:12]})')
+
+    # Options de chaque artefact demandé -> clé de cache
+    requested = set(args.formats)
+    if requested & set(TFLITE_ARTIFACTS):
+        requested.add('saved_model')  # source des conversions TFLite
+
+    calibration_paths = None
+    options = {}
+    for name in requested:
+        _, quantization = ARTIFACTS[name]
+        options[name] = {'quantization': args.tfjs_quantize if name == 'tfjs' else quantization}
+        if quantization == 'int8':
+            calibration_paths, fingerprint = calibration_samples(args.dataset, args.calibration_samples)
+            if not calibration_paths:
+                print(f'❌ Aucune image de calibration dans {args.dataset}')
+                return 1
+            options[name].update({'calibration': fingerprint, 'calibration_samples': len(calibration_paths)})
+
+    manifest = load_manifest(args.output)
+    previous = manifest.get('artifacts', {})
+    keys = {name: artifact_key(source_sha256, name, options[name]) for name in requested}
+    paths = {name: os.path.join(args.output, ARTIFACTS[name][0]) for name in requested}
+
+    todo = sorted(
+        name for name in requested
+        if args.force or previous.get(name, {}).get('key') != keys[name] or not os.path.exists(paths[name])
+    )
+    for name in sorted(requested - set(todo)):
+        print(f'♻️ {name}: à jour ({paths[name]})')
+
+    seconds = {}
+    errors = {}
+    try:
+        if todo:
+            _export(args, todo, paths, calibration_paths, seconds, errors)
+    finally:
+        # Manifeste: artefacts produits + artefacts encore valides, même après une erreur
+        artifacts = dict(previous)
+        for name in requested:
+            if name in seconds:
+                artifacts[name] = {
+                    'path': ARTIFACTS[name][0],
+                    'key': keys[name],
+                    'source_sha256': source_sha256,
+                    'options': options[name],
+                    'size_bytes': path_size(paths[name]),
+                    'seconds': round(seconds[name], 3),
+                    'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                }
+            elif name in errors:
+                # Artefact éventuellement périmé: ne plus le présenter comme à jour
+                artifacts.pop(name, None)
+        manifest = {'source': {'path': args.model, 'sha256': source_sha256}, 'artifacts': artifacts}
+        with open(os.path.join(args.output, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+    print()
+    print('=' * 70)
+    print('RESUME')
+    print('=' * 70)
+    for name in sorted(requested):
+        if name in errors:
+            print(f'{name:16s} ❌ {errors[name]}')
+            continue
+        entry = artifacts[name]
+        status = 'converti' if name in seconds else 'cache'
+        print(f'{name:16s} {entry["size_bytes"] / (1024 * 1024):8.2f} MB  {entry["seconds"]:7.1f}s  ({status})')
+    print(f'Manifeste: {os.path.join(args.output, MANIFEST_FILE)}')
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,163 +1,541 @@
+#!/usr/bin/env python3
+"""
+Extraction des visages - MTCNN (ou autre backend de face_detectors.py)
+Pipeline parallèle et reprenable en deux étapes:
+  1. detect: un détecteur par processus worker, les détections (boîtes,
+     confiances, keypoints) sont stockées dans un index sidecar indexé par
+     le hash du contenu de l'image. Une image déjà détectée n'est jamais
+     repassée dans MTCNN.
+     Un index par backend: changer de détecteur ne mélange pas les détections.
+  2. crop: lit l'index et génère les crops (padding, taille, règle de
+     sélection) sans relancer le détecteur.
+La détection tourne sur une copie réduite (décodage JPEG "draft"),
+le crop décode juste assez de pixels pour la taille de sortie.
+
+Usage:
+    python extract_faces.py --input face1_balanced --output face1_faces_only
+    python extract_faces.py --stage crop --padding 30 --size 160
+    python extract_faces.py --detector haar
+    python extract_faces.py --benchmark 50
+"""
+
+import argparse
+import hashlib
+import json
+import math
 import os
+import random
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool
+
 import numpy as np
-from mtcnn import MTCNN
 from PIL import Image
-import shutil
-from pathlib import Path
-
-# Fix encoding
-sys.stdout.reconfigure(encoding='utf-8')
-
-print('=' * 70)
-print('EXTRACTION DES VISAGES - MTCNN')
-print('=' * 70)
-
-# Initialiser le détecteur MTCNN
-detector = MTCNN()
-
-# Chemins
-dataset_path = r'c:\Users\HP\Music\machineL\face1_balanced'
-output_path = r'c:\Users\HP\Music\machineL\face1_faces_only'
-
-classes = ['Ben', 'gracia', 'Jered', 'Leo']
-
-print()
-print('1️⃣ Creer le dossier de sortie...')
-if os.path.exists(output_path):
-    shutil.rmtree(output_path)
-for person in classes:
-    os.makedirs(os.path.join(output_path, person), exist_ok=True)
-print(f'Dossier cree: {output_path}')
-
-print()
-print('2️⃣ Traitement des images...')
-print()
-
-total_processed = 0
-total_failed = 0
-total_skipped = 0
-
-for person in classes:
-    person_dir = os.path.join(dataset_path, person)
-    output_dir = os.path.join(output_path, person)
-    
-    images = [f for f in os.listdir(person_dir) if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
-    
-    print(f'{person}: {len(images)} images')
-    
-    processed = 0
-    failed = 0
+
+from face_detectors import DETECTORS, create_detector
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+OUTPUT_SIZE = (224, 224)
+PADDING = 20
+MANIFEST_NAME = 'manifest.jsonl'
+DETECTIONS_NAME = 'detections.jsonl'
+CROP_PARAMS_NAME = 'crop_params.json'
+# Hash du contenu source de chaque crop (image remplacée sous le même nom -> recroppée)
+CROP_SOURCES_NAME = 'crop_sources.json'
+# Côté le plus long de la copie utilisée pour la détection (0 = pleine résolution)
+DETECT_MAX_SIDE = 640
+KEYPOINT_NAMES = ('left_eye', 'right_eye', 'nose', 'mouth_left', 'mouth_right')
+
+# Règles de sélection du visage quand plusieurs sont détectés
+SELECTION_RULES = {
+    'largest': lambda face: face['box'][2] * face['box'][3],
+    'confident': lambda face: face['confidence'],
+}
+
+# Détecteur propre à chaque processus worker (initialisé par _init_worker)
+_detector = None
+_detect_max_side = DETECT_MAX_SIDE
+
+
+def _init_worker(detect_max_side=DETECT_MAX_SIDE, detector_name='mtcnn'):
+    """Initialise un détecteur par processus (jamais dans le parent)"""
+    global _detector, _detect_max_side
+    _detect_max_side = detect_max_side
+    # Un thread par worker: le parallélisme vient du pool de processus
+    _detector = create_detector(detector_name, threads=1)
+
+
+def open_for_detection(img_path, max_side=DETECT_MAX_SIDE):
+    """
+    Ouvre une image en RGB. Pour un JPEG, le décodage "draft" produit
+    directement une version réduite (>= max_side) sans décoder tous les pixels.
+    Retourne (image, taille originale).
+    """
+    img_pil = Image.open(img_path)
+    full_size = img_pil.size
+    if max_side and img_pil.format == 'JPEG':
+        img_pil.draft('RGB', (max_side, max_side))
+    if img_pil.mode != 'RGB':
+        img_pil = img_pil.convert('RGB')
+    return img_pil, full_size
+
+
+def detect_faces_scaled(detector, img_pil, full_size, max_side=DETECT_MAX_SIDE):
+    """
+    Détecte les visages sur une copie dont le côté le plus long est borné,
+    puis remet boîtes et keypoints dans les coordonnées de l'image originale.
+    """
+    det_img = img_pil
+    if max_side and max(img_pil.size) > max_side:
+        factor = max_side / max(img_pil.size)
+        det_size = (max(1, round(img_pil.width * factor)), max(1, round(img_pil.height * factor)))
+        det_img = img_pil.resize(det_size, Image.Resampling.BILINEAR)
+
+    sx = full_size[0] / det_img.width
+    sy = full_size[1] / det_img.height
+
+    detections = detector.detect_faces(np.asarray(det_img))
+    for face in detections:
+        x, y, width, height = face['box']
+        face['box'] = [round(x * sx), round(y * sy), round(width * sx), round(height * sy)]
+        face['keypoints'] = {
+            name: (round(px * sx), round(py * sy)) for name, (px, py) in face.get('keypoints', {}).items()
+        }
+    return detections
+
+
+def face_region(detections, full_size, padding=PADDING, select='largest'):
+    """
+    Région à cropper (x0, y0, x1, y1) en coordonnées originales:
+    le visage choisi par la règle de sélection avec padding, ou None sans détection.
+    """
+    if not detections:
+        return None
+
+    face = max(detections, key=SELECTION_RULES[select])
+    x, y, width, height = face['box']
+
+    # Ajouter padding pour avoir plus de contexte
+    x = max(0, x - padding)
+    y = max(0, y - padding)
+    width = min(full_size[0] - x, width + padding * 2)
+    height = min(full_size[1] - y, height + padding * 2)
+    return (x, y, x + width, y + height)
+
+
+def crop_region(img_pil, region, full_size, size=OUTPUT_SIZE):
+    """
+    Croppe la région (coordonnées originales) dans img_pil, qui peut être
+    une version réduite de l'image, puis redimensionne à la taille de sortie.
+    Sans région, retourne l'image entière redimensionnée.
+    """
+    if region is None:
+        return img_pil.resize(size, Image.Resampling.LANCZOS)
+
+    scale = img_pil.width / full_size[0]
+    box = tuple(round(v * scale) for v in region)
+    return img_pil.crop(box).resize(size, Image.Resampling.LANCZOS)
+
+
+def open_for_crop(img_path, region, full_size, size=OUTPUT_SIZE):
+    """
+    Ouvre l'image en décodant juste assez de pixels pour que la région
+    fasse au moins la taille de sortie (décodage "draft" pour les JPEG).
+    """
+    if region is None:
+        factor = max(size[0] / full_size[0], size[1] / full_size[1])
+    else:
+        factor = max(size[0] / max(1, region[2] - region[0]), size[1] / max(1, region[3] - region[1]))
+
+    img_pil = Image.open(img_path)
+    if factor < 1 and img_pil.format == 'JPEG':
+        img_pil.draft('RGB', (math.ceil(full_size[0] * factor), math.ceil(full_size[1] * factor)))
+    if img_pil.mode != 'RGB':
+        img_pil = img_pil.convert('RGB')
+    return img_pil
+
+
+def box_iou(a, b):
+    """IoU de deux régions (x0, y0, x1, y1)"""
+    ix = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def detections_path(output_path, detector_name):
+    """Index sidecar du backend (detections.jsonl pour MTCNN, le backend historique)"""
+    if detector_name == 'mtcnn':
+        return os.path.join(output_path, DETECTIONS_NAME)
+    return os.path.join(output_path, f'detections_{detector_name}.jsonl')
+
+
+def file_sha256(path):
+    """Hash du contenu d'une image (clé de l'index des détections)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def detection_record(digest, full_size, detections):
+    """Enregistrement compact de l'index sidecar pour une image"""
+    return {
+        'sha256': digest,
+        'size': list(full_size),
+        'boxes': [face['box'] for face in detections],
+        'confidences': [round(float(face['confidence']), 4) for face in detections],
+        'keypoints': [
+            [c for name in KEYPOINT_NAMES for c in face['keypoints'].get(name, (0, 0))]
+            for face in detections
+        ],
+    }
+
+
+def faces_from_record(record):
+    """Reconstruit les détections (format MTCNN) depuis l'index sidecar"""
+    faces = []
+    for box, confidence, points in zip(record['boxes'], record['confidences'], record['keypoints']):
+        faces.append({
+            'box': box,
+            'confidence': confidence,
+            'keypoints': {name: tuple(points[2 * i:2 * i + 2]) for i, name in enumerate(KEYPOINT_NAMES)},
+        })
+    return faces
+
+
+def detect_one(task):
+    """
+    Étape detect (dans un worker): retourne l'enregistrement de l'index
+    ou un enregistrement d'erreur.
+    """
+    digest, img_path = task
+    try:
+        img_pil, full_size = open_for_detection(img_path, _detect_max_side)
+        detections = detect_faces_scaled(_detector, img_pil, full_size, _detect_max_side)
+        return detection_record(digest, full_size, detections)
+    except Exception as e:
+        return {'sha256': digest, 'source': img_path, 'error': str(e)[:200]}
+
+
+def crop_one(task):
+    """
+    Étape crop (dans un worker, sans détecteur): retourne (sortie, status).
+    """
+    img_path, output_file, record, params = task
+    try:
+        full_size = tuple(record['size'])
+        detections = faces_from_record(record)
+        size = (params['size'], params['size'])
+        region = face_region(detections, full_size, params['padding'], params['select'])
+
+        img_pil = open_for_crop(img_path, region, full_size, size)
+        face_resized = crop_region(img_pil, region, full_size, size)
+
+        # Écriture atomique: une image partielle ne doit jamais être "faite";
+        # format de la source (un .png reste un vrai PNG)
+        tmp_file = output_file + '.tmp'
+        if output_file.lower().endswith('.png'):
+            face_resized.save(tmp_file, format='PNG')
+        else:
+            face_resized.save(tmp_file, format='JPEG', quality=95)
+        os.replace(tmp_file, output_file)
+        return output_file, 'face' if detections else 'no_face'
+    except Exception as e:
+        print(f'  Erreur {os.path.basename(img_path)}: {str(e)[:50]}')
+        return output_file, 'error'
+
+
+def source_key(img_path):
+    """Clé du manifeste: chemin + taille + mtime (une image modifiée est re-hashée)"""
+    st = os.stat(img_path)
+    return f'{img_path}|{st.st_size}|{int(st.st_mtime)}'
+
+
+def load_jsonl(path, key):
+    """Charge un fichier JSONL indexé par `key` (la dernière ligne peut être tronquée après un crash)"""
+    records = {}
+    if not os.path.exists(path):
+        return records
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if key in record:
+                records[record[key]] = record
+    return records
+
+
+def list_images(dataset_path, classes):
+    """Liste (personne, fichier, chemin) pour toutes les images du dataset"""
+    images = []
+    for person in classes:
+        person_dir = os.path.join(dataset_path, person)
+        files = sorted(f for f in os.listdir(person_dir) if f.lower().endswith(IMAGE_EXTENSIONS))
+        images += [(person, f, os.path.join(person_dir, f)) for f in files]
+    return images
+
+
+def hash_images(images, manifest_path, workers):
+    """
+    Associe chaque image à son hash de contenu. Le manifeste (chemin, taille,
+    mtime -> sha256) évite de relire les images inchangées.
+    """
+    manifest = load_jsonl(manifest_path, 'key')
+    keys = [source_key(path) for _, _, path in images]
+    hashes = [manifest[k]['sha256'] if k in manifest else None for k in keys]
+
+    todo = [i for i, h in enumerate(hashes) if h is None]
+    if todo:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool, \
+                open(manifest_path, 'a', encoding='utf-8') as f:
+            for i, digest in zip(todo, pool.map(file_sha256, [images[i][2] for i in todo])):
+                hashes[i] = digest
+                f.write(json.dumps({'key': keys[i], 'sha256': digest}) + '\n')
+    return hashes, len(todo)
+
+
+def run_detect(images, hashes, index_path, args):
+    """Étape detect: passe dans MTCNN uniquement les contenus absents de l'index"""
+    index = load_jsonl(index_path, 'sha256')
+    tasks = {}
+    for (_, _, path), digest in zip(images, hashes):
+        if digest not in index and digest not in tasks:
+            tasks[digest] = path
+    tasks = list(tasks.items())
+
+    print(f'Deja detectees: {len(set(hashes)) - len(tasks)} - A detecter: {len(tasks)}')
+    errors = 0
+    start = time.perf_counter()
+
+    if tasks:
+        with open(index_path, 'a', encoding='utf-8') as f, \
+                Pool(args.workers, initializer=_init_worker, initargs=(args.detect_max_side, args.detector)) as pool:
+            for i, record in enumerate(pool.imap_unordered(detect_one, tasks, chunksize=args.chunksize), 1):
+                if 'error' in record:
+                    errors += 1
+                    print(f"  Erreur {os.path.basename(record['source'])}: {record['error'][:50]}")
+                else:
+                    index[record['sha256']] = record
+                    f.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+                # Progress
+                if i % 100 == 0:
+                    f.flush()
+                    rate = i / (time.perf_counter() - start)
+                    print(f'  Detecte: {i}/{len(tasks)} ({rate:.1f} images/s)')
+
+    elapsed = time.perf_counter() - start
+    if tasks:
+        print(f'  Detection: {elapsed:.1f}s ({len(tasks) / elapsed:.1f} images/s), erreurs: {errors}')
+    return index
+
+
+def run_crop(images, hashes, index, args):
+    """Étape crop: génère les visages depuis l'index, sans détecteur"""
+    params = {'padding': args.padding, 'size': args.size, 'select': args.select, 'detector': args.detector}
+    params_path = os.path.join(args.output, CROP_PARAMS_NAME)
+    sources_path = os.path.join(args.output, CROP_SOURCES_NAME)
+    same_params = False
+    if os.path.exists(params_path) and not args.force:
+        with open(params_path, 'r', encoding='utf-8') as f:
+            same_params = json.load(f) == params
+    sources = {}
+    if same_params and os.path.exists(sources_path):
+        with open(sources_path, 'r', encoding='utf-8') as f:
+            sources = json.load(f)
+
+    tasks = []
+    task_digests = {}
     skipped = 0
-    
-    for i, img_file in enumerate(images):
-        img_path = os.path.join(person_dir, img_file)
-        
-        try:
-            # Charger l'image avec PIL
-            img_pil = Image.open(img_path)
-            if img_pil.mode != 'RGB':
-                img_pil = img_pil.convert('RGB')
-            
-            img_array = np.array(img_pil)
-            
-            # Detecter les visages
-            detections = detector.detect_faces(img_array)
-            
-            if len(detections) == 0:
-                # Pas de visage trouve - garder l'image entiere redimensionnee
-                face_resized = img_pil.resize((224, 224), Image.Resampling.LANCZOS)
-                output_file = os.path.join(output_dir, img_file)
-                face_resized.save(output_file, quality=95)
-                skipped += 1
-            
-            elif len(detections) == 1:
-                # Un visage trouve - cropper
-                face = detections[0]
-                x, y, width, height = face['box']
-                
-                # Ajouter padding pour avoir plus de contexte
-                padding = 20
-                x = max(0, x - padding)
-                y = max(0, y - padding)
-                width = min(img_array.shape[1] - x, width + padding * 2)
-                height = min(img_array.shape[0] - y, height + padding * 2)
-                
-                # Cropper le visage
-                face_crop = img_pil.crop((x, y, x + width, y + height))
-                
-                # Redimensionner a 224x224
-                face_resized = face_crop.resize((224, 224), Image.Resampling.LANCZOS)
-                
-                # Sauvegarder
-                output_file = os.path.join(output_dir, img_file)
-                face_resized.save(output_file, quality=95)
-                
-                processed += 1
-            
-            else:
-                # Plusieurs visages - prendre le plus grand
-                face = max(detections, key=lambda x: x['box'][2] * x['box'][3])
-                x, y, width, height = face['box']
-                
-                # Ajouter padding
-                padding = 20
-                x = max(0, x - padding)
-                y = max(0, y - padding)
-                width = min(img_array.shape[1] - x, width + padding * 2)
-                height = min(img_array.shape[0] - y, height + padding * 2)
-                
-                # Cropper et redimensionner
-                face_crop = img_pil.crop((x, y, x + width, y + height))
-                face_resized = face_crop.resize((224, 224), Image.Resampling.LANCZOS)
-                
-                # Sauvegarder
-                output_file = os.path.join(output_dir, img_file)
-                face_resized.save(output_file, quality=95)
-                
-                processed += 1
-        
-        except Exception as e:
-            failed += 1
-            print(f'  Erreur {img_file}: {str(e)[:50]}')
-        
-        # Progress
-        if (i + 1) % 100 == 0:
-            print(f'  Traite: {i + 1}/{len(images)}')
-    
-    print(f'  Succes: {processed}')
-    if skipped > 0:
-        print(f'  Pas de visage: {skipped} (image redimensionnee)')
-    if failed > 0:
-        print(f'  Erreurs: {failed}')
+    for (person, img_file, path), digest in zip(images, hashes):
+        if digest not in index:
+            continue
+        output_dir = os.path.join(args.output, person)
+        os.makedirs(output_dir, exist_ok=True)
+        output_file = os.path.join(output_dir, img_file)
+        relative = f'{person}/{img_file}'
+        # Crop à jour seulement si mêmes paramètres ET même contenu source
+        if same_params and sources.get(relative) == digest and os.path.exists(output_file):
+            skipped += 1
+            continue
+        sources.pop(relative, None)
+        task_digests[output_file] = (relative, digest)
+        tasks.append((path, output_file, index[digest], params))
+
+    print(f'Deja croppees: {skipped} - A cropper: {len(tasks)} (padding={args.padding}, '
+          f'taille={args.size}, selection={args.select})')
+
+    counts = {'face': 0, 'no_face': 0, 'error': 0}
+    start = time.perf_counter()
+    if tasks:
+        with Pool(args.workers) as pool:
+            for output_file, status in pool.imap_unordered(crop_one, tasks, chunksize=max(args.chunksize, 32)):
+                counts[status] += 1
+                if status != 'error':
+                    relative, digest = task_digests[output_file]
+                    sources[relative] = digest
+
+    # Les paramètres et les hash sources ne sont enregistrés qu'une fois tous les crops écrits
+    with open(sources_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(sources, f)
+    os.replace(sources_path + '.tmp', sources_path)
+    with open(params_path, 'w', encoding='utf-8') as f:
+        json.dump(params, f)
+
+    elapsed = time.perf_counter() - start
+    if tasks:
+        print(f'  Crop: {elapsed:.1f}s ({len(tasks) / elapsed:.1f} images/s)')
+    return counts, skipped
+
+
+def run_benchmark(dataset_path, classes, n_images, max_side, detector_name='mtcnn'):
+    """
+    Compare la détection pleine résolution et la détection réduite:
+    temps par image et IoU des régions croppées.
+    """
+    images = [path for _, _, path in list_images(dataset_path, classes)]
+    random.Random(42).shuffle(images)
+    images = images[:n_images]
+
+    _init_worker(max_side, detector_name)
+    times = {'full': [], 'scaled': []}
+    ious = []
+
+    for img_path in images:
+        regions = {}
+        for mode, side in (('full', 0), ('scaled', max_side)):
+            start = time.perf_counter()
+            img_pil, full_size = open_for_detection(img_path, side)
+            detections = detect_faces_scaled(_detector, img_pil, full_size, side)
+            regions[mode] = face_region(detections, full_size)
+            img_pil = open_for_crop(img_path, regions[mode], full_size) if side else img_pil
+            crop_region(img_pil, regions[mode], full_size)
+            times[mode].append(time.perf_counter() - start)
+
+        if regions['full'] is not None and regions['scaled'] is not None:
+            ious.append(box_iou(regions['full'], regions['scaled']))
+        elif (regions['full'] is None) != (regions['scaled'] is None):
+            ious.append(0.0)
+
+    full_ms = 1000 * np.mean(times['full'])
+    scaled_ms = 1000 * np.mean(times['scaled'])
+    ious = np.array(ious)
+
     print()
-    
-    total_processed += processed
-    total_failed += failed
-    total_skipped += skipped
-
-print('=' * 70)
-print('RESUME')
-print('=' * 70)
-print()
-
-for person in classes:
-    output_dir = os.path.join(output_path, person)
-    count = len([f for f in os.listdir(output_dir) if f.lower().endswith(('.jpg', '.jpeg', '.png'))])
-    print(f'{person}: {count} visages extraits')
-
-total = total_processed + total_skipped
-print()
-print(f'Total traite: {total_processed} (detection reussie)')
-print(f'Total sans visage: {total_skipped} (image complete)')
-print(f'Total erreurs: {total_failed}')
-print(f'Total sauvegarde: {total_processed + total_skipped} images')
-print()
-print('=' * 70)
-print('EXTRACTION TERMINEE!')
-print('=' * 70)
-print()
-print('Notes:')
-print('   1. Utiliser face1_faces_only a la place de face1_balanced')
-print('   2. Retrainer le modele avec les visages extraits')
-print('   3. La reconnaissance devrait etre beaucoup meilleure!')
+    print(f'Images: {len(images)} - detection reduite a {max_side}px')
+    print(f'  Pleine resolution: {full_ms:.1f} ms/image')
+    print(f'  Reduite:           {scaled_ms:.1f} ms/image (x{full_ms / scaled_ms:.2f})')
+    if len(ious):
+        print(f'  IoU moyen des crops: {ious.mean():.3f} (min {ious.min():.3f})')
+        print(f'  Crops avec IoU >= 0.9: {100 * np.mean(ious >= 0.9):.1f}%')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Extraction des visages (MTCNN) en parallèle')
+    parser.add_argument('--input', default='face1_balanced', help='Dataset source (un dossier par personne)')
+    parser.add_argument('--output', default='face1_faces_only', help='Dossier de sortie des visages')
+    parser.add_argument('--classes', nargs='*', help='Personnes à traiter (défaut: tous les sous-dossiers)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Nombre de processus')
+    parser.add_argument('--chunksize', type=int, default=8, help='Images envoyées par lot à chaque worker')
+    parser.add_argument('--stage', choices=('all', 'detect', 'crop'), default='all',
+                        help='detect: remplir l\'index des détections, crop: générer les visages depuis l\'index')
+    parser.add_argument('--padding', type=int, default=PADDING, help='Padding autour du visage (pixels originaux)')
+    parser.add_argument('--size', type=int, default=OUTPUT_SIZE[0], help='Taille des visages de sortie')
+    parser.add_argument('--select', choices=sorted(SELECTION_RULES), default='largest',
+                        help='Visage retenu quand plusieurs sont détectés')
+    parser.add_argument('--force', action='store_true', help='Regénérer tous les crops')
+    parser.add_argument('--detector', choices=sorted(DETECTORS), default='mtcnn',
+                        help='Backend de détection (voir face_detectors.py)')
+    parser.add_argument('--detect-max-side', type=int, default=DETECT_MAX_SIDE,
+                        help='Côté max de la copie de détection (0 = pleine résolution)')
+    parser.add_argument('--benchmark', type=int, metavar='N',
+                        help='Comparer détection pleine/réduite sur N images puis quitter')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    # Fix encoding
+    sys.stdout.reconfigure(encoding='utf-8')
+    args = parse_args(argv)
+
+    print('=' * 70)
+    print(f'EXTRACTION DES VISAGES - {args.detector.upper()}')
+    print('=' * 70)
+
+    classes = args.classes or sorted(
+        d for d in os.listdir(args.input) if os.path.isdir(os.path.join(args.input, d))
+    )
+
+    if args.benchmark:
+        run_benchmark(args.input, classes, args.benchmark, args.detect_max_side or DETECT_MAX_SIDE, args.detector)
+        return
+
+    os.makedirs(args.output, exist_ok=True)
+    manifest_path = os.path.join(args.output, MANIFEST_NAME)
+    index_path = detections_path(args.output, args.detector)
+
+    print()
+    print('1️⃣ Hash des images...')
+    images = list_images(args.input, classes)
+    hashes, hashed = hash_images(images, manifest_path, args.workers)
+    print(f'Images: {len(images)} ({hashed} nouvelles ou modifiees, {len(set(hashes))} contenus uniques)')
+
+    start = time.perf_counter()
+    print()
+    if args.stage in ('all', 'detect'):
+        print(f'2️⃣ Detection des visages ({args.detector}, {args.workers} workers)...')
+        index = run_detect(images, hashes, index_path, args)
+    else:
+        print('2️⃣ Lecture de l\'index des detections...')
+        index = load_jsonl(index_path, 'sha256')
+        print(f'Detections en cache: {len(index)}')
+
+    counts, skipped = {'face': 0, 'no_face': 0, 'error': 0}, 0
+    if args.stage in ('all', 'crop'):
+        print()
+        print('3️⃣ Generation des crops...')
+        counts, skipped = run_crop(images, hashes, index, args)
+
+    elapsed = time.perf_counter() - start
+    missing = sum(1 for digest in hashes if digest not in index)
+
+    print()
+    print('=' * 70)
+    print('RESUME')
+    print('=' * 70)
+    print()
+
+    for person in classes:
+        output_dir = os.path.join(args.output, person)
+        if not os.path.isdir(output_dir):
+            continue
+        count = len([f for f in os.listdir(output_dir) if f.lower().endswith(IMAGE_EXTENSIONS)])
+        print(f'{person}: {count} visages extraits')
+
+    print()
+    print(f"Total croppe: {counts['face']} (detection reussie)")
+    print(f"Total sans visage: {counts['no_face']} (image complete)")
+    print(f"Total erreurs: {counts['error']}")
+    print(f'Total saute (deja croppe): {skipped}')
+    print(f'Sans detection en cache: {missing}')
+    print(f'Duree: {elapsed:.1f}s ({len(images) / elapsed if elapsed > 0 else 0.0:.1f} images/s)')
+    print()
+    print('=' * 70)
+    print('EXTRACTION TERMINEE!')
+    print('=' * 70)
+    print()
+    print('Notes:')
+    print(f'   1. Utiliser {args.output} a la place de {args.input}')
+    print('   2. Retrainer le modele avec les visages extraits')
+    print('   3. Relancer la commande reprend la ou elle s\'est arretee')
+    print('   4. Changer padding/taille/selection: --stage crop (sans MTCNN)')
+
+
+if __name__ == '__main__':
+    main()
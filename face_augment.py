@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Augmentation de données par lot, dans le pipeline tf.data d'entraînement
+Chaque lot (B, 224, 224, 3) float32 [0, 1] est transformé en quelques
+opérations tensorielles vectorisées, avec un tirage différent par image:
+    flip horizontal           une image sur deux
+    rotation + translation    une seule transformation affine par image
+                              (ImageProjectiveTransformV3, bords en miroir)
+    luminosité / contraste    décalage et facteur par image
+Tirages "stateless" dérivés de (seed, epoch, numéro de lot): deux
+entraînements avec la même seed voient exactement les mêmes images.
+L'augmentation n'existe que dans le dataset d'entraînement: le modèle
+sauvegardé et l'inférence ne changent pas.
+
+Avec le rééquilibrage par tirage d'indices (sampling.json), les images
+répétées des classes minoritaires reçoivent chacune une transformation
+différente au lieu d'être des copies exactes.
+
+Usage:
+    python face_augment.py --dataset face1              # coût par lot vs décodage JPEG
+    python face_augment.py --preview augment.jpg        # grille d'images augmentées
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+DEFAULT_AUGMENTATION = {
+    'flip': True,
+    'rotation': 10.0,      # degrés (±)
+    'translation': 0.08,   # fraction de la taille (±)
+    'brightness': 0.1,     # décalage (±) sur [0, 1]
+    'contrast': 0.2,       # facteur dans [1 - c, 1 + c]
+}
+
+
+def augmentation_config(value):
+    """None/False/'0' -> pas d'augmentation, True/'1' -> DEFAULT_AUGMENTATION, dict -> complété"""
+    if value in (None, False, '', '0', 'false', 'off'):
+        return None
+    if value in (True, '1', 'true', 'on'):
+        return dict(DEFAULT_AUGMENTATION)
+    return {**DEFAULT_AUGMENTATION, **value}
+
+
+def augment_batch(images, seed, config=None):
+    """
+    images: float32 (B, H, W, 3) dans [0, 1]; seed: int64 (2,)
+    Retourne le lot augmenté, même forme, dans [0, 1].
+    """
+    import tensorflow as tf
+
+    config = config or DEFAULT_AUGMENTATION
+    seeds = tf.random.experimental.stateless_split(tf.cast(seed, tf.int64), 5)
+    shape = tf.shape(images)
+    batch = shape[0]
+    height, width = tf.cast(shape[1], tf.float32), tf.cast(shape[2], tf.float32)
+
+    if config.get('flip'):
+        flip = tf.random.stateless_uniform([batch], seeds[0]) < 0.5
+        images = tf.where(flip[:, None, None, None], tf.reverse(images, axis=[2]), images)
+
+    rotation = math.radians(config.get('rotation') or 0.0)
+    translation = config.get('translation') or 0.0
+    if rotation or translation:
+        angle = tf.random.stateless_uniform([batch], seeds[1], -rotation, rotation)
+        shift = tf.random.stateless_uniform([batch, 2], seeds[2], -translation, translation)
+        cos, sin = tf.cos(angle), tf.sin(angle)
+        # Rotation autour du centre puis décalage (coordonnées sortie -> entrée)
+        x_offset = ((width - 1) - (cos * (width - 1) - sin * (height - 1))) / 2 - shift[:, 0] * width
+        y_offset = ((height - 1) - (sin * (width - 1) + cos * (height - 1))) / 2 - shift[:, 1] * height
+        zeros = tf.zeros_like(cos)
+        transforms = tf.stack([cos, -sin, x_offset, sin, cos, y_offset, zeros, zeros], axis=1)
+        images = tf.raw_ops.ImageProjectiveTransformV3(
+            images=images, transforms=transforms, output_shape=shape[1:3],
+            fill_value=0.0, interpolation='BILINEAR', fill_mode='REFLECT'
+        )
+
+    if config.get('brightness'):
+        delta = config['brightness']
+        images = images + tf.random.stateless_uniform([batch, 1, 1, 1], seeds[3], -delta, delta)
+
+    if config.get('contrast'):
+        factor = tf.random.stateless_uniform([batch, 1, 1, 1], seeds[4], 1 - config['contrast'], 1 + config['contrast'])
+        mean = tf.reduce_mean(images, axis=[1, 2, 3], keepdims=True)
+        images = (images - mean) * factor + mean
+
+    return tf.clip_by_value(images, 0.0, 1.0)
+
+
+def batch_seed(seed, epoch, index):
+    """Graine d'un lot: (seed, epoch, numéro de lot) -> int64 (2,)"""
+    return np.array([seed if seed is not None else np.random.randint(2 ** 31), epoch * 1_000_000 + index], dtype=np.int64)
+
+
+def main(argv=None):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+    parser = argparse.ArgumentParser(description='Augmentation par lot: coût et aperçu')
+    parser.add_argument('--dataset', default='face1', help='Dataset (un dossier par personne)')
+    parser.add_argument('--classes', nargs='*', default=['jered', 'gracia', 'Ben', 'Leo'])
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--preview', help='Écrire une grille d\'images augmentées (JPEG)')
+    args = parser.parse_args(argv)
+
+    import tensorflow as tf
+    from PIL import Image
+
+    from face_dataset import load_image, open_or_pack
+
+    dataset = open_or_pack(args.dataset, args.classes, os.path.normpath(args.dataset) + '_packed')
+    rows = dataset.rows[:args.batch_size]
+    x = tf.constant(dataset.read(rows).astype(np.float32) / 255.0)
+    augment = tf.function(lambda images, seed: augment_batch(images, seed))
+    augment(x, batch_seed(0, 0, 0))  # traçage
+
+    start = time.perf_counter()
+    for i in range(args.runs):
+        augment(x, batch_seed(0, 0, i)).numpy()
+    augment_ms = (time.perf_counter() - start) / args.runs * 1000
+
+    sources = [dataset.sources[row] for row in rows]
+    start = time.perf_counter()
+    for path in sources:
+        load_image(path)
+    decode_ms = (time.perf_counter() - start) * 1000
+
+    print('=' * 70)
+    print(f'AUGMENTATION - lot de {len(rows)} images')
+    print('=' * 70)
+    print(f'Augmentation (vectorisée):   {augment_ms:8.2f} ms/lot')
+    print(f'Décodage JPEG du même lot:   {decode_ms:8.2f} ms/lot')
+
+    if args.preview:
+        grid = augment(x[:8], batch_seed(0, 0, 0)).numpy()
+        grid = np.concatenate([np.concatenate([x[:8].numpy(), grid], axis=1)[i] for i in range(len(grid))], axis=1)
+        Image.fromarray((grid * 255).astype(np.uint8)).save(args.preview, quality=90)
+        print(f'Aperçu (haut: original, bas: augmenté): {args.preview}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,365 @@
+"""
+Dataset "packé": un tableau uint8 contigu N x 224 x 224 x 3 mappé en mémoire
+Écrit une seule fois par prepare_dataset.py --packed (ou à la volée par /train),
+puis lu par lots sans décodage JPEG ni chargement complet en RAM.
+
+Fichiers du dossier packé:
+    images.npy   uint8 (N, 224, 224, 3), lu avec np.load(mmap_mode='r')
+    labels.npy   int32 (N,), index dans `classes`
+    index.json   classes, sources (chemin de chaque ligne), empreinte des sources
+
+Rééquilibrage virtuel: au lieu de copier des fichiers (ancien
+rebalance_dataset.py), chaque epoch tire des indices de lignes pour que
+chaque classe atteigne la cible. La politique de cible est lue dans
+<dataset>/sampling.json et la cible est recalculée sur les effectifs
+courants (elle suit donc les images ajoutées par /register).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from face_store import FaceStore
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SIZE = 224
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+IMAGES_FILE = 'images.npy'
+LABELS_FILE = 'labels.npy'
+INDEX_FILE = 'index.json'
+SAMPLING_FILE = 'sampling.json'
+DEDUP_FILE = 'dedup.json'
+DEFAULT_BALANCE_POLICY = 'max'
+
+
+def load_dedup_exclusions(dataset_path):
+    """Images exclues par le manifeste élagué de dedup_dataset.py (chemins relatifs)"""
+    path = os.path.join(dataset_path, DEDUP_FILE)
+    if not os.path.exists(path):
+        return set()
+    with open(path, 'r', encoding='utf-8') as f:
+        return set(json.load(f).get('removed', {}))
+
+
+def list_people(dataset_path):
+    """Personnes du dataset: dossiers <personne>/ et index du store adressé par contenu"""
+    folders = [d for d in os.listdir(dataset_path)
+               if os.path.isdir(os.path.join(dataset_path, d)) and not d.startswith(('.', '_'))]
+    return sorted(set(folders) | set(FaceStore(dataset_path).people()))
+
+
+def list_samples(dataset_path, classes, apply_dedup=True):
+    """
+    Liste (chemin, label) pour chaque image d'une personne: fichiers de
+    dataset_path/<personne>/ puis images du store (lues depuis l'index, sans
+    lister de dossier), hors quasi-doublons élagués par dedup_dataset.py.
+    """
+    excluded = load_dedup_exclusions(dataset_path) if apply_dedup else set()
+    store = FaceStore(dataset_path)
+    samples = []
+    for label, person in enumerate(classes):
+        person_dir = os.path.join(dataset_path, person)
+        paths = []
+        if os.path.isdir(person_dir):
+            paths += [os.path.join(person_dir, f) for f in sorted(os.listdir(person_dir))
+                      if f.lower().endswith(IMAGE_EXTENSIONS)]
+        paths += store.paths(person)
+        if not paths:
+            logger.warning("Aucune image pour %s", person)
+            continue
+        samples += [(path, label) for path in paths
+                    if os.path.relpath(path, dataset_path) not in excluded]
+    return samples
+
+
+def sources_fingerprint(samples):
+    """Empreinte (chemin, taille, mtime, label) des sources: détecte un dataset packé périmé"""
+    digest = hashlib.sha256()
+    for path, label in samples:
+        st = os.stat(path)
+        digest.update(f'{path}|{st.st_size}|{int(st.st_mtime)}|{label}\n'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def balance_target(counts, policy=DEFAULT_BALANCE_POLICY):
+    """
+    Nombre d'exemples par classe et par epoch selon la politique:
+    'max', 'median', 'mean' des effectifs non nuls, ou un entier fixe.
+    """
+    present = np.asarray(counts)[np.asarray(counts) > 0]
+    if len(present) == 0:
+        return 0
+    if policy == 'max':
+        return int(present.max())
+    if policy == 'median':
+        return int(np.median(present))
+    if policy == 'mean':
+        return int(round(present.mean()))
+    return int(policy)
+
+
+def class_weights(counts, policy=DEFAULT_BALANCE_POLICY):
+    """Poids par classe (cible / effectif), 0 pour une classe vide"""
+    counts = np.asarray(counts, dtype=np.float64)
+    target = balance_target(counts, policy)
+    return np.divide(target, counts, out=np.zeros_like(counts), where=counts > 0)
+
+
+def load_sampling_policy(dataset_path, default=DEFAULT_BALANCE_POLICY):
+    """Politique de rééquilibrage du dataset (sampling.json écrit par rebalance_dataset.py)"""
+    path = os.path.join(dataset_path, SAMPLING_FILE)
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('policy', default)
+
+
+def write_sampling_manifest(dataset_path, classes, counts, policy=DEFAULT_BALANCE_POLICY):
+    """Écrit sampling.json: politique + table des poids calculée sur les effectifs actuels"""
+    weights = class_weights(counts, policy)
+    manifest = {
+        'policy': policy,
+        'target_count': balance_target(counts, policy),
+        'classes': list(classes),
+        'counts': [int(c) for c in counts],
+        'class_weights': [round(float(w), 4) for w in weights],
+    }
+    with open(os.path.join(dataset_path, SAMPLING_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_image(path, image_size=IMAGE_SIZE):
+    """Décode une image en uint8 (image_size, image_size, 3), comme le prétraitement de l'API"""
+    img = Image.open(path)
+    if img.format == 'JPEG':
+        # Décodage réduit (DCT) tant que l'image reste >= 2x la taille cible
+        img.draft('RGB', (image_size * 2, image_size * 2))
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    img = img.resize((image_size, image_size))
+    return np.asarray(img, dtype=np.uint8)
+
+
+def pack_dataset(samples, classes, output_path, image_size=IMAGE_SIZE, workers=None):
+    """
+    Décode toutes les images une fois et écrit le dataset packé dans output_path.
+    L'écriture se fait dans un dossier temporaire remplacé à la fin.
+    Retourne le nombre d'images écrites.
+    """
+    if not samples:
+        raise ValueError(f"Aucune image à packer pour {output_path}")
+
+    tmp_path = output_path.rstrip('/\\') + '.tmp'
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+
+    fingerprint = sources_fingerprint(samples)
+    images_path = os.path.join(tmp_path, IMAGES_FILE)
+    images = np.lib.format.open_memmap(
+        images_path, mode='w+', dtype=np.uint8, shape=(len(samples), image_size, image_size, 3)
+    )
+
+    def decode(sample):
+        try:
+            return load_image(sample[0], image_size)
+        except Exception as e:
+            logger.warning("Erreur avec %s: %s", sample[0], e)
+            return None
+
+    # PIL relâche le GIL pendant le décodage et le redimensionnement
+    kept = []
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        for sample, array in zip(samples, pool.map(decode, samples)):
+            if array is None:
+                continue
+            images[len(kept)] = array
+            kept.append(sample)
+    images.flush()
+    del images
+
+    # Images illisibles: on compacte (cas rare) pour garder un tableau contigu
+    if len(kept) < len(samples):
+        full = np.load(images_path, mmap_mode='r')
+        compact_path = os.path.join(tmp_path, 'compact.npy')
+        compact = np.lib.format.open_memmap(
+            compact_path, mode='w+', dtype=np.uint8, shape=(len(kept),) + full.shape[1:]
+        )
+        compact[:] = full[:len(kept)]
+        compact.flush()
+        del compact, full
+        os.replace(compact_path, images_path)
+
+    np.save(os.path.join(tmp_path, LABELS_FILE), np.array([label for _, label in kept], dtype=np.int32))
+    with open(os.path.join(tmp_path, INDEX_FILE), 'w', encoding='utf-8') as f:
+        json.dump({
+            'classes': list(classes),
+            'image_size': image_size,
+            'count': len(kept),
+            'sources': [path for path, _ in kept],
+            'fingerprint': fingerprint,
+        }, f)
+
+    if os.path.exists(output_path):
+        shutil.rmtree(output_path)
+    os.replace(tmp_path, output_path)
+    return len(kept)
+
+
+class PackedDataset:
+    """
+    Lecture d'un dataset packé. Les images restent sur disque (memmap),
+    seuls les lots demandés sont lus et normalisés.
+    Si `classes` est fourni, les labels sont réindexés dans cet ordre
+    (comparaison insensible à la casse) et les autres classes ignorées.
+    """
+
+    def __init__(self, path, classes=None):
+        self.path = path
+        with open(os.path.join(path, INDEX_FILE), 'r', encoding='utf-8') as f:
+            self.index = json.load(f)
+        self.images = np.load(os.path.join(path, IMAGES_FILE), mmap_mode='r')
+        labels = np.load(os.path.join(path, LABELS_FILE))
+        self.sources = self.index['sources']
+
+        if classes is None:
+            self.classes = list(self.index['classes'])
+            self.labels = labels
+            self.rows = np.arange(len(labels))
+        else:
+            wanted = {name.lower(): i for i, name in enumerate(classes)}
+            mapping = np.array([wanted.get(name.lower(), -1) for name in self.index['classes']], dtype=np.int32)
+            mapped = mapping[labels] if len(labels) else labels
+            self.classes = list(classes)
+            self.rows = np.flatnonzero(mapped >= 0)
+            self.labels = mapped
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def image_size(self):
+        return self.index['image_size']
+
+    @property
+    def fingerprint(self):
+        return self.index.get('fingerprint')
+
+    def split(self, test_size=0.2, seed=42):
+        """Découpage train/test mélangé (indices de lignes du tableau)"""
+        rows = np.random.default_rng(seed).permutation(self.rows)
+        n_test = int(round(len(rows) * test_size))
+        return np.sort(rows[n_test:]), np.sort(rows[:n_test])
+
+    def class_counts(self, rows=None):
+        """Effectifs par classe (sur toutes les lignes ou sur `rows`)"""
+        rows = self.rows if rows is None else np.asarray(rows)
+        return np.bincount(self.labels[rows], minlength=len(self.classes))
+
+    def balanced_rows(self, rows, policy=DEFAULT_BALANCE_POLICY, seed=None):
+        """
+        Indices d'une epoch équilibrée: chaque classe ramenée à la cible par
+        tirage d'indices (sous-échantillonnage ou répétition). Aucune copie
+        de fichier, aucun décodage supplémentaire.
+        """
+        rows = np.asarray(rows)
+        labels = self.labels[rows]
+        counts = np.bincount(labels, minlength=len(self.classes))
+        target = balance_target(counts, policy)
+        rng = np.random.default_rng(seed)
+
+        picked = []
+        for label in np.flatnonzero(counts):
+            members = rows[labels == label]
+            if len(members) >= target:
+                picked.append(rng.choice(members, target, replace=False))
+            else:
+                extra = rng.choice(members, target - len(members), replace=True)
+                picked.append(np.concatenate([members, extra]))
+        return np.concatenate(picked) if picked else rows[:0]
+
+    def read(self, rows):
+        """Lit des lignes (uint8); trier les indices garde des accès disque séquentiels"""
+        rows = np.asarray(rows)
+        order = np.argsort(rows)
+        out = np.empty((len(rows),) + self.images.shape[1:], dtype=np.uint8)
+        out[order] = self.images[rows[order]]
+        return out
+
+    def batches(self, rows, batch_size=32, shuffle=False, seed=None):
+        """Génère des lots (x float32 normalisé [0, 1], y int32)"""
+        rows = np.asarray(rows)
+        if shuffle:
+            rows = np.random.default_rng(seed).permutation(rows)
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            yield self.read(batch).astype(np.float32) / 255.0, self.labels[batch]
+
+    def tf_dataset(self, rows, batch_size=32, shuffle=False, seed=None, one_hot=True, balance=None, augment=None):
+        """
+        tf.data.Dataset de lots (x, y) lus depuis le memmap.
+        Avec shuffle, l'ordre change à chaque epoch (seed + numéro d'epoch).
+        Avec balance (politique de balance_target), chaque epoch est
+        rééquilibrée par tirage d'indices.
+        Avec augment (configuration de face_augment, True = défaut), chaque
+        lot est augmenté dans le pipeline (graine: seed, epoch, numéro de lot).
+        """
+        import tensorflow as tf
+
+        size = self.image_size
+        num_classes = len(self.classes)
+        epoch = [0]
+        if augment:
+            from face_augment import augment_batch, augmentation_config, batch_seed
+            augment = augmentation_config(augment)
+
+        def generator():
+            current = epoch[0]
+            epoch_seed = None if seed is None else seed + current
+            epoch[0] += 1
+            epoch_rows = rows if balance is None else self.balanced_rows(rows, balance, epoch_seed)
+            batches = self.batches(epoch_rows, batch_size, shuffle or balance is not None, epoch_seed)
+            for index, (x, y) in enumerate(batches):
+                y = np.eye(num_classes, dtype=np.float32)[y] if one_hot else y
+                yield (x, y, batch_seed(seed, current, index)) if augment else (x, y)
+
+        y_spec = (tf.TensorSpec((None, num_classes), tf.float32) if one_hot
+                  else tf.TensorSpec((None,), tf.int32))
+        x_spec = tf.TensorSpec((None, size, size, 3), tf.float32)
+        if not augment:
+            dataset = tf.data.Dataset.from_generator(generator, output_signature=(x_spec, y_spec))
+            return dataset.prefetch(tf.data.AUTOTUNE)
+
+        dataset = tf.data.Dataset.from_generator(
+            generator, output_signature=(x_spec, y_spec, tf.TensorSpec((2,), tf.int64))
+        )
+        dataset = dataset.map(lambda x, y, s: (augment_batch(x, s, augment), y), num_parallel_calls=tf.data.AUTOTUNE)
+        return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+def open_or_pack(dataset_path, classes, packed_path, image_size=IMAGE_SIZE):
+    """
+    Ouvre le dataset packé s'il correspond encore aux sources,
+    sinon le (re)construit depuis les JPEG de dataset_path.
+    """
+    samples = list_samples(dataset_path, classes)
+    fingerprint = sources_fingerprint(samples)
+
+    if os.path.exists(os.path.join(packed_path, INDEX_FILE)):
+        dataset = PackedDataset(packed_path, classes)
+        if dataset.fingerprint == fingerprint and dataset.image_size == image_size:
+            logger.info("Dataset packé à jour: %s (%d images)", packed_path, len(dataset))
+            return dataset
+        logger.info("Dataset packé périmé, reconstruction: %s", packed_path)
+
+    count = pack_dataset(samples, classes, packed_path, image_size)
+    logger.info("Dataset packé écrit: %s (%d images)", packed_path, count)
+    return PackedDataset(packed_path, classes)
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Détecteurs de visages interchangeables
+Tous les backends fonctionnent hors ligne et retournent le format MTCNN:
+    [{'box': [x, y, w, h], 'confidence': float, 'keypoints': {...}}, ...]
+
+Backends:
+    mtcnn   MTCNN (précis, lent sur CPU)
+    haar    Cascade de Haar OpenCV (frontalface_default)
+    haar2   Cascade de Haar OpenCV (frontalface_alt2)
+    lbp     Cascade LBP OpenCV (frontalface_improved, si présente)
+
+Usage:
+    python face_detectors.py --input face1 --images 200 --backends haar haar2 lbp
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+
+class FaceDetector:
+    """Interface commune: detect_faces(img_array RGB uint8) -> détections format MTCNN"""
+
+    name = None
+
+    def detect_faces(self, img_array):
+        raise NotImplementedError
+
+
+class MTCNNDetector(FaceDetector):
+    name = 'mtcnn'
+
+    def __init__(self, threads=None):
+        # Import paresseux: TensorFlow n'est chargé que si ce backend est utilisé
+        os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+        import tensorflow as tf
+        if threads:
+            tf.config.threading.set_intra_op_parallelism_threads(threads)
+            tf.config.threading.set_inter_op_parallelism_threads(threads)
+        from mtcnn import MTCNN
+        self._mtcnn = MTCNN()
+
+    def detect_faces(self, img_array):
+        return self._mtcnn.detect_faces(img_array)
+
+
+class CascadeDetector(FaceDetector):
+    """Cascades OpenCV livrées avec opencv-python (aucun téléchargement)"""
+
+    cascade_file = None
+
+    def __init__(self, threads=None, scale_factor=1.1, min_neighbors=5, min_size=(40, 40)):
+        import cv2
+        self._cv2 = cv2
+        if threads:
+            cv2.setNumThreads(threads)
+
+        path = self._find_cascade(cv2, self.cascade_file)
+        self._cascade = cv2.CascadeClassifier(path)
+        if self._cascade.empty():
+            raise RuntimeError(f'Cascade illisible: {path}')
+
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+
+    @staticmethod
+    def _find_cascade(cv2, filename):
+        base = cv2.data.haarcascades
+        candidates = [
+            os.path.join(base, filename),
+            os.path.join(os.path.dirname(os.path.normpath(base)), 'lbpcascades', filename),
+            os.path.join('/usr/share/opencv4/lbpcascades', filename),
+            os.path.join('/usr/share/opencv4/haarcascades', filename),
+        ]
+        for path in candidates:
+            if os.path.exists(path):
+                return path
+        raise FileNotFoundError(f'Cascade {filename} introuvable (cherché: {candidates})')
+
+    def detect_faces(self, img_array):
+        cv2 = self._cv2
+        gray = cv2.equalizeHist(cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY))
+        boxes, _, weights = self._cascade.detectMultiScale3(
+            gray,
+            scaleFactor=self.scale_factor,
+            minNeighbors=self.min_neighbors,
+            minSize=self.min_size,
+            outputRejectLevels=True,
+        )
+        detections = []
+        for (x, y, w, h), weight in zip(boxes, np.ravel(weights) if len(boxes) else []):
+            # Le poids de niveau n'est pas une probabilité: on le ramène dans [0, 1]
+            confidence = float(1.0 / (1.0 + np.exp(-weight)))
+            detections.append({'box': [int(x), int(y), int(w), int(h)], 'confidence': confidence, 'keypoints': {}})
+        return detections
+
+
+class HaarDetector(CascadeDetector):
+    name = 'haar'
+    cascade_file = 'haarcascade_frontalface_default.xml'
+
+
+class HaarAlt2Detector(CascadeDetector):
+    name = 'haar2'
+    cascade_file = 'haarcascade_frontalface_alt2.xml'
+
+
+class LBPDetector(CascadeDetector):
+    name = 'lbp'
+    cascade_file = 'lbpcascade_frontalface_improved.xml'
+
+
+DETECTORS = {cls.name: cls for cls in (MTCNNDetector, HaarDetector, HaarAlt2Detector, LBPDetector)}
+
+
+def create_detector(name='mtcnn', **kwargs):
+    """Instancie un backend par son nom"""
+    if name not in DETECTORS:
+        raise ValueError(f'Détecteur inconnu: {name} (disponibles: {", ".join(sorted(DETECTORS))})')
+    return DETECTORS[name](**kwargs)
+
+
+def run_benchmark(dataset_path, n_images, backends, max_side):
+    """
+    Mesure images/s et détections/s de chaque backend, et leur accord avec
+    MTCNN (référence): même décision visage/pas de visage, rappel à IoU >= 0.5.
+    """
+    from extract_faces import box_iou, detect_faces_scaled, list_images, open_for_detection
+
+    classes = sorted(d for d in os.listdir(dataset_path) if os.path.isdir(os.path.join(dataset_path, d)))
+    images = [path for _, _, path in list_images(dataset_path, classes)]
+    random.Random(42).shuffle(images)
+    images = images[:n_images]
+
+    # Décodage une seule fois: on ne mesure que la détection
+    decoded = [open_for_detection(path, max_side) for path in images]
+    print(f'Images: {len(decoded)} (detection a {max_side or "pleine"} px)')
+    print()
+
+    results = {}
+    for name in ['mtcnn'] + [b for b in backends if b != 'mtcnn']:
+        try:
+            detector = create_detector(name)
+        except Exception as e:
+            print(f'  {name}: indisponible ({e})')
+            continue
+
+        detector.detect_faces(np.zeros((64, 64, 3), dtype=np.uint8))  # warmup
+        outputs = []
+        start = time.perf_counter()
+        for img_pil, full_size in decoded:
+            outputs.append(detect_faces_scaled(detector, img_pil, full_size, max_side))
+        elapsed = time.perf_counter() - start
+        results[name] = (outputs, elapsed)
+
+    if 'mtcnn' not in results:
+        print('MTCNN indisponible: pas de référence pour l\'accord')
+    reference = results.get('mtcnn', (None, None))[0]
+
+    print(f"{'backend':<8} {'img/s':>8} {'det/s':>8} {'accord':>8} {'rappel':>8} {'IoU':>6}")
+    for name, (outputs, elapsed) in results.items():
+        n_dets = sum(len(o) for o in outputs)
+        line = f'{name:<8} {len(outputs) / elapsed:>8.1f} {n_dets / elapsed:>8.1f}'
+
+        if reference is not None:
+            agree = np.mean([bool(o) == bool(r) for o, r in zip(outputs, reference)])
+            ious = []
+            for o, r in zip(outputs, reference):
+                for ref_face in r:
+                    rb = ref_face['box']
+                    ref_box = (rb[0], rb[1], rb[0] + rb[2], rb[1] + rb[3])
+                    best = max((box_iou(ref_box, (f['box'][0], f['box'][1], f['box'][0] + f['box'][2],
+                                                  f['box'][1] + f['box'][3])) for f in o), default=0.0)
+                    ious.append(best)
+            ious = np.array(ious) if ious else np.zeros(1)
+            line += f' {100 * agree:>7.1f}% {100 * np.mean(ious >= 0.5):>7.1f}% {ious.mean():>6.2f}'
+        print(line)
+
+
+def main(argv=None):
+    sys.stdout.reconfigure(encoding='utf-8')
+    parser = argparse.ArgumentParser(description='Benchmark des détecteurs de visages')
+    parser.add_argument('--input', default='face1', help='Dataset (un dossier par personne)')
+    parser.add_argument('--images', type=int, default=200, help='Nombre d\'images échantillonnées')
+    parser.add_argument('--backends', nargs='*', default=sorted(DETECTORS), help='Backends à comparer')
+    parser.add_argument('--detect-max-side', type=int, default=640,
+                        help='Côté max de la copie de détection (0 = pleine résolution)')
+    args = parser.parse_args(argv)
+
+    print('=' * 70)
+    print('BENCHMARK DES DETECTEURS DE VISAGES')
+    print('=' * 70)
+    print()
+    run_benchmark(args.input, args.images, args.backends, args.detect_max_side)
+
+
+if __name__ == '__main__':
+    main()
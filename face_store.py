@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Stockage adressé par contenu des visages enregistrés
+    <dataset>/.store/objects/ab/<sha256>.jpg   image normalisée (une seule copie)
+    <dataset>/.store/people/<nom>.jsonl        index par personne (append-only)
+
+La clé est le SHA-256 des octets envoyés par le client: un même envoi
+(client mobile qui réessaie) ne coûte rien, et une même photo n'est
+stockée qu'une fois. Les parcours du dataset lisent les index au lieu de
+lister les dossiers.
+
+Usage:
+    python face_store.py migrate --dataset face1     # importer les dossiers existants
+    python face_store.py stats --dataset face1
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+
+STORE_DIR = '.store'
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def content_digest(data):
+    """SHA-256 hexadécimal d'un contenu"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class FaceStore:
+    """Blobs adressés par hash + index par personne, gardé en mémoire après la première lecture"""
+
+    def __init__(self, dataset_path):
+        self.root = os.path.join(dataset_path, STORE_DIR)
+        self.objects_dir = os.path.join(self.root, 'objects')
+        self.people_dir = os.path.join(self.root, 'people')
+        self._index = None
+        self._lock = threading.Lock()
+
+    def blob_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest + '.jpg')
+
+    def has_blob(self, digest):
+        return os.path.exists(self.blob_path(digest))
+
+    def _load(self):
+        if self._index is not None:
+            return self._index
+        index = {}
+        if os.path.isdir(self.people_dir):
+            for filename in os.listdir(self.people_dir):
+                if not filename.endswith('.jsonl'):
+                    continue
+                digests = []
+                with open(os.path.join(self.people_dir, filename), 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            digests.append(json.loads(line)['sha256'])
+                        except (json.JSONDecodeError, KeyError):
+                            continue
+                index[filename[:-len('.jsonl')]] = list(dict.fromkeys(digests))
+        self._index = index
+        return index
+
+    def people(self):
+        with self._lock:
+            return sorted(self._load())
+
+    def digests(self, name):
+        with self._lock:
+            return list(self._load().get(name, []))
+
+    def paths(self, name):
+        """Chemins des images d'une personne (lecture de l'index seulement)"""
+        return [self.blob_path(digest) for digest in self.digests(name)]
+
+    def contains(self, name, digest):
+        with self._lock:
+            return digest in self._load().get(name, [])
+
+    def add(self, name, digest):
+        """
+        Ajoute un blob existant à l'index d'une personne.
+        Retourne False si la personne l'avait déjà (doublon).
+        """
+        with self._lock:
+            index = self._load()
+            digests = index.setdefault(name, [])
+            if digest in digests:
+                return False
+            os.makedirs(self.people_dir, exist_ok=True)
+            with open(os.path.join(self.people_dir, name + '.jsonl'), 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'sha256': digest, 'added': int(time.time())}) + '\n')
+            digests.append(digest)
+            return True
+
+    def put_file(self, name, path, move=False):
+        """Importe un fichier existant (déjà normalisé) dans le store"""
+        with open(path, 'rb') as f:
+            digest = content_digest(f.read())
+        blob = self.blob_path(digest)
+        if os.path.exists(blob):
+            if move:
+                os.remove(path)
+        else:
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            (shutil.move if move else shutil.copy2)(path, blob)
+        return digest, self.add(name, digest)
+
+
+def migrate(dataset_path, move=True):
+    """Importe les dossiers <dataset>/<personne>/ dans le store"""
+    store = FaceStore(dataset_path)
+    people = sorted(d for d in os.listdir(dataset_path)
+                    if os.path.isdir(os.path.join(dataset_path, d)) and not d.startswith(('.', '_')))
+    for person in people:
+        person_dir = os.path.join(dataset_path, person)
+        files = [f for f in os.listdir(person_dir) if f.lower().endswith(IMAGE_EXTENSIONS)]
+        added = sum(store.put_file(person, os.path.join(person_dir, f), move)[1] for f in files)
+        print(f'{person}: {len(files)} fichiers -> {added} ajoutes, {len(files) - added} doublons')
+        if move and not os.listdir(person_dir):
+            os.rmdir(person_dir)
+    return store
+
+
+def main(argv=None):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+    parser = argparse.ArgumentParser(description='Stockage adressé par contenu des visages')
+    parser.add_argument('command', choices=('migrate', 'stats'))
+    parser.add_argument('--dataset', default='face1', help='Dataset (un dossier par personne)')
+    parser.add_argument('--copy', action='store_true', help='migrate: copier au lieu de déplacer')
+    args = parser.parse_args(argv)
+
+    print('=' * 70)
+    print(f'STORE DES VISAGES - {args.command}')
+    print('=' * 70)
+    print()
+
+    store = migrate(args.dataset, move=not args.copy) if args.command == 'migrate' else FaceStore(args.dataset)
+
+    print()
+    total = 0
+    for person in store.people():
+        count = len(store.digests(person))
+        total += count
+        print(f'{person}: {count} images')
+    print(f'Total: {total} images indexees')
+
+
+if __name__ == '__main__':
+    main()
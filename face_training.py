@@ -0,0 +1,155 @@
+"""
+Construction du classifieur pour l'entraînement (/train, notebook)
+Le backbone MobileNetV2 est gelé: seule la tête (GAP -> Dense 256 ->
+Dropout -> Dense softmax) est apprise. Au lieu de reconstruire
+MobileNetV2(weights='imagenet') à chaque entraînement, le backbone est pris,
+par ordre de préférence:
+    1. dans le modèle déjà chargé (même objet, aucune copie des poids)
+    2. dans un cache local de poids (BACKBONE_WEIGHTS, ou le cache Keras
+       ~/.keras/models rempli par un précédent téléchargement)
+    3. par téléchargement ImageNet (si autorisé), qui remplit le cache Keras
+
+Hyperparamètres de la tête: valeurs historiques, ou best_head.json écrit
+par sweep_heads.py (HEAD_CONFIG pour un autre fichier).
+
+Entraînement: arrêt anticipé sur plateau de val_loss (meilleurs poids
+restaurés) et sauvegarde à chaque epoch; un entraînement interrompu
+(instance recyclée) reprend à la dernière epoch sauvegardée.
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SIZE = 224
+# Nom du fichier que Keras écrit dans ~/.keras/models pour MobileNetV2(alpha=1.0, include_top=False)
+KERAS_WEIGHTS_FILE = 'mobilenet_v2_weights_tf_dim_ordering_tf_kernels_1.0_224_no_top.h5'
+HEAD_CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'best_head.json')
+DEFAULT_HEAD = {'dense_units': 256, 'dropout': 0.4, 'learning_rate': 1e-3, 'epochs': 15, 'batch_size': 32}
+DEFAULT_PATIENCE = 3
+
+
+def load_head_config(path=None):
+    """Hyperparamètres de la tête: DEFAULT_HEAD complété par best_head.json s'il existe"""
+    path = path or os.environ.get('HEAD_CONFIG', HEAD_CONFIG_FILE)
+    config = dict(DEFAULT_HEAD)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            config.update({k: v for k, v in json.load(f).get('config', {}).items() if k in DEFAULT_HEAD})
+    return config
+
+
+def backbone_from_model(model):
+    """Sous-modèle MobileNetV2 d'un classifieur Sequential([backbone, GAP, ...]), sinon None"""
+    if model is None:
+        return None
+    import tensorflow as tf
+
+    for layer in model.layers:
+        if isinstance(layer, tf.keras.Model) and layer.name.startswith('mobilenetv2'):
+            return layer
+    return None
+
+
+def local_weights_path(weights_path=None):
+    """Premier fichier de poids local disponible (argument, BACKBONE_WEIGHTS, cache Keras)"""
+    candidates = [
+        weights_path,
+        os.environ.get('BACKBONE_WEIGHTS'),
+        os.path.join(os.environ.get('KERAS_HOME', os.path.join(os.path.expanduser('~'), '.keras')),
+                     'models', KERAS_WEIGHTS_FILE),
+    ]
+    for path in candidates:
+        if path and os.path.exists(path):
+            return path
+    return None
+
+
+def get_backbone(model=None, weights_path=None, allow_download=True):
+    """Backbone gelé + sa provenance ('model', 'cache' ou 'imagenet')"""
+    import tensorflow as tf
+
+    backbone = backbone_from_model(model)
+    source = 'model'
+    if backbone is None:
+        path = local_weights_path(weights_path)
+        if path is None and not allow_download:
+            raise FileNotFoundError(
+                'Aucun backbone disponible: pas de modèle chargé ni de poids locaux '
+                f'(BACKBONE_WEIGHTS ou ~/.keras/models/{KERAS_WEIGHTS_FILE})'
+            )
+        backbone = tf.keras.applications.MobileNetV2(
+            input_shape=(IMAGE_SIZE, IMAGE_SIZE, 3),
+            include_top=False,
+            weights=path or 'imagenet'
+        )
+        source = 'cache' if path else 'imagenet'
+
+    backbone.trainable = False
+    logger.info("Backbone MobileNetV2: %s", source)
+    return backbone, source
+
+
+def build_classifier(backbone, num_classes, dense_units=256, dropout=0.4):
+    """Tête de classification sur le backbone gelé (même architecture que ML.ipynb)"""
+    import tensorflow as tf
+
+    return tf.keras.Sequential([
+        backbone,
+        tf.keras.layers.GlobalAveragePooling2D(),
+        tf.keras.layers.Dense(dense_units, activation='relu'),
+        tf.keras.layers.Dropout(dropout),
+        tf.keras.layers.Dense(num_classes, activation='softmax')
+    ])
+
+
+def build_head(num_features, num_classes, dense_units=256, dropout=0.4):
+    """Même tête que build_classifier, sur des features déjà poolées (sweep_heads.py)"""
+    import tensorflow as tf
+
+    return tf.keras.Sequential([
+        tf.keras.Input((num_features,)),
+        tf.keras.layers.Dense(dense_units, activation='relu'),
+        tf.keras.layers.Dropout(dropout),
+        tf.keras.layers.Dense(num_classes, activation='softmax')
+    ])
+
+
+def checkpoint_dir(root, name, **identity):
+    """
+    Dossier de reprise d'un entraînement: un même (nom, classes, hyperparamètres...)
+    reprend la même sauvegarde, toute autre configuration repart de zéro
+    """
+    key = hashlib.sha256(json.dumps(identity, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(root, 'checkpoints', f'{name}_{key}')
+
+
+def training_callbacks(backup_dir, patience=DEFAULT_PATIENCE, monitor='val_loss'):
+    """
+    EarlyStopping (meilleurs poids restaurés) + BackupAndRestore (poids,
+    optimiseur et epoch sauvegardés à chaque epoch, supprimés en fin
+    d'entraînement). Retourne (callbacks, reprise d'une sauvegarde existante).
+    """
+    import tensorflow as tf
+
+    resumed = os.path.isdir(backup_dir) and bool(os.listdir(backup_dir))
+    callbacks = [
+        tf.keras.callbacks.BackupAndRestore(backup_dir, save_freq='epoch', delete_checkpoint=True),
+        tf.keras.callbacks.EarlyStopping(monitor=monitor, patience=patience, restore_best_weights=True),
+    ]
+    if resumed:
+        logger.info("Reprise de l'entraînement depuis %s", backup_dir)
+    return callbacks, resumed
+
+
+def best_epoch(history, monitor='val_loss'):
+    """(numéro d'epoch, métriques) de l'epoch retenue par EarlyStopping, dans l'historique de cette exécution"""
+    values = history.history.get(monitor)
+    if not values:
+        index = len(history.epoch) - 1
+    else:
+        index = int(min(range(len(values)), key=values.__getitem__))
+    return history.epoch[index] + 1, {key: float(v[index]) for key, v in history.history.items()}
@@ -1,96 +1,161 @@
+#!/usr/bin/env python3
+"""
+Préparation du dataset - Redimensionnement 224x224
+Deux formats de sortie:
+  - JPEG 224x224 (un dossier par personne), comme avant
+  - --packed: tableau uint8 N x 224 x 224 x 3 mappé en mémoire + table
+    des labels (voir face_dataset.py), lu par lots sans décodage
+
+Usage:
+    python prepare_dataset.py --input face1_balanced --output face1_processed
+    python prepare_dataset.py --input face1_balanced --output face1_packed --packed
+"""
+
+import argparse
 import os
+import shutil
 import sys
-import numpy as np
+import time
+
 from PIL import Image
-import shutil
 
-# Fix encoding
-sys.stdout.reconfigure(encoding='utf-8')
-
-print('=' * 70)
-print('PREPARATION DU DATASET - Redimensionnement 224x224')
-print('=' * 70)
-
-dataset_path = r'c:\Users\HP\Music\machineL\face1_balanced'
-output_path = r'c:\Users\HP\Music\machineL\face1_processed'
-
-classes = ['Ben', 'gracia', 'Jered', 'Leo']
-
-print()
-print('1. Creer le dossier de sortie...')
-if os.path.exists(output_path):
-    shutil.rmtree(output_path)
-for person in classes:
-    os.makedirs(os.path.join(output_path, person), exist_ok=True)
-print(f'OK: {output_path}')
-
-print()
-print('2. Traitement des images...')
-print()
-
-total_processed = 0
-total_failed = 0
-
-for person in classes:
-    person_dir = os.path.join(dataset_path, person)
-    output_dir = os.path.join(output_path, person)
-    
-    images = [f for f in os.listdir(person_dir) if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
-    
-    print(f'{person}: {len(images)} images')
-    
-    processed = 0
-    failed = 0
-    
-    for i, img_file in enumerate(images):
-        img_path = os.path.join(person_dir, img_file)
-        
-        try:
-            # Charger l'image
-            img_pil = Image.open(img_path)
-            if img_pil.mode != 'RGB':
-                img_pil = img_pil.convert('RGB')
-            
-            # Redimensionner a 224x224 avec bonne qualite
-            img_resized = img_pil.resize((224, 224), Image.Resampling.LANCZOS)
-            
-            # Sauvegarder avec haute qualite
-            output_file = os.path.join(output_dir, img_file)
-            img_resized.save(output_file, quality=95)
-            
-            processed += 1
-        
-        except Exception as e:
-            failed += 1
-            if failed <= 3:
-                print(f'  Erreur {img_file}: {str(e)[:40]}')
-        
-        # Progress
-        if (i + 1) % 200 == 0:
-            print(f'  Traite: {i + 1}/{len(images)}')
-    
-    print(f'  Succes: {processed}, Erreurs: {failed}')
-    total_processed += processed
-    total_failed += failed
-
-print()
-print('=' * 70)
-print('RESUME')
-print('=' * 70)
-print()
-
-for person in classes:
-    output_dir = os.path.join(output_path, person)
-    count = len([f for f in os.listdir(output_dir) if f.lower().endswith(('.jpg', '.jpeg', '.png'))])
-    print(f'{person}: {count} images')
-
-total = total_processed
-print()
-print(f'Total traite: {total} images')
-print(f'Total erreurs: {total_failed}')
-print()
-print('=' * 70)
-print('OK! DATASET PRET')
-print('=' * 70)
-print()
-print('Prochain: Modifier notebook pour utiliser face1_processed')
+from face_dataset import IMAGE_EXTENSIONS, IMAGE_SIZE, list_samples, pack_dataset
+
+DEFAULT_CLASSES = ['Ben', 'gracia', 'Jered', 'Leo']
+
+
+def write_jpegs(dataset_path, output_path, classes):
+    """Ancien format: réécrit chaque image en JPEG 224x224"""
+    print()
+    print('1. Creer le dossier de sortie...')
+    if os.path.exists(output_path):
+        shutil.rmtree(output_path)
+    for person in classes:
+        os.makedirs(os.path.join(output_path, person), exist_ok=True)
+    print(f'OK: {output_path}')
+
+    print()
+    print('2. Traitement des images...')
+    print()
+
+    total_processed = 0
+    total_failed = 0
+
+    for person in classes:
+        person_dir = os.path.join(dataset_path, person)
+        output_dir = os.path.join(output_path, person)
+
+        images = [f for f in os.listdir(person_dir) if f.lower().endswith(IMAGE_EXTENSIONS)]
+
+        print(f'{person}: {len(images)} images')
+
+        processed = 0
+        failed = 0
+
+        for i, img_file in enumerate(images):
+            img_path = os.path.join(person_dir, img_file)
+
+            try:
+                # Charger l'image
+                img_pil = Image.open(img_path)
+                if img_pil.mode != 'RGB':
+                    img_pil = img_pil.convert('RGB')
+
+                # Redimensionner a 224x224 avec bonne qualite
+                img_resized = img_pil.resize((IMAGE_SIZE, IMAGE_SIZE), Image.Resampling.LANCZOS)
+
+                # Sauvegarder avec haute qualite
+                output_file = os.path.join(output_dir, img_file)
+                img_resized.save(output_file, quality=95)
+
+                processed += 1
+
+            except Exception as e:
+                failed += 1
+                if failed <= 3:
+                    print(f'  Erreur {img_file}: {str(e)[:40]}')
+
+            # Progress
+            if (i + 1) % 200 == 0:
+                print(f'  Traite: {i + 1}/{len(images)}')
+
+        print(f'  Succes: {processed}, Erreurs: {failed}')
+        total_processed += processed
+        total_failed += failed
+
+    print()
+    print('=' * 70)
+    print('RESUME')
+    print('=' * 70)
+    print()
+
+    for person in classes:
+        output_dir = os.path.join(output_path, person)
+        count = len([f for f in os.listdir(output_dir) if f.lower().endswith(IMAGE_EXTENSIONS)])
+        print(f'{person}: {count} images')
+
+    print()
+    print(f'Total traite: {total_processed} images')
+    print(f'Total erreurs: {total_failed}')
+
+
+def write_packed(dataset_path, output_path, classes, workers):
+    """Nouveau format: un seul tableau uint8 contigu + labels"""
+    print()
+    print('1. Liste des images...')
+    samples = list_samples(dataset_path, classes)
+    for label, person in enumerate(classes):
+        print(f'{person}: {sum(1 for _, l in samples if l == label)} images')
+
+    print()
+    print(f'2. Decodage et ecriture du dataset packe ({workers} threads)...')
+    start = time.perf_counter()
+    count = pack_dataset(samples, classes, output_path, IMAGE_SIZE, workers)
+    elapsed = time.perf_counter() - start
+
+    size_mb = sum(os.path.getsize(os.path.join(output_path, f)) for f in os.listdir(output_path)) / (1024 * 1024)
+    print()
+    print('=' * 70)
+    print('RESUME')
+    print('=' * 70)
+    print()
+    print(f'Total packe: {count} images ({len(samples) - count} erreurs)')
+    print(f'Taille: {size_mb:.1f} MB - Duree: {elapsed:.1f}s ({count / elapsed:.1f} images/s)')
+
+
+def main(argv=None):
+    # Fix encoding
+    sys.stdout.reconfigure(encoding='utf-8')
+
+    parser = argparse.ArgumentParser(description='Preparation du dataset 224x224')
+    parser.add_argument('--input', default='face1_balanced', help='Dataset source (un dossier par personne)')
+    parser.add_argument('--output', help='Dossier de sortie (defaut: face1_processed ou face1_packed)')
+    parser.add_argument('--classes', nargs='*', default=DEFAULT_CLASSES, help='Personnes (ordre = labels)')
+    parser.add_argument('--packed', action='store_true', help='Ecrire le format packe memmap')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Threads de decodage')
+    args = parser.parse_args(argv)
+
+    output_path = args.output or ('face1_packed' if args.packed else 'face1_processed')
+
+    print('=' * 70)
+    print('PREPARATION DU DATASET - Redimensionnement 224x224')
+    print('=' * 70)
+
+    if args.packed:
+        write_packed(args.input, output_path, args.classes, args.workers)
+    else:
+        write_jpegs(args.input, output_path, args.classes)
+
+    print()
+    print('=' * 70)
+    print('OK! DATASET PRET')
+    print('=' * 70)
+    print()
+    if args.packed:
+        print(f'Prochain: PackedDataset("{output_path}") dans le notebook / l\'entrainement')
+    else:
+        print(f'Prochain: Modifier notebook pour utiliser {output_path}')
+
+
+if __name__ == '__main__':
+    main()
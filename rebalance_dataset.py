@@ -1,85 +1,68 @@
+#!/usr/bin/env python3
+"""
+Rééquilibrage virtuel du dataset
+Plus aucune copie de fichier: écrit <dataset>/sampling.json (politique de
+cible + table des poids par classe). Les chargeurs d'entraînement
+(face_dataset.PackedDataset.tf_dataset(balance=...)) tirent des indices à
+chaque epoch; la cible est recalculée sur les effectifs courants, elle suit
+donc les images ajoutées par /register.
+
+Usage:
+    python rebalance_dataset.py --dataset face1 --policy max
+    python rebalance_dataset.py --dataset face1 --policy 650
+"""
+
+import argparse
 import os
-import shutil
-import random
+import sys
+
+from face_dataset import list_samples, write_sampling_manifest
+
+DEFAULT_CLASSES = ['Ben', 'gracia', 'Jered', 'Leo']
+
+
+def parse_policy(value):
+    """'max', 'median', 'mean' ou un nombre fixe d'images par classe"""
+    if value in ('max', 'median', 'mean'):
+        return value
+    return int(value)
 
-print('=' * 70)
-print('Régénération du dataset équilibré (650 images par personne)')
-print('=' * 70)
 
-# Source
-face1_path = r'c:\Users\HP\Music\machineL\face1'
-face1_balanced_path = r'c:\Users\HP\Music\machineL\face1_balanced'
+def main(argv=None):
+    sys.stdout.reconfigure(encoding='utf-8')
 
-classes = ['Ben', 'gracia', 'Jered', 'Leo']
-TARGET_COUNT = 650
+    parser = argparse.ArgumentParser(description='Rééquilibrage virtuel (manifeste d\'échantillonnage)')
+    parser.add_argument('--dataset', default='face1', help='Dataset source (un dossier par personne)')
+    parser.add_argument('--classes', nargs='*', default=DEFAULT_CLASSES, help='Personnes (ordre = labels)')
+    parser.add_argument('--policy', type=parse_policy, default='max',
+                        help='Cible par classe: max, median, mean ou un entier (ex: 650)')
+    args = parser.parse_args(argv)
 
-print()
-print('1️⃣ Sauvegarde du backup...')
-backup_path = face1_balanced_path + '_backup_before_fix'
-if os.path.exists(backup_path):
-    shutil.rmtree(backup_path)
-shutil.copytree(face1_balanced_path, backup_path)
-print(f'✅ Backup créé')
+    print('=' * 70)
+    print(f'Rééquilibrage virtuel du dataset (cible: {args.policy})')
+    print('=' * 70)
+    print()
 
-print()
-print('2️⃣ Régénération du dataset équilibré...')
-print()
+    samples = list_samples(args.dataset, args.classes)
+    counts = [sum(1 for _, label in samples if label == i) for i in range(len(args.classes))]
+    manifest = write_sampling_manifest(args.dataset, args.classes, counts, args.policy)
+    target = manifest['target_count']
 
-for person in classes:
-    source_dir = os.path.join(face1_path, person)
-    target_dir = os.path.join(face1_balanced_path, person)
-    
-    if not os.path.exists(source_dir):
-        print(f'⚠️ {person}: Dossier source non trouvé')
-        continue
-    
-    images = [f for f in os.listdir(source_dir) if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
-    total_images = len(images)
-    
-    print(f'📊 {person}: {total_images} -> {TARGET_COUNT}')
-    
-    if total_images == 0:
-        print(f'   ⚠️ Aucune image!')
-        continue
-    
-    if total_images >= TARGET_COUNT:
-        selected = sorted(images)[:TARGET_COUNT]
-        print(f'   Selection: {TARGET_COUNT} images')
-    else:
-        selected = images.copy()
-        to_add = TARGET_COUNT - total_images
-        selected.extend(random.choices(images, k=to_add))
-        print(f'   Warning: duplication de {to_add} images')
-    
-    if os.path.exists(target_dir):
-        shutil.rmtree(target_dir)
-    os.makedirs(target_dir)
-    
-    for i, img_file in enumerate(selected):
-        src = os.path.join(source_dir, img_file)
-        dst = os.path.join(target_dir, img_file)
-        
-        if os.path.exists(dst):
-            name, ext = os.path.splitext(img_file)
-            dst = os.path.join(target_dir, f'{name}_d{i}{ext}')
-        
-        shutil.copy2(src, dst)
+    for person, count, weight in zip(args.classes, counts, manifest['class_weights']):
+        if count == 0:
+            print(f'⚠️ {person}: Aucune image!')
+        elif count < target:
+            print(f'📊 {person}: {count} -> {target} (poids {weight:.2f}, {target - count} tirages répétés/epoch)')
+        else:
+            print(f'📊 {person}: {count} -> {target} (poids {weight:.2f}, sous-échantillonné/epoch)')
 
-print()
-print('=' * 70)
-print('3️⃣ Verification...')
-print('=' * 70)
-print()
+    print()
+    print(f'Total: {sum(counts)} images sur disque, {target * sum(1 for c in counts if c)} par epoch')
+    print(f'Manifeste: {os.path.join(args.dataset, "sampling.json")}')
+    print('=' * 70)
+    print('✅ Rééquilibrage terminé (aucun fichier copié)')
+    print('=' * 70)
 
-for person in classes:
-    target_dir = os.path.join(face1_balanced_path, person)
-    count = len([f for f in os.listdir(target_dir) if f.lower().endswith(('.jpg', '.jpeg', '.png'))])
-    status = 'OK' if count == TARGET_COUNT else 'KO'
-    print(f'{status} {person}: {count}')
 
-total = sum([len([f for f in os.listdir(os.path.join(face1_balanced_path, p)) if f.lower().endswith(('.jpg', '.jpeg', '.png'))]) for p in classes])
-print()
-print(f'Total: {total} images')
-print('=' * 70)
-print('✅ Régénération terminée!')
-print('=' * 70)
+if __name__ == '__main__':
+    main()
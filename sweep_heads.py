@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Recherche d'hyperparamètres de la tête de classification (Dense, Dropout,
+learning rate, epochs, batch) avec validation croisée k-fold
+Le backbone MobileNetV2 est gelé et suivi d'un GlobalAveragePooling: ses
+features poolées (1280 valeurs par image) sont donc calculées une seule
+fois et mises en cache à côté du dataset packé (clé: hash des poids du
+backbone + empreinte du dataset). Chaque candidat n'entraîne plus que
+Dense -> Dropout -> Dense sur ces features: quelques secondes au lieu d'un
+passage complet dans MobileNetV2 à chaque epoch.
+
+Les (configuration, fold) sont répartis sur un pool de processus (un thread
+TensorFlow chacun). La validation croisée porte sur la partie train du
+découpage de /train; la meilleure configuration est ensuite réentraînée sur
+tout le train et mesurée sur le test. Résultat: tableau classé,
+sweep_results.json et best_head.json (lu par /train, voir face_training.py).
+
+Usage:
+    python sweep_heads.py --dataset face1
+    python sweep_heads.py --dense-units 128 256 512 --dropout 0.2 0.4 --learning-rate 1e-3 3e-4 --folds 5
+    python sweep_heads.py --save-model face_tuned.h5     # backbone + meilleure tête
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from face_dataset import class_weights, load_sampling_policy, open_or_pack
+from face_training import DEFAULT_HEAD, HEAD_CONFIG_FILE, build_classifier, build_head, get_backbone
+
+DEFAULT_CLASSES = ['jered', 'gracia', 'Ben', 'Leo']
+
+
+def backbone_key(backbone):
+    """Hash des poids du backbone (même backbone = mêmes features)"""
+    digest = hashlib.sha256()
+    for weights in backbone.get_weights():
+        digest.update(np.ascontiguousarray(weights).tobytes())
+    return digest.hexdigest()
+
+
+def backbone_features(backbone, dataset, batch_size=64):
+    """Features poolées de toutes les lignes du dataset packé (calculées une fois)"""
+    import tensorflow as tf
+
+    cache_path = os.path.join(dataset.path, f'features_{backbone_key(backbone)[:12]}_{dataset.fingerprint[:12]}.npy')
+    if os.path.exists(cache_path):
+        print(f'♻️ Features en cache: {cache_path}')
+        return cache_path
+
+    extractor = tf.keras.Sequential([backbone, tf.keras.layers.GlobalAveragePooling2D()])
+    count = len(dataset.images)
+    features = None
+    for start in range(0, count, batch_size):
+        rows = np.arange(start, min(start + batch_size, count))
+        batch = extractor.predict(dataset.read(rows).astype(np.float32) / 255.0, verbose=0)
+        if features is None:
+            features = np.lib.format.open_memmap(cache_path + '.tmp', mode='w+', dtype=np.float32,
+                                                 shape=(count, batch.shape[1]))
+        features[rows] = batch
+    features.flush()
+    del features
+    os.replace(cache_path + '.tmp', cache_path)
+    print(f'✅ Features calculées: {cache_path} ({count} images)')
+    return cache_path
+
+
+def stratified_folds(labels, k, seed=42):
+    """Numéro de fold de chaque exemple, classes réparties également entre les folds"""
+    rng = np.random.default_rng(seed)
+    folds = np.empty(len(labels), dtype=np.int32)
+    for label in np.unique(labels):
+        members = rng.permutation(np.flatnonzero(labels == label))
+        folds[members] = np.arange(len(members)) % k
+    return folds
+
+
+def candidate_grid(args):
+    keys = ('dense_units', 'dropout', 'learning_rate', 'epochs', 'batch_size')
+    values = [getattr(args, key) for key in keys]
+    return [dict(zip(keys, combination)) for combination in itertools.product(*values)]
+
+
+# --- Processus du pool ------------------------------------------------------
+
+_features = None
+
+
+def _init_worker(features_path, threads):
+    global _features
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+    _features = np.load(features_path, mmap_mode='r')
+
+
+def train_head(config, train_rows, y_train, val_rows, y_val, num_classes, weights, seed=42):
+    """Entraîne une tête sur les features (train_rows) et la mesure sur val_rows"""
+    import tensorflow as tf
+
+    tf.keras.utils.set_random_seed(seed)
+    x_train = np.asarray(_features[train_rows])
+    x_val = np.asarray(_features[val_rows])
+    model = build_head(x_train.shape[1], num_classes, config['dense_units'], config['dropout'])
+    model.compile(optimizer=tf.keras.optimizers.Adam(config['learning_rate']),
+                  loss='sparse_categorical_crossentropy', metrics=['accuracy'])
+    start = time.perf_counter()
+    history = model.fit(
+        x_train, y_train,
+        validation_data=(x_val, y_val) if len(val_rows) else None,
+        epochs=config['epochs'], batch_size=config['batch_size'],
+        class_weight={i: float(w) for i, w in enumerate(weights)},
+        verbose=0,
+    )
+    result = {'seconds': time.perf_counter() - start}
+    if len(val_rows):
+        result['val_accuracy'] = float(history.history['val_accuracy'][-1])
+        result['val_loss'] = float(history.history['val_loss'][-1])
+    return result, model
+
+
+def _run_fold(task):
+    config_index, config, fold, train_rows, y_train, val_rows, y_val, num_classes, weights = task
+    result, _ = train_head(config, train_rows, y_train, val_rows, y_val, num_classes, weights, seed=42 + fold)
+    return config_index, fold, result
+
+
+def _final_fit(task):
+    """Meilleure configuration sur tout le train; retourne mesure test + poids de la tête"""
+    config, train_rows, y_train, test_rows, y_test, num_classes, weights = task
+    result, model = train_head(config, train_rows, y_train, test_rows, y_test, num_classes, weights)
+    return result, [layer.get_weights() for layer in model.layers]
+
+
+# ---------------------------------------------------------------------------
+
+def rank(configs, fold_results):
+    """Moyenne / écart-type par configuration, classées par accuracy puis perte de validation"""
+    rows = []
+    for index, config in enumerate(configs):
+        results = fold_results[index]
+        accuracies = np.array([r['val_accuracy'] for r in results])
+        losses = np.array([r['val_loss'] for r in results])
+        rows.append({
+            'config': config,
+            'mean_accuracy': float(accuracies.mean()),
+            'std_accuracy': float(accuracies.std()),
+            'mean_loss': float(losses.mean()),
+            'seconds': float(sum(r['seconds'] for r in results)),
+            'folds': len(results),
+        })
+    rows.sort(key=lambda r: (-r['mean_accuracy'], r['mean_loss']))
+    return rows
+
+
+def main(argv=None):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+    parser = argparse.ArgumentParser(description='Sweep des hyperparamètres de la tête sur features en cache (k-fold)')
+    parser.add_argument('--dataset', default='face1', help='Dataset (un dossier par personne)')
+    parser.add_argument('--classes', nargs='*', default=DEFAULT_CLASSES, help='Personnes (ordre = sorties)')
+    parser.add_argument('--model', default='face.h5', help='Modèle dont le backbone est repris (sinon poids locaux / ImageNet)')
+    parser.add_argument('--dense-units', type=int, nargs='+', default=[128, 256, 512])
+    parser.add_argument('--dropout', type=float, nargs='+', default=[0.2, 0.4, 0.5])
+    parser.add_argument('--learning-rate', type=float, nargs='+', default=[1e-3, 3e-4])
+    parser.add_argument('--epochs', type=int, nargs='+', default=[DEFAULT_HEAD['epochs'], 30])
+    parser.add_argument('--batch-size', type=int, nargs='+', default=[DEFAULT_HEAD['batch_size']])
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Processus du pool')
+    parser.add_argument('--top', type=int, default=15, help='Lignes affichées')
+    parser.add_argument('--results', default='sweep_results.json')
+    parser.add_argument('--best', default=HEAD_CONFIG_FILE, help='Meilleure configuration (lue par /train)')
+    parser.add_argument('--save-model', help='Sauvegarder backbone + meilleure tête (modèle servable)')
+    args = parser.parse_args(argv)
+
+    import tensorflow as tf
+
+    print('=' * 70)
+    print('SWEEP DES TÊTES DE CLASSIFICATION')
+    print('=' * 70)
+
+    dataset = open_or_pack(args.dataset, args.classes, os.path.normpath(args.dataset) + '_packed')
+    train_rows, test_rows = dataset.split(test_size=0.2, seed=42)
+    num_classes = len(args.classes)
+
+    teacher = tf.keras.models.load_model(args.model) if os.path.exists(args.model) else None
+    backbone, source = get_backbone(teacher)
+    print(f'1️⃣ Backbone: {source}')
+    features_path = backbone_features(backbone, dataset)
+
+    y_train = dataset.labels[train_rows]
+    folds = stratified_folds(y_train, args.folds)
+    policy = load_sampling_policy(args.dataset)
+    configs = candidate_grid(args)
+    tasks = []
+    for index, config in enumerate(configs):
+        for fold in range(args.folds):
+            fit, val = folds != fold, folds == fold
+            weights = class_weights(np.bincount(y_train[fit], minlength=num_classes), policy)
+            tasks.append((index, config, fold, train_rows[fit], y_train[fit], train_rows[val], y_train[val],
+                          num_classes, weights))
+    print(f'2️⃣ {len(configs)} configurations x {args.folds} folds = {len(tasks)} entraînements '
+          f'({args.workers} processus, {len(train_rows)} images de train)')
+
+    start = time.perf_counter()
+    fold_results = {index: [] for index in range(len(configs))}
+    # spawn: pas de fork d'un processus où TensorFlow est déjà initialisé
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker, initargs=(features_path, 1)) as pool:
+        for done, (index, fold, result) in enumerate(pool.map(_run_fold, tasks), 1):
+            fold_results[index].append(result)
+            if done % max(1, len(tasks) // 10) == 0:
+                print(f'   {done}/{len(tasks)} ({time.perf_counter() - start:.0f}s)')
+
+        ranked = rank(configs, fold_results)
+        best = ranked[0]['config']
+        weights = class_weights(np.bincount(y_train, minlength=num_classes), policy)
+        final, head_weights = pool.submit(_final_fit, (best, train_rows, y_train, test_rows,
+                                                       dataset.labels[test_rows], num_classes, weights)).result()
+    sweep_seconds = time.perf_counter() - start
+
+    print()
+    print(f'{"#":>3} {"dense":>6} {"dropout":>7} {"lr":>8} {"epochs":>6} {"batch":>5} {"accuracy":>16} {"loss":>7}')
+    for position, row in enumerate(ranked[:args.top], 1):
+        c = row['config']
+        print(f'{position:>3} {c["dense_units"]:>6} {c["dropout"]:>7} {c["learning_rate"]:>8.0e} {c["epochs"]:>6} '
+              f'{c["batch_size"]:>5} {row["mean_accuracy"] * 100:>8.2f}% ± {row["std_accuracy"] * 100:4.1f} '
+              f'{row["mean_loss"]:>7.4f}')
+    baseline = next((r for r in ranked if r['config'] == DEFAULT_HEAD), None)
+    if baseline is not None:
+        print(f'Configuration actuelle (#{ranked.index(baseline) + 1}): {baseline["mean_accuracy"] * 100:.2f}%')
+    print()
+    print(f'✅ Meilleure: {best}')
+    print(f'   Test (tout le train -> test): {final.get("val_accuracy", float("nan")) * 100:.2f}%')
+    print(f'   Sweep: {sweep_seconds:.0f}s')
+
+    summary = {
+        'dataset': args.dataset,
+        'classes': args.classes,
+        'backbone': source,
+        'folds': args.folds,
+        'train_images': int(len(train_rows)),
+        'test_images': int(len(test_rows)),
+        'seconds': round(sweep_seconds, 1),
+        'results': ranked,
+    }
+    with open(args.results, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    with open(args.best, 'w', encoding='utf-8') as f:
+        json.dump({
+            'config': best,
+            'cv_accuracy': ranked[0]['mean_accuracy'],
+            'cv_std': ranked[0]['std_accuracy'],
+            'test_accuracy': final.get('val_accuracy'),
+            'folds': args.folds,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }, f, indent=2)
+    print(f'Résultats: {args.results} - Meilleure tête: {args.best}')
+
+    if args.save_model:
+        # Même architecture que /train: les couches Dense de la tête reçoivent les poids appris
+        model = build_classifier(backbone, num_classes, best['dense_units'], best['dropout'])
+        model.build((None, 224, 224, 3))
+        for layer, weights in zip(model.layers[2:], head_weights):
+            layer.set_weights(weights)
+        model.save(args.save_model)
+        print(f'✅ Modèle sauvegardé: {args.save_model}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""
+Écriture des poids au format TF.js (layers-model) en flux
+Les tenseurs sont écrits un par un dans des fichiers de 4 MB
+(group1-shard1ofN.bin, ...), sans jamais concaténer tous les poids en
+mémoire. Un tenseur peut être coupé entre deux fichiers: TF.js lit les
+fichiers d'un groupe bout à bout. Le manifeste (noms, formes, dtypes) est
+celui attendu par tf.loadLayersModel.
+
+Quantification optionnelle des poids float32 (même format que
+tensorflowjs_converter --quantize_float16 / --quantize_uint8):
+    float16  2 octets par poids
+    uint8    1 octet par poids, affine par tenseur: w = q * scale + min
+"""
+
+import json
+import os
+
+import numpy as np
+
+DEFAULT_SHARD_BYTES = 4 * 1024 * 1024
+SINGLE_FILE_NAME = 'model.weights.bin'
+
+# dtype numpy -> dtype TF.js (le reste est converti en float32)
+TFJS_DTYPES = {
+    np.dtype(np.float32): 'float32',
+    np.dtype(np.int32): 'int32',
+    np.dtype(np.bool_): 'bool',
+}
+
+
+QUANTIZATION_DTYPES = {'float16': np.float16, 'uint8': np.uint8}
+
+
+def quantize(array, dtype):
+    """Quantifie un tenseur float32; retourne (données, champ 'quantization' du manifeste)"""
+    if dtype == 'float16':
+        return array.astype(np.float16), {'dtype': 'float16', 'original_dtype': 'float32'}
+
+    # uint8 affine: plage [min, max] ajustée pour que 0 soit représenté exactement
+    low, high = min(float(array.min(initial=0)), 0.0), max(float(array.max(initial=0)), 0.0)
+    scale = (high - low) / 255 if high > low else 1.0
+    zero_point = int(np.clip(round(-low / scale), 0, 255))
+    low = -zero_point * scale
+    data = np.clip(np.round((array - low) / scale), 0, 255).astype(np.uint8)
+    return data, {'dtype': 'uint8', 'min': low, 'scale': scale, 'original_dtype': 'float32'}
+
+
+def dequantize(data, quantization):
+    """Inverse de quantize (vers float32)"""
+    if quantization['dtype'] == 'float16':
+        return data.astype(np.float32)
+    return (data.astype(np.float32) * np.float32(quantization['scale']) + np.float32(quantization['min']))
+
+
+def weight_name(variable):
+    """Nom du poids dans le manifeste (chemin Keras 3, sinon nom TF sans ':0')"""
+    name = getattr(variable, 'path', None) or variable.name
+    return name[:-2] if name.endswith(':0') else name
+
+
+def tfjs_dtype(dtype):
+    return TFJS_DTYPES.get(np.dtype(dtype), 'float32')
+
+
+def shard_names(total_bytes, shard_bytes=DEFAULT_SHARD_BYTES, group=1):
+    """Noms des fichiers (un seul model.weights.bin si shard_bytes <= 0)"""
+    if shard_bytes <= 0:
+        return [SINGLE_FILE_NAME]
+    count = max(1, -(-total_bytes // shard_bytes))
+    return [f'group{group}-shard{i}of{count}.bin' for i in range(1, count + 1)]
+
+
+class ShardWriter:
+    """Fichier courant + bascule au suivant quand il atteint shard_bytes"""
+
+    def __init__(self, output_dir, names, shard_bytes):
+        self.output_dir = output_dir
+        self.names = names
+        self.shard_bytes = shard_bytes
+        self._index = -1
+        self._file = None
+        self._written = 0
+
+    def _next(self):
+        if self._file is not None:
+            self._file.close()
+        self._index += 1
+        self._file = open(os.path.join(self.output_dir, self.names[self._index]), 'wb')
+        self._written = 0
+
+    def write(self, data):
+        view = memoryview(data).cast('B')
+        while len(view):
+            if self._file is None or (self.shard_bytes > 0 and self._written >= self.shard_bytes):
+                self._next()
+            room = len(view) if self.shard_bytes <= 0 else self.shard_bytes - self._written
+            self._file.write(view[:room])
+            self._written += min(room, len(view))
+            view = view[room:]
+
+    def close(self):
+        if self._file is None:
+            self._next()  # modèle sans poids: fichier vide, le manifeste reste valide
+        self._file.close()
+
+
+def write_weight_shards(variables, output_dir, shard_bytes=DEFAULT_SHARD_BYTES, quantization=None):
+    """
+    Écrit les poids (variables TF/Keras ou couples (nom, tableau)) et
+    retourne le weightsManifest TF.js. Un seul tenseur en mémoire à la fois.
+    quantization: None, 'float16' ou 'uint8' (poids float32 seulement)
+    """
+    entries = []
+    for variable in variables:
+        if isinstance(variable, tuple):
+            name, value = variable
+            shape, dtype = np.shape(value), getattr(value, 'dtype', np.float32)
+        else:
+            name, value = weight_name(variable), variable
+            shape = tuple(int(d) for d in variable.shape)
+            dtype = getattr(variable.dtype, 'as_numpy_dtype', variable.dtype)
+        entries.append((name, value, [int(d) for d in shape], tfjs_dtype(dtype)))
+
+    def stored_itemsize(dtype):
+        if quantization and dtype == 'float32':
+            return np.dtype(QUANTIZATION_DTYPES[quantization]).itemsize
+        return np.dtype(dtype).itemsize
+
+    total_bytes = sum(int(np.prod(shape)) * stored_itemsize(dtype) for _, _, shape, dtype in entries)
+    names = shard_names(total_bytes, shard_bytes)
+
+    # Anciens fichiers de poids (autre découpage) retirés pour ne pas les déployer
+    for filename in os.listdir(output_dir):
+        if filename == SINGLE_FILE_NAME or (filename.startswith('group1-shard') and filename.endswith('.bin')):
+            os.remove(os.path.join(output_dir, filename))
+
+    writer = ShardWriter(output_dir, names, shard_bytes)
+    manifest_weights = []
+    try:
+        for name, value, shape, dtype in entries:
+            array = value.numpy() if hasattr(value, 'numpy') else np.asarray(value)
+            array = np.ascontiguousarray(array, dtype=dtype)
+            entry = {'name': name, 'shape': shape, 'dtype': dtype}
+            if quantization and dtype == 'float32':
+                array, entry['quantization'] = quantize(array, quantization)
+            writer.write(np.ascontiguousarray(array))
+            manifest_weights.append(entry)
+    finally:
+        writer.close()
+
+    return [{'paths': names, 'weights': manifest_weights}]
+
+
+def read_weights(model_dir):
+    """Relit les poids d'un model.json TF.js (déquantifiés en float32): [(nom, tableau)]"""
+    with open(os.path.join(model_dir, 'model.json'), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)['weightsManifest']
+
+    weights = []
+    for group in manifest:
+        buffer = b''.join(_read_file(os.path.join(model_dir, path)) for path in group['paths'])
+        offset = 0
+        for entry in group['weights']:
+            quantization = entry.get('quantization')
+            stored = np.dtype(quantization['dtype'] if quantization else entry['dtype'])
+            count = int(np.prod(entry['shape']))
+            data = np.frombuffer(buffer, dtype=stored, count=count, offset=offset).reshape(entry['shape'])
+            offset += count * stored.itemsize
+            weights.append((entry['name'], dequantize(data, quantization) if quantization else data))
+    return weights
+
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()